@@ -3,15 +3,17 @@
 import logging
 import httpx
 from app.config import SIGNAL_API_URL as _ENV_API_URL, SIGNAL_PHONE_NUMBER as _ENV_PHONE
-from app.database import get_setting
+from app.database import get_settings_many
 
 logger = logging.getLogger(__name__)
 
 
 async def _get_signal_config():
-    api_url = await get_setting("signal_api_url", _ENV_API_URL)
-    phone = await get_setting("signal_phone_number", _ENV_PHONE)
-    return api_url, phone
+    values = await get_settings_many(
+        ["signal_api_url", "signal_phone_number"],
+        defaults={"signal_api_url": _ENV_API_URL, "signal_phone_number": _ENV_PHONE},
+    )
+    return values["signal_api_url"], values["signal_phone_number"]
 
 
 async def send_signal_message(recipient: str, message: str):
@@ -4,16 +4,18 @@ import logging
 from telegram import Update
 from telegram.ext import Application, MessageHandler, CommandHandler, filters, ContextTypes
 from app.config import TELEGRAM_BOT_TOKEN as _ENV_TOKEN, TELEGRAM_TEACHER_ID as _ENV_TEACHER_ID
-from app.database import get_setting
+from app.database import get_settings_many
 from app.services.message_parser import process_teacher_items
 
 logger = logging.getLogger(__name__)
 
 
 async def _get_telegram_config():
-    token = await get_setting("telegram_bot_token", _ENV_TOKEN)
-    teacher_id = await get_setting("telegram_teacher_id", _ENV_TEACHER_ID)
-    return token, teacher_id
+    values = await get_settings_many(
+        ["telegram_bot_token", "telegram_teacher_id"],
+        defaults={"telegram_bot_token": _ENV_TOKEN, "telegram_teacher_id": _ENV_TEACHER_ID},
+    )
+    return values["telegram_bot_token"], values["telegram_teacher_id"]
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
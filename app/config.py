@@ -7,6 +7,7 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "") or None  # e.g. the benchmark's fake server
 APP_PASSWORD_HASH = os.getenv("APP_PASSWORD_HASH", "")
 TEACHER_PASSWORD_HASH = os.getenv("TEACHER_PASSWORD_HASH", "")
 APP_SECRET_KEY = os.getenv("APP_SECRET_KEY", "change-me")
@@ -21,6 +22,44 @@ SIGNAL_TEACHER_NUMBER = os.getenv("SIGNAL_TEACHER_NUMBER", "")
 
 DATABASE_PATH = BASE_DIR / os.getenv("DATABASE_PATH", "data/korean_app.db")
 AUDIO_PATH = BASE_DIR / os.getenv("AUDIO_PATH", "data/audio")
+# Whisper rejects files over 25 MB, so larger uploads are refused up front
+AUDIO_MAX_UPLOAD_BYTES = int(os.getenv("AUDIO_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+AUDIO_CHUNK_SIZE = int(os.getenv("AUDIO_CHUNK_SIZE", str(1024 * 1024)))
+
+# SQLite connection pool: N read-only connections plus one serialized writer
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Shared OpenAI HTTP client (one pooled keep-alive client per API key)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Whisper/GPT result cache (in-memory LRU in front of the ai_cache table)
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 86400)))
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "512"))
+AI_CACHE_MAX_ROWS = int(os.getenv("AI_CACHE_MAX_ROWS", "5000"))
+
+# Background prompt prefetch for speaking practice
+PROMPT_PREFETCH_ENABLED = os.getenv("PROMPT_PREFETCH_ENABLED", "true").lower() == "true"
+PROMPT_POOL_DEPTH = int(os.getenv("PROMPT_POOL_DEPTH", "2"))
+PROMPT_PREFETCH_QUEUE_SIZE = int(os.getenv("PROMPT_PREFETCH_QUEUE_SIZE", "100"))
+PROMPT_POOL_MAX_AGE_HOURS = int(os.getenv("PROMPT_POOL_MAX_AGE_HOURS", "24"))
+
+# Review workload forecast (/api/stats/forecast)
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "30"))
+FORECAST_DEFAULT_QUALITY = float(os.getenv("FORECAST_DEFAULT_QUALITY", "0.8"))
+
+# Student level history: a row is added when the estimate changes, else at most this often
+LEVEL_HISTORY_INTERVAL_HOURS = int(os.getenv("LEVEL_HISTORY_INTERVAL_HOURS", "24"))
+
+# List endpoints: how long a row count is reused for total=cached
+LIST_TOTAL_CACHE_SECONDS = int(os.getenv("LIST_TOTAL_CACHE_SECONDS", "60"))
 
 HOST = os.getenv("HOST", "127.0.0.1")
 PORT = int(os.getenv("PORT", "8100"))
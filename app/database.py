@@ -1,8 +1,14 @@
 import aiosqlite
+import asyncio
 import json
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from app.config import DATABASE_PATH
+from app.services import item_index, due_queue
+from app.config import (
+    DATABASE_PATH, DB_READ_POOL_SIZE, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_BUSY_TIMEOUT_MS,
+    LEVEL_HISTORY_INTERVAL_HOURS,
+)
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS items (
@@ -290,6 +296,418 @@ MIGRATIONS = [
     CREATE INDEX IF NOT EXISTS idx_assignments_completed ON curriculum_assignments(completed_at);
     CREATE INDEX IF NOT EXISTS idx_assignments_type ON curriculum_assignments(assignment_type);
     """,
+    # Migration 7: Persistent cache for Whisper transcripts and GPT completions
+    """
+    CREATE TABLE IF NOT EXISTS ai_cache (
+        cache_key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_ai_cache_created ON ai_cache(created_at);
+    """,
+    # Migration 8: Pre-generated speaking prompts (see services/prompt_pool.py)
+    """
+    CREATE TABLE IF NOT EXISTS prompt_pool (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+        item_key TEXT NOT NULL,  -- sorted comma-separated item ids
+        formality TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        prompt_english TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(student_id, item_key, formality)
+    );
+    """,
+    # Migration 9: Per-student stats rollups, maintained by triggers (see rebuild_stats_rollups)
+    """
+    -- No foreign keys: practice_log.student_id isn't one, and a rollup row must
+    -- never make a practice insert fail. Rows are removed with the student below.
+    CREATE TABLE IF NOT EXISTS student_stats_rollup (
+        student_id INTEGER PRIMARY KEY,
+        practice_count INTEGER NOT NULL DEFAULT 0,
+        study_seconds INTEGER NOT NULL DEFAULT 0,
+        last_practice TIMESTAMP,
+        items_encountered INTEGER NOT NULL DEFAULT 0,
+        mastered INTEGER NOT NULL DEFAULT 0,
+        learning INTEGER NOT NULL DEFAULT 0,
+        struggling INTEGER NOT NULL DEFAULT 0,
+        unseen INTEGER NOT NULL DEFAULT 0,
+        estimated_level REAL,
+        level_calculated_at TIMESTAMP
+    );
+
+    -- One row per student per UTC day with practice or newly encountered items
+    -- (plus practiced_items, added in migration 10)
+    CREATE TABLE IF NOT EXISTS student_daily_stats (
+        student_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        session_count INTEGER NOT NULL DEFAULT 0,
+        scored_count INTEGER NOT NULL DEFAULT 0,  -- sessions with an overall_score
+        score_sum REAL NOT NULL DEFAULT 0,
+        study_seconds INTEGER NOT NULL DEFAULT 0,
+        new_items INTEGER NOT NULL DEFAULT 0,  -- encounters first seen that day
+        PRIMARY KEY (student_id, day)
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_practice_insert AFTER INSERT ON practice_log
+    BEGIN
+        INSERT INTO student_stats_rollup (student_id) VALUES (NEW.student_id)
+            ON CONFLICT(student_id) DO NOTHING;
+        UPDATE student_stats_rollup SET
+            practice_count = practice_count + 1,
+            study_seconds = study_seconds + COALESCE(NEW.duration_seconds, 0),
+            last_practice = CASE WHEN last_practice IS NULL OR NEW.created_at > last_practice
+                                 THEN NEW.created_at ELSE last_practice END
+        WHERE student_id = NEW.student_id;
+        INSERT INTO student_daily_stats (student_id, day, session_count, scored_count, score_sum, study_seconds)
+        VALUES (NEW.student_id, date(NEW.created_at), 1, NEW.overall_score IS NOT NULL,
+                COALESCE(NEW.overall_score, 0), COALESCE(NEW.duration_seconds, 0))
+        ON CONFLICT(student_id, day) DO UPDATE SET
+            session_count = session_count + 1,
+            scored_count = scored_count + excluded.scored_count,
+            score_sum = score_sum + excluded.score_sum,
+            study_seconds = study_seconds + excluded.study_seconds;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_practice_delete AFTER DELETE ON practice_log
+    BEGIN
+        UPDATE student_stats_rollup SET
+            practice_count = practice_count - 1,
+            study_seconds = study_seconds - COALESCE(OLD.duration_seconds, 0),
+            last_practice = (SELECT MAX(created_at) FROM practice_log WHERE student_id = OLD.student_id)
+        WHERE student_id = OLD.student_id;
+        UPDATE student_daily_stats SET
+            session_count = session_count - 1,
+            scored_count = scored_count - (OLD.overall_score IS NOT NULL),
+            score_sum = score_sum - COALESCE(OLD.overall_score, 0),
+            study_seconds = study_seconds - COALESCE(OLD.duration_seconds, 0)
+        WHERE student_id = OLD.student_id AND day = date(OLD.created_at);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_practice_update
+    AFTER UPDATE OF student_id, overall_score, duration_seconds, created_at ON practice_log
+    BEGIN
+        UPDATE student_stats_rollup SET
+            practice_count = practice_count - 1,
+            study_seconds = study_seconds - COALESCE(OLD.duration_seconds, 0)
+        WHERE student_id = OLD.student_id;
+        UPDATE student_daily_stats SET
+            session_count = session_count - 1,
+            scored_count = scored_count - (OLD.overall_score IS NOT NULL),
+            score_sum = score_sum - COALESCE(OLD.overall_score, 0),
+            study_seconds = study_seconds - COALESCE(OLD.duration_seconds, 0)
+        WHERE student_id = OLD.student_id AND day = date(OLD.created_at);
+        INSERT INTO student_stats_rollup (student_id) VALUES (NEW.student_id)
+            ON CONFLICT(student_id) DO NOTHING;
+        UPDATE student_stats_rollup SET
+            practice_count = practice_count + 1,
+            study_seconds = study_seconds + COALESCE(NEW.duration_seconds, 0)
+        WHERE student_id = NEW.student_id;
+        UPDATE student_stats_rollup SET
+            last_practice = (SELECT MAX(created_at) FROM practice_log WHERE student_id = student_stats_rollup.student_id)
+        WHERE student_id IN (OLD.student_id, NEW.student_id);
+        INSERT INTO student_daily_stats (student_id, day, session_count, scored_count, score_sum, study_seconds)
+        VALUES (NEW.student_id, date(NEW.created_at), 1, NEW.overall_score IS NOT NULL,
+                COALESCE(NEW.overall_score, 0), COALESCE(NEW.duration_seconds, 0))
+        ON CONFLICT(student_id, day) DO UPDATE SET
+            session_count = session_count + 1,
+            scored_count = scored_count + excluded.scored_count,
+            score_sum = score_sum + excluded.score_sum,
+            study_seconds = study_seconds + excluded.study_seconds;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_encounter_insert AFTER INSERT ON encounters
+    BEGIN
+        INSERT INTO student_stats_rollup (student_id) VALUES (NEW.student_id)
+            ON CONFLICT(student_id) DO NOTHING;
+        UPDATE student_stats_rollup SET items_encountered = items_encountered + 1
+        WHERE student_id = NEW.student_id;
+        INSERT INTO student_daily_stats (student_id, day, new_items)
+        SELECT NEW.student_id, date(NEW.first_seen), 1 WHERE NEW.first_seen IS NOT NULL
+        ON CONFLICT(student_id, day) DO UPDATE SET new_items = new_items + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_encounter_delete AFTER DELETE ON encounters
+    BEGIN
+        UPDATE student_stats_rollup SET items_encountered = items_encountered - 1
+        WHERE student_id = OLD.student_id;
+        UPDATE student_daily_stats SET new_items = new_items - 1
+        WHERE student_id = OLD.student_id AND day = date(OLD.first_seen);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_mastery_insert AFTER INSERT ON mastery
+    BEGIN
+        INSERT INTO student_stats_rollup (student_id) VALUES (NEW.student_id)
+            ON CONFLICT(student_id) DO NOTHING;
+        UPDATE student_stats_rollup SET
+            mastered = mastered + (CASE WHEN NEW.overall_score >= 0.8 THEN 1 ELSE 0 END),
+            learning = learning + (CASE WHEN NEW.overall_score >= 0.5 AND NEW.overall_score < 0.8 THEN 1 ELSE 0 END),
+            struggling = struggling + (CASE WHEN NEW.overall_score < 0.5 AND NEW.practice_count > 0 THEN 1 ELSE 0 END),
+            unseen = unseen + (CASE WHEN NEW.practice_count = 0 THEN 1 ELSE 0 END)
+        WHERE student_id = NEW.student_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_mastery_update
+    AFTER UPDATE OF overall_score, practice_count ON mastery
+    BEGIN
+        UPDATE student_stats_rollup SET
+            mastered = mastered - (CASE WHEN OLD.overall_score >= 0.8 THEN 1 ELSE 0 END)
+                                + (CASE WHEN NEW.overall_score >= 0.8 THEN 1 ELSE 0 END),
+            learning = learning - (CASE WHEN OLD.overall_score >= 0.5 AND OLD.overall_score < 0.8 THEN 1 ELSE 0 END)
+                                + (CASE WHEN NEW.overall_score >= 0.5 AND NEW.overall_score < 0.8 THEN 1 ELSE 0 END),
+            struggling = struggling - (CASE WHEN OLD.overall_score < 0.5 AND OLD.practice_count > 0 THEN 1 ELSE 0 END)
+                                    + (CASE WHEN NEW.overall_score < 0.5 AND NEW.practice_count > 0 THEN 1 ELSE 0 END),
+            unseen = unseen - (CASE WHEN OLD.practice_count = 0 THEN 1 ELSE 0 END)
+                            + (CASE WHEN NEW.practice_count = 0 THEN 1 ELSE 0 END)
+        WHERE student_id = NEW.student_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_mastery_delete AFTER DELETE ON mastery
+    BEGIN
+        UPDATE student_stats_rollup SET
+            mastered = mastered - (CASE WHEN OLD.overall_score >= 0.8 THEN 1 ELSE 0 END),
+            learning = learning - (CASE WHEN OLD.overall_score >= 0.5 AND OLD.overall_score < 0.8 THEN 1 ELSE 0 END),
+            struggling = struggling - (CASE WHEN OLD.overall_score < 0.5 AND OLD.practice_count > 0 THEN 1 ELSE 0 END),
+            unseen = unseen - (CASE WHEN OLD.practice_count = 0 THEN 1 ELSE 0 END)
+        WHERE student_id = OLD.student_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_level_insert AFTER INSERT ON student_level_history
+    BEGIN
+        INSERT INTO student_stats_rollup (student_id) VALUES (NEW.student_id)
+            ON CONFLICT(student_id) DO NOTHING;
+        UPDATE student_stats_rollup SET
+            estimated_level = NEW.estimated_level,
+            level_calculated_at = NEW.calculated_at
+        WHERE student_id = NEW.student_id
+              AND (level_calculated_at IS NULL OR NEW.calculated_at >= level_calculated_at);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_level_delete AFTER DELETE ON student_level_history
+    BEGIN
+        UPDATE student_stats_rollup SET
+            (estimated_level, level_calculated_at) = (
+                SELECT estimated_level, calculated_at FROM student_level_history
+                WHERE student_id = OLD.student_id
+                ORDER BY calculated_at DESC, id DESC LIMIT 1
+            )
+        WHERE student_id = OLD.student_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_student_delete AFTER DELETE ON students
+    BEGIN
+        DELETE FROM student_stats_rollup WHERE student_id = OLD.id;
+        DELETE FROM student_daily_stats WHERE student_id = OLD.id;
+    END;
+    """,
+    # Migration 10: Items first practiced per day (goals); see _run_migration_10
+    """
+    -- practiced_items column and its encounters triggers are added in _run_migration_10
+    """,
+    # Migration 11: Running per-level mastery sums for calculate_student_level
+    """
+    -- Per student and TOPIK level: sum of overall_score * weight and of weight over
+    -- practiced mastery rows, weight = min(practice_count, 10)
+    CREATE TABLE IF NOT EXISTS student_level_sums (
+        student_id INTEGER NOT NULL,
+        topik_level INTEGER NOT NULL,
+        score_sum REAL NOT NULL DEFAULT 0,
+        weight_sum INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, topik_level)
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_level_sums_mastery_insert AFTER INSERT ON mastery
+    WHEN NEW.practice_count > 0
+    BEGIN
+        INSERT INTO student_level_sums (student_id, topik_level, score_sum, weight_sum)
+        SELECT NEW.student_id, i.topik_level,
+               COALESCE(NEW.overall_score, 0) * MIN(NEW.practice_count, 10), MIN(NEW.practice_count, 10)
+        FROM items i WHERE i.id = NEW.item_id AND i.topik_level IS NOT NULL
+        ON CONFLICT(student_id, topik_level) DO UPDATE SET
+            score_sum = score_sum + excluded.score_sum,
+            weight_sum = weight_sum + excluded.weight_sum;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_level_sums_mastery_update
+    AFTER UPDATE OF overall_score, practice_count, item_id, student_id ON mastery
+    BEGIN
+        UPDATE student_level_sums SET
+            score_sum = score_sum - COALESCE(OLD.overall_score, 0) * MIN(OLD.practice_count, 10),
+            weight_sum = weight_sum - MIN(OLD.practice_count, 10)
+        WHERE OLD.practice_count > 0 AND student_id = OLD.student_id
+              AND topik_level = (SELECT topik_level FROM items WHERE id = OLD.item_id);
+        INSERT INTO student_level_sums (student_id, topik_level, score_sum, weight_sum)
+        SELECT NEW.student_id, i.topik_level,
+               COALESCE(NEW.overall_score, 0) * MIN(NEW.practice_count, 10), MIN(NEW.practice_count, 10)
+        FROM items i WHERE i.id = NEW.item_id AND i.topik_level IS NOT NULL AND NEW.practice_count > 0
+        ON CONFLICT(student_id, topik_level) DO UPDATE SET
+            score_sum = score_sum + excluded.score_sum,
+            weight_sum = weight_sum + excluded.weight_sum;
+    END;
+
+    -- When an item is deleted its mastery rows cascade after it is gone, so the
+    -- item's contribution is taken out beforehand (and the lookup below finds nothing)
+    CREATE TRIGGER IF NOT EXISTS trg_level_sums_mastery_delete AFTER DELETE ON mastery
+    WHEN OLD.practice_count > 0
+    BEGIN
+        UPDATE student_level_sums SET
+            score_sum = score_sum - COALESCE(OLD.overall_score, 0) * MIN(OLD.practice_count, 10),
+            weight_sum = weight_sum - MIN(OLD.practice_count, 10)
+        WHERE student_id = OLD.student_id
+              AND topik_level = (SELECT topik_level FROM items WHERE id = OLD.item_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_level_sums_item_delete BEFORE DELETE ON items
+    BEGIN
+        UPDATE student_level_sums SET
+            score_sum = score_sum - (
+                SELECT COALESCE(m.overall_score, 0) * MIN(m.practice_count, 10) FROM mastery m
+                WHERE m.item_id = OLD.id AND m.student_id = student_level_sums.student_id),
+            weight_sum = weight_sum - (
+                SELECT MIN(m.practice_count, 10) FROM mastery m
+                WHERE m.item_id = OLD.id AND m.student_id = student_level_sums.student_id)
+        WHERE topik_level = OLD.topik_level AND student_id IN (
+            SELECT student_id FROM mastery WHERE item_id = OLD.id AND practice_count > 0);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_level_sums_item_level AFTER UPDATE OF topik_level ON items
+    WHEN OLD.topik_level IS NOT NEW.topik_level
+    BEGIN
+        UPDATE student_level_sums SET
+            score_sum = score_sum - (
+                SELECT COALESCE(m.overall_score, 0) * MIN(m.practice_count, 10) FROM mastery m
+                WHERE m.item_id = OLD.id AND m.student_id = student_level_sums.student_id),
+            weight_sum = weight_sum - (
+                SELECT MIN(m.practice_count, 10) FROM mastery m
+                WHERE m.item_id = OLD.id AND m.student_id = student_level_sums.student_id)
+        WHERE topik_level = OLD.topik_level AND student_id IN (
+            SELECT student_id FROM mastery WHERE item_id = OLD.id AND practice_count > 0);
+        INSERT INTO student_level_sums (student_id, topik_level, score_sum, weight_sum)
+        SELECT student_id, NEW.topik_level,
+               COALESCE(overall_score, 0) * MIN(practice_count, 10), MIN(practice_count, 10)
+        FROM mastery WHERE item_id = NEW.id AND practice_count > 0 AND NEW.topik_level IS NOT NULL
+        ON CONFLICT(student_id, topik_level) DO UPDATE SET
+            score_sum = score_sum + excluded.score_sum,
+            weight_sum = weight_sum + excluded.weight_sum;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_level_sums_student_delete AFTER DELETE ON students
+    BEGIN
+        DELETE FROM student_level_sums WHERE student_id = OLD.id;
+    END;
+    """,
+    # Migration 12: Indexes for hot lookups (checked by scripts/check_query_plans.py)
+    """
+    -- Item lookups by text (AI-reported items, duplicate check)
+    CREATE INDEX IF NOT EXISTS idx_items_korean ON items(korean);
+    CREATE INDEX IF NOT EXISTS idx_items_dictionary_form ON items(dictionary_form);
+    -- Tier 0 review selection: teacher-added items, oldest first
+    CREATE INDEX IF NOT EXISTS idx_items_source ON items(source, created_at);
+    -- Example counts in item listings
+    CREATE INDEX IF NOT EXISTS idx_examples_item ON examples(item_id);
+    -- Per-student history in time order (supersedes idx_practice_log_student)
+    CREATE INDEX IF NOT EXISTS idx_practice_log_student_created ON practice_log(student_id, created_at);
+    DROP INDEX IF EXISTS idx_practice_log_student;
+    CREATE INDEX IF NOT EXISTS idx_encounters_student_seen ON encounters(student_id, first_seen);
+    """,
+    # Migration 13: Per-item rows for each practice session (practice_log.item_ids as a table)
+    """
+    CREATE TABLE IF NOT EXISTS practice_log_items (
+        log_id INTEGER NOT NULL REFERENCES practice_log(id) ON DELETE CASCADE,
+        item_id INTEGER NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+        student_id INTEGER NOT NULL,
+        position INTEGER NOT NULL DEFAULT 0,
+        status TEXT,             -- correct | wrong_form | incorrect | missing (speaking); hard | good | easy (reading)
+        score REAL,
+        encounter_type TEXT,
+        PRIMARY KEY (log_id, item_id)
+    ) WITHOUT ROWID;
+    -- All attempts involving an item, newest first
+    CREATE INDEX IF NOT EXISTS idx_practice_log_items_item ON practice_log_items(item_id, student_id, log_id);
+    """,
+    # Migration 14: Append-only per-attempt event log (encounters keeps only the latest type)
+    """
+    CREATE TABLE IF NOT EXISTS item_events (
+        id INTEGER PRIMARY KEY,
+        student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+        item_id INTEGER NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+        ts TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        event_type TEXT NOT NULL,  -- used_correctly | used_incorrectly | missing | reviewed | practiced
+        score REAL,
+        grammar_score REAL,
+        vocab_score REAL,
+        formality_score REAL,
+        log_id INTEGER             -- practice_log row the attempt belongs to
+    );
+    CREATE INDEX IF NOT EXISTS idx_item_events_student_item_ts ON item_events(student_id, item_id, ts);
+    CREATE INDEX IF NOT EXISTS idx_item_events_item ON item_events(item_id);
+    """,
+    # Migration 15: Keyset pagination sort orders; example/link counts (columns added in the runner)
+    """
+    -- /api/items: ORDER BY topik_level, korean, id (idx_items_level stays for the
+    -- curriculum tier's topik_level, id order)
+    CREATE INDEX IF NOT EXISTS idx_items_level_korean ON items(topik_level, korean);
+    -- /api/sentences: ORDER BY created_at DESC, id DESC (supersedes idx_sentences_level)
+    CREATE INDEX IF NOT EXISTS idx_sentences_created ON sentences(created_at);
+    CREATE INDEX IF NOT EXISTS idx_sentences_level_created ON sentences(topik_level, created_at);
+    DROP INDEX IF EXISTS idx_sentences_level;
+    """,
+    # Migration 16: Full-text search for items and sentences (trigram FTS5, see services/search.py)
+    """
+    -- Each field is stored with two trailing spaces so every character starts a
+    -- trigram; 1-2 character searches then match via the trigram vocabulary.
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        korean, english, dictionary_form, notes, tags, tokenize='trigram'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts_vocab USING fts5vocab(items_fts, 'row');
+    CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts USING fts5(
+        korean, english, tokenize='trigram'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts_vocab USING fts5vocab(sentences_fts, 'row');
+
+    CREATE TRIGGER IF NOT EXISTS trg_fts_item_insert AFTER INSERT ON items
+    BEGIN
+        INSERT INTO items_fts (rowid, korean, english, dictionary_form, notes, tags)
+        VALUES (NEW.id, COALESCE(NEW.korean, '') || '  ', COALESCE(NEW.english, '') || '  ',
+                COALESCE(NEW.dictionary_form, '') || '  ', COALESCE(NEW.notes, '') || '  ',
+                COALESCE(NEW.tags, '') || '  ');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_fts_item_update
+    AFTER UPDATE OF korean, english, dictionary_form, notes, tags ON items
+    BEGIN
+        UPDATE items_fts SET
+            korean = COALESCE(NEW.korean, '') || '  ', english = COALESCE(NEW.english, '') || '  ',
+            dictionary_form = COALESCE(NEW.dictionary_form, '') || '  ',
+            notes = COALESCE(NEW.notes, '') || '  ', tags = COALESCE(NEW.tags, '') || '  '
+        WHERE rowid = NEW.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_fts_item_delete AFTER DELETE ON items
+    BEGIN
+        DELETE FROM items_fts WHERE rowid = OLD.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_fts_sentence_insert AFTER INSERT ON sentences
+    BEGIN
+        INSERT INTO sentences_fts (rowid, korean, english)
+        VALUES (NEW.id, COALESCE(NEW.korean, '') || '  ', COALESCE(NEW.english, '') || '  ');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_fts_sentence_update AFTER UPDATE OF korean, english ON sentences
+    BEGIN
+        UPDATE sentences_fts SET
+            korean = COALESCE(NEW.korean, '') || '  ', english = COALESCE(NEW.english, '') || '  '
+        WHERE rowid = NEW.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_fts_sentence_delete AFTER DELETE ON sentences
+    BEGIN
+        DELETE FROM sentences_fts WHERE rowid = OLD.id;
+    END;
+    """,
 ]
 
 # Post-migration Python logic (runs after SQL for each migration index)
@@ -436,17 +854,259 @@ async def _run_migration_4(db):
     )
 
 
-_MIGRATION_RUNNERS = {1: _run_migration_1, 3: _run_migration_3, 4: _run_migration_4}
+async def _run_migration_10(db):
+    """Add student_daily_stats.practiced_items and backfill the migration 9/10 rollups."""
+    cols = await db.execute_fetchall("PRAGMA table_info(student_daily_stats)")
+    if "practiced_items" not in {c[1] for c in cols}:
+        await db.execute(
+            "ALTER TABLE student_daily_stats ADD COLUMN practiced_items INTEGER NOT NULL DEFAULT 0"
+        )
+    await db.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_rollup_practiced_insert AFTER INSERT ON encounters
+           WHEN NEW.first_practiced IS NOT NULL
+           BEGIN
+               INSERT INTO student_daily_stats (student_id, day, practiced_items)
+               VALUES (NEW.student_id, date(NEW.first_practiced), 1)
+               ON CONFLICT(student_id, day) DO UPDATE SET practiced_items = practiced_items + 1;
+           END"""
+    )
+    await db.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_rollup_practiced_update
+           AFTER UPDATE OF first_practiced ON encounters
+           WHEN OLD.first_practiced IS NOT NEW.first_practiced
+           BEGIN
+               UPDATE student_daily_stats SET practiced_items = practiced_items - 1
+               WHERE student_id = OLD.student_id AND day = date(OLD.first_practiced);
+               INSERT INTO student_daily_stats (student_id, day, practiced_items)
+               SELECT NEW.student_id, date(NEW.first_practiced), 1 WHERE NEW.first_practiced IS NOT NULL
+               ON CONFLICT(student_id, day) DO UPDATE SET practiced_items = practiced_items + 1;
+           END"""
+    )
+    await db.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_rollup_practiced_delete AFTER DELETE ON encounters
+           WHEN OLD.first_practiced IS NOT NULL
+           BEGIN
+               UPDATE student_daily_stats SET practiced_items = practiced_items - 1
+               WHERE student_id = OLD.student_id AND day = date(OLD.first_practiced);
+           END"""
+    )
+    await rebuild_stats_rollups(db)
+
+
+async def _run_migration_11(db):
+    """Backfill student_level_sums from mastery."""
+    await rebuild_level_sums(db)
+
+
+async def _run_migration_13(db):
+    """Backfill practice_log_items from the practice_log JSON columns."""
+    await backfill_practice_log_items(db)
+
+
+async def _run_migration_14(db):
+    """Backfill item_events from practice_log_items."""
+    await backfill_item_events(db)
+
+
+async def _run_migration_15(db):
+    """Add items.example_count and sentences.link_count, kept current by triggers."""
+    cols = await db.execute_fetchall("PRAGMA table_info(items)")
+    if "example_count" not in {c[1] for c in cols}:
+        await db.execute("ALTER TABLE items ADD COLUMN example_count INTEGER NOT NULL DEFAULT 0")
+    cols = await db.execute_fetchall("PRAGMA table_info(sentences)")
+    if "link_count" not in {c[1] for c in cols}:
+        await db.execute("ALTER TABLE sentences ADD COLUMN link_count INTEGER NOT NULL DEFAULT 0")
+    await db.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_count_example_insert AFTER INSERT ON examples
+        BEGIN
+            UPDATE items SET example_count = example_count + 1 WHERE id = NEW.item_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_count_example_delete AFTER DELETE ON examples
+        BEGIN
+            UPDATE items SET example_count = example_count - 1 WHERE id = OLD.item_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_count_example_move AFTER UPDATE OF item_id ON examples
+        WHEN OLD.item_id IS NOT NEW.item_id
+        BEGIN
+            UPDATE items SET example_count = example_count - 1 WHERE id = OLD.item_id;
+            UPDATE items SET example_count = example_count + 1 WHERE id = NEW.item_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_count_link_insert AFTER INSERT ON sentence_items
+        BEGIN
+            UPDATE sentences SET link_count = link_count + 1 WHERE id = NEW.sentence_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_count_link_delete AFTER DELETE ON sentence_items
+        BEGIN
+            UPDATE sentences SET link_count = link_count - 1 WHERE id = OLD.sentence_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_count_link_move AFTER UPDATE OF sentence_id ON sentence_items
+        WHEN OLD.sentence_id IS NOT NEW.sentence_id
+        BEGIN
+            UPDATE sentences SET link_count = link_count - 1 WHERE id = OLD.sentence_id;
+            UPDATE sentences SET link_count = link_count + 1 WHERE id = NEW.sentence_id;
+        END;
+        """
+    )
+    await rebuild_link_counts(db)
+
+
+async def _run_migration_16(db):
+    """Index the existing items and sentences for full-text search."""
+    await rebuild_search_index(db)
+
 
+_MIGRATION_RUNNERS = {1: _run_migration_1, 3: _run_migration_3, 4: _run_migration_4,
+                      10: _run_migration_10, 11: _run_migration_11, 13: _run_migration_13,
+                      14: _run_migration_14, 15: _run_migration_15, 16: _run_migration_16}
 
-async def get_db() -> aiosqlite.Connection:
+
+async def connect(read_only: bool = False) -> aiosqlite.Connection:
+    """Open a standalone connection with the app's pragmas applied.
+
+    Request handlers should use the pool (get_db / get_write_db dependencies, or
+    read_connection() / write_connection()); this is for init_db and scripts.
+    """
     db = await aiosqlite.connect(DATABASE_PATH)
     db.row_factory = aiosqlite.Row
     await db.execute("PRAGMA journal_mode=WAL")
     await db.execute("PRAGMA foreign_keys=ON")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    await db.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    await db.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    await db.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        await db.execute("PRAGMA query_only=ON")
     return db
 
 
+class ConnectionPool:
+    """Long-lived SQLite connections: a bounded set of readers plus one writer.
+
+    WAL mode lets readers run concurrently with the writer. Writes are serialized
+    through a single connection guarded by an asyncio.Lock, so requests never
+    contend on SQLite's file lock and never pay connect/thread startup costs.
+    """
+
+    def __init__(self, size: int = DB_READ_POOL_SIZE):
+        self.size = max(1, size)
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all_readers: list[aiosqlite.Connection] = []
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+
+    async def open(self):
+        self._writer = await connect()
+        for _ in range(self.size):
+            conn = await connect(read_only=True)
+            self._all_readers.append(conn)
+            self._readers.put_nowait(conn)
+        await item_index.load(self._writer)
+
+    async def close(self):
+        for conn in self._all_readers:
+            await conn.close()
+        self._all_readers.clear()
+        self._readers = asyncio.Queue()
+        if self._writer:
+            await self._writer.close()
+            self._writer = None
+        item_index.unload()
+        due_queue.reset()
+
+    @asynccontextmanager
+    async def reader(self):
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        async with self._write_lock:
+            try:
+                yield self._writer
+            finally:
+                # Never leak an uncommitted transaction to the next request
+                rolled_back = self._writer.in_transaction
+                if rolled_back:
+                    await self._writer.rollback()
+                    # Cached settings may reflect the discarded writes
+                    invalidate_settings_cache()
+                await item_index.end_transaction(self._writer, rolled_back)
+                due_queue.end_transaction(rolled_back)
+
+
+async def rollback_write(db: aiosqlite.Connection):
+    """
+    Discard the writer's open transaction mid-request, along with the in-memory
+    state it touched (settings cache, item index, due queues). A bare
+    db.rollback() leaves those reflecting the discarded writes, because the pool
+    only reconciles them for a transaction still open at release.
+    """
+    await db.rollback()
+    invalidate_settings_cache()
+    await item_index.end_transaction(db, True)
+    due_queue.end_transaction(True)
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = asyncio.Lock()
+
+
+async def open_pool():
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            pool = ConnectionPool()
+            await pool.open()
+            _pool = pool
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+
+
+@asynccontextmanager
+async def read_connection():
+    """Borrow a pooled read-only connection. Don't nest inside another reader."""
+    pool = _pool or await open_pool()
+    async with pool.reader() as db:
+        yield db
+
+
+@asynccontextmanager
+async def write_connection():
+    """Hold the single writer connection. Keep the block short — no network I/O."""
+    pool = _pool or await open_pool()
+    async with pool.writer() as db:
+        yield db
+
+
+async def get_db():
+    """FastAPI dependency: pooled read-only connection for the request."""
+    async with read_connection() as db:
+        yield db
+
+
+async def get_write_db():
+    """FastAPI dependency: the serialized writer connection for the request."""
+    async with write_connection() as db:
+        yield db
+
+
 async def _get_schema_version(db) -> int:
     try:
         rows = await db.execute_fetchall(
@@ -485,7 +1145,7 @@ async def _run_migrations(db):
 
 async def init_db():
     DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    db = await get_db()
+    db = await connect()
     try:
         await db.executescript(SCHEMA)
         await db.commit()
@@ -494,44 +1154,94 @@ async def init_db():
         await db.close()
 
 
-async def get_setting(key: str, env_fallback: str = "", student_id=None) -> str:
-    """Get a setting from DB, falling back to env_fallback."""
+# --- Settings cache ---
+# Write-through cache of settings rows keyed by (key, student_id); student_id 0 is
+# global. None records a known-missing row so fallbacks don't hit the DB either.
+# set_setting() updates it in place; a rolled-back write clears it (see
+# ConnectionPool.writer). Safe because the app runs as a single process.
+
+_settings_cache: dict[tuple[str, int], str | None] = {}
+_settings_generation = 0
+
+
+def invalidate_settings_cache():
+    global _settings_generation
+    _settings_cache.clear()
+    _settings_generation += 1
+
+
+async def _load_settings(db: aiosqlite.Connection, keys: list[str], student_ids: list[int]):
+    """Fill the cache for every (key, student_id) pair in one query."""
+    generation = _settings_generation
+    key_ph = ",".join("?" for _ in keys)
+    sid_ph = ",".join("?" for _ in student_ids)
+    rows = await db.execute_fetchall(
+        f"SELECT key, student_id, value FROM settings WHERE key IN ({key_ph}) AND student_id IN ({sid_ph})",
+        list(keys) + list(student_ids)
+    )
+    if generation != _settings_generation:
+        # A write landed while we were reading; don't cache a possibly stale snapshot
+        return {(r[0], r[1]): r[2] for r in rows}
+    found = {(r[0], r[1]): r[2] for r in rows}
+    for key in keys:
+        for sid in student_ids:
+            _settings_cache[(key, sid)] = found.get((key, sid))
+    return found
+
+
+async def get_settings_many(keys: list[str], student_id=None, defaults: dict | None = None,
+                            db=None) -> dict[str, str]:
+    """Resolve several settings at once: student-specific, then global, then defaults.
+
+    Cached values are served without touching the DB; misses are loaded in a
+    single query. Pass the caller's connection as db to avoid borrowing another.
+    """
+    defaults = defaults or {}
+    student_ids = [student_id, 0] if student_id else [0]
     try:
-        db = await get_db()
-        try:
-            if student_id is not None:
-                # Try student-specific first, then global fallback
-                rows = await db.execute_fetchall(
-                    "SELECT value FROM settings WHERE key = ? AND student_id = ?",
-                    (key, student_id)
-                )
-                if rows and rows[0][0]:
-                    return rows[0][0]
-                # Fall through to global
-            rows = await db.execute_fetchall(
-                "SELECT value FROM settings WHERE key = ? AND student_id = 0",
-                (key,)
-            )
-            if rows and rows[0][0]:
-                return rows[0][0]
-        finally:
-            await db.close()
+        missing = [k for k in keys if any((k, sid) not in _settings_cache for sid in student_ids)]
+        loaded = {}
+        if missing:
+            if db is None:
+                async with read_connection() as conn:
+                    loaded = await _load_settings(conn, missing, student_ids)
+            else:
+                loaded = await _load_settings(db, missing, student_ids)
     except Exception:
-        pass
-    return env_fallback
+        return {k: defaults.get(k, "") for k in keys}
+
+    result = {}
+    for key in keys:
+        value = None
+        for sid in student_ids:
+            candidate = loaded.get((key, sid)) if key in missing else _settings_cache.get((key, sid))
+            if candidate:
+                value = candidate
+                break
+        result[key] = value if value else defaults.get(key, "")
+    return result
 
 
-async def set_setting(key: str, value: str, student_id: int = 0):
-    """Write a setting to the DB."""
-    db = await get_db()
-    try:
-        await db.execute(
-            "INSERT OR REPLACE INTO settings (key, value, student_id) VALUES (?, ?, ?)",
-            (key, value, student_id)
-        )
-        await db.commit()
-    finally:
-        await db.close()
+async def get_setting(key: str, env_fallback: str = "", student_id=None, db=None) -> str:
+    """Get a setting from DB, falling back to env_fallback."""
+    values = await get_settings_many([key], student_id, {key: env_fallback}, db=db)
+    return values[key]
+
+
+async def set_setting(key: str, value: str, student_id: int = 0, db=None):
+    """Write a setting to the DB. If db is given, the caller commits."""
+    global _settings_generation
+    if db is None:
+        async with write_connection() as conn:
+            await set_setting(key, value, student_id, db=conn)
+            await conn.commit()
+        return
+    await db.execute(
+        "INSERT OR REPLACE INTO settings (key, value, student_id) VALUES (?, ?, ?)",
+        (key, value, student_id)
+    )
+    _settings_cache[(key, student_id)] = value
+    _settings_generation += 1
 
 
 async def check_duplicate_item(db: aiosqlite.Connection, korean: str):
@@ -550,6 +1260,8 @@ async def delete_items_by_ids(db: aiosqlite.Connection, item_ids: list[int]) ->
     cursor = await db.execute(
         f"DELETE FROM items WHERE id IN ({placeholders})", item_ids
     )
+    item_index.remove_items(item_ids)
+    due_queue.remove_items(item_ids)
     return cursor.rowcount
 
 
@@ -567,6 +1279,11 @@ async def insert_item(db: aiosqlite.Connection, korean: str, english: str,
         (korean, english, item_type, topik_level, source, json.dumps(tags), notes,
          pos, dictionary_form, grammar_category)
     )
+    item_index.add_item({
+        "id": cursor.lastrowid, "korean": korean, "english": english,
+        "dictionary_form": dictionary_form, "item_type": item_type,
+        "topik_level": topik_level, "pos": pos,
+    })
     return cursor.lastrowid
 
 
@@ -580,6 +1297,7 @@ async def ensure_student_item_state(db: aiosqlite.Connection, item_id: int, stud
         "INSERT OR IGNORE INTO mastery (item_id, student_id) VALUES (?, ?)",
         (item_id, student_id)
     )
+    due_queue.add_new_items(student_id, [item_id])
 
 
 async def insert_sentence(db: aiosqlite.Connection, korean: str, english: str,
@@ -680,35 +1398,26 @@ async def update_item_metrics(db: aiosqlite.Connection, student_id: int, item_id
 
 
 async def calculate_student_level(db: aiosqlite.Connection, student_id: int) -> float:
-    """Calculate estimated TOPIK level from mastery scores. Returns e.g. 2.3."""
+    """
+    Calculate estimated TOPIK level from mastery scores. Returns e.g. 2.3.
+    Reads the per-level sums kept by triggers (see student_level_sums), and
+    records a history row only when the estimate changed or the last one is
+    older than LEVEL_HISTORY_INTERVAL_HOURS.
+    """
     rows = await db.execute_fetchall(
-        """SELECT i.topik_level, m.overall_score, m.practice_count
-           FROM mastery m
-           JOIN items i ON i.id = m.item_id
-           WHERE m.student_id = ? AND m.practice_count > 0""",
+        """SELECT topik_level, score_sum, weight_sum FROM student_level_sums
+           WHERE student_id = ? AND weight_sum > 0
+           ORDER BY topik_level""",
         (student_id,)
     )
     if not rows:
         return 1.0
 
-    # Weighted score per level
-    level_scores = {}  # level -> (total_weighted_score, total_weight)
-    for topik_level, score, practice_count in rows:
-        weight = min(practice_count, 10)  # cap weight at 10 practices
-        if topik_level not in level_scores:
-            level_scores[topik_level] = [0.0, 0.0]
-        level_scores[topik_level][0] += score * weight
-        level_scores[topik_level][1] += weight
-
-    # Average mastery per level
-    level_mastery = {}
-    for level, (total_score, total_weight) in level_scores.items():
-        level_mastery[level] = total_score / total_weight if total_weight else 0
-
     # Estimated level: highest level where mastery >= 0.5, plus fractional from next
     estimated = 1.0
-    for level in sorted(level_mastery.keys()):
-        mastery = level_mastery[level]
+    for level, total_score, total_weight in rows:
+        # Rounded so running-sum drift can't flip the 0.5 threshold
+        mastery = round(total_score / total_weight, 9)
         if mastery >= 0.5:
             estimated = float(level)
             # Add fractional part from mastery above threshold
@@ -718,15 +1427,302 @@ async def calculate_student_level(db: aiosqlite.Connection, student_id: int) ->
             estimated = float(level - 1) + mastery
             break
 
-    estimated = max(1.0, min(6.0, estimated))
+    estimated = round(max(1.0, min(6.0, estimated)), 2)
 
     # Record in history
+    last = await db.execute_fetchall(
+        """SELECT estimated_level, level_calculated_at > datetime('now', ?)
+           FROM student_stats_rollup WHERE student_id = ?""",
+        (f"-{LEVEL_HISTORY_INTERVAL_HOURS} hours", student_id)
+    )
+    if not last or last[0][0] != estimated or not last[0][1]:
+        await db.execute(
+            "INSERT INTO student_level_history (student_id, estimated_level) VALUES (?, ?)",
+            (student_id, estimated)
+        )
+
+    return estimated
+
+
+async def rebuild_level_sums(db: aiosqlite.Connection, student_id: int | None = None):
+    """Recompute student_level_sums from mastery (all students or one). The caller commits."""
+    where = "WHERE student_id = ?" if student_id is not None else ""
+    params = (student_id,) if student_id is not None else ()
+    await db.execute(f"DELETE FROM student_level_sums {where}", params)
+    await db.execute(
+        f"""INSERT INTO student_level_sums (student_id, topik_level, score_sum, weight_sum)
+            SELECT m.student_id, i.topik_level,
+                   SUM(COALESCE(m.overall_score, 0) * MIN(m.practice_count, 10)),
+                   SUM(MIN(m.practice_count, 10))
+            FROM mastery m
+            JOIN items i ON i.id = m.item_id
+            WHERE m.practice_count > 0 AND i.topik_level IS NOT NULL
+                  {"AND m.student_id = ?" if student_id is not None else ""}
+            GROUP BY m.student_id, i.topik_level""",
+        params
+    )
+
+
+async def insert_practice_log_items(db: aiosqlite.Connection, log_id: int, student_id: int,
+                                    items: list[tuple[int, str | None, float | None, str | None]]):
+    """
+    Link a practice_log row to the items it touched, in the caller's transaction.
+    items: [(item_id, status, score, encounter_type)] in display order; ids that
+    are not (or no longer) in items are skipped.
+    """
+    await db.executemany(
+        """INSERT OR IGNORE INTO practice_log_items
+               (log_id, item_id, student_id, position, status, score, encounter_type)
+           SELECT ?, id, ?, ?, ?, ?, ? FROM items WHERE id = ?""",
+        [(log_id, student_id, position, status, score, encounter_type, item_id)
+         for position, (item_id, status, score, encounter_type) in enumerate(items)]
+    )
+
+
+async def backfill_practice_log_items(db: aiosqlite.Connection):
+    """
+    Create practice_log_items rows for practice_log rows that have none, from
+    item_ids. Status and score come from feedback_json where it still says
+    (items_used/grammar_used for speaking, card_ratings for reading); rows
+    without feedback get NULLs. The caller commits.
+    """
+    await db.execute(
+        """WITH logs AS (
+               SELECT id, student_id, practice_mode,
+                      CASE WHEN json_valid(item_ids) THEN item_ids ELSE '[]' END AS item_ids,
+                      CASE WHEN json_valid(feedback_json) THEN feedback_json END AS feedback
+               FROM practice_log p
+               WHERE NOT EXISTS (SELECT 1 FROM practice_log_items x WHERE x.log_id = p.id)
+           ), links AS (
+               SELECT p.id AS log_id, i.id AS item_id, p.student_id, j.key AS position,
+                      p.practice_mode,
+                      CASE WHEN p.practice_mode = 'reading' THEN
+                          (SELECT json_extract(r.value, '$.confidence')
+                           FROM json_each(p.feedback, '$.card_ratings') r
+                           WHERE json_extract(r.value, '$.item_id') = i.id)
+                      END AS confidence,
+                      CASE WHEN p.practice_mode IS NOT 'reading' AND p.feedback IS NOT NULL THEN
+                          COALESCE(
+                              (SELECT json_extract(v.value, '$.status')
+                               FROM json_each(p.feedback, '$.items_used') v
+                               WHERE i.item_type = 'vocab'
+                                     AND json_extract(v.value, '$.korean') IN (i.korean, i.dictionary_form)),
+                              (SELECT json_extract(g.value, '$.status')
+                               FROM json_each(p.feedback, '$.grammar_used') g
+                               WHERE i.item_type = 'grammar'
+                                     AND json_extract(g.value, '$.pattern') IN (i.korean, i.dictionary_form)),
+                              'missing')
+                      END AS status
+               FROM logs p
+               JOIN json_each(p.item_ids) j
+               JOIN items i ON i.id = j.value
+           )
+           INSERT OR IGNORE INTO practice_log_items
+               (log_id, item_id, student_id, position, status, score, encounter_type)
+           SELECT log_id, item_id, student_id, position,
+                  CASE WHEN practice_mode = 'reading'
+                       THEN CASE confidence WHEN 1 THEN 'hard' WHEN 3 THEN 'easy' ELSE 'good' END
+                       ELSE status END,
+                  CASE WHEN practice_mode = 'reading'
+                       THEN CASE confidence WHEN 1 THEN 0.4 WHEN 3 THEN 1.0 ELSE 0.7 END
+                       ELSE CASE status WHEN 'correct' THEN 1.0 WHEN 'wrong_form' THEN 0.5
+                                        WHEN 'incorrect' THEN 0.0 WHEN 'missing' THEN 0.0 END
+                       END,
+                  CASE status WHEN 'correct' THEN 'used_correctly'
+                              WHEN 'wrong_form' THEN 'used_incorrectly'
+                              WHEN 'incorrect' THEN 'used_incorrectly'
+                              WHEN 'missing' THEN 'missing' END
+           FROM links"""
+    )
+
+
+async def record_item_events(db: aiosqlite.Connection, student_id: int,
+                             events: list[tuple[int, str, float | None, float | None,
+                                                float | None, float | None]],
+                             log_id: int | None = None):
+    """
+    Append one item_events row per attempt, in the caller's transaction.
+    events: [(item_id, event_type, score, grammar_score, vocab_score, formality_score)];
+    ids that are not (or no longer) in items are skipped.
+    """
+    await db.executemany(
+        """INSERT INTO item_events
+               (student_id, item_id, event_type, score, grammar_score, vocab_score,
+                formality_score, log_id)
+           SELECT ?, id, ?, ?, ?, ?, ?, ? FROM items WHERE id = ?""",
+        [(student_id, event_type, score, grammar, vocab, formality, log_id, item_id)
+         for item_id, event_type, score, grammar, vocab, formality in events]
+    )
+
+
+async def backfill_item_events(db: aiosqlite.Connection):
+    """
+    Create item_events rows for practice_log_items rows that have none, timed
+    at the session's created_at. Sub-scores weren't kept before, so they are
+    NULL; attempts without a recorded outcome get event_type 'practiced'.
+    The caller commits.
+    """
+    await db.execute(
+        """INSERT INTO item_events (student_id, item_id, ts, event_type, score, log_id)
+           SELECT pli.student_id, pli.item_id, p.created_at,
+                  CASE WHEN p.practice_mode = 'reading' THEN 'reviewed'
+                       ELSE COALESCE(pli.encounter_type, 'practiced') END,
+                  pli.score, pli.log_id
+           FROM practice_log_items pli
+           JOIN practice_log p ON p.id = pli.log_id
+           WHERE NOT EXISTS (SELECT 1 FROM item_events e
+                             WHERE e.student_id = pli.student_id AND e.item_id = pli.item_id
+                                   AND e.log_id = pli.log_id)
+           ORDER BY p.created_at, pli.log_id, pli.position"""
+    )
+
+
+def _event_dict(r) -> dict:
+    return {"item_id": r[0], "ts": r[1], "event_type": r[2], "score": r[3],
+            "grammar_score": r[4], "vocab_score": r[5], "formality_score": r[6],
+            "log_id": r[7]}
+
+
+async def get_item_events(db: aiosqlite.Connection, student_id: int, item_id: int,
+                          since: str | None = None, until: str | None = None) -> list[dict]:
+    """One student's events for one item with since <= ts < until, oldest first."""
+    rows = await db.execute_fetchall(
+        """SELECT item_id, ts, event_type, score, grammar_score, vocab_score,
+                  formality_score, log_id
+           FROM item_events
+           WHERE student_id = ? AND item_id = ? AND ts >= ? AND ts < ?
+           ORDER BY ts, id""",
+        (student_id, item_id, since or "", until or "9999")
+    )
+    return [_event_dict(r) for r in rows]
+
+
+async def get_items_events(db: aiosqlite.Connection, student_id: int, item_ids: list[int],
+                           since: str | None = None, until: str | None = None) -> dict[int, list[dict]]:
+    """get_item_events for several items in one query: {item_id: [event, ...]}."""
+    if not item_ids:
+        return {}
+    placeholders = ",".join("?" * len(item_ids))
+    rows = await db.execute_fetchall(
+        f"""SELECT item_id, ts, event_type, score, grammar_score, vocab_score,
+                   formality_score, log_id
+            FROM item_events
+            WHERE student_id = ? AND item_id IN ({placeholders}) AND ts >= ? AND ts < ?
+            ORDER BY ts, id""",
+        [student_id, *item_ids, since or "", until or "9999"]
+    )
+    events = {}
+    for r in rows:
+        events.setdefault(r[0], []).append(_event_dict(r))
+    return events
+
+
+async def rebuild_link_counts(db: aiosqlite.Connection):
+    """Recompute items.example_count and sentences.link_count. The caller commits."""
+    await db.execute(
+        """UPDATE items SET example_count =
+               (SELECT COUNT(*) FROM examples e WHERE e.item_id = items.id)"""
+    )
     await db.execute(
-        "INSERT INTO student_level_history (student_id, estimated_level) VALUES (?, ?)",
-        (student_id, round(estimated, 2))
+        """UPDATE sentences SET link_count =
+               (SELECT COUNT(*) FROM sentence_items si WHERE si.sentence_id = sentences.id)"""
     )
 
-    return round(estimated, 2)
+
+async def rebuild_search_index(db: aiosqlite.Connection):
+    """Re-index every item and sentence in items_fts / sentences_fts. The caller commits."""
+    await db.execute("DELETE FROM items_fts")
+    await db.execute(
+        """INSERT INTO items_fts (rowid, korean, english, dictionary_form, notes, tags)
+           SELECT id, COALESCE(korean, '') || '  ', COALESCE(english, '') || '  ',
+                  COALESCE(dictionary_form, '') || '  ', COALESCE(notes, '') || '  ',
+                  COALESCE(tags, '') || '  '
+           FROM items"""
+    )
+    await db.execute("DELETE FROM sentences_fts")
+    await db.execute(
+        """INSERT INTO sentences_fts (rowid, korean, english)
+           SELECT id, COALESCE(korean, '') || '  ', COALESCE(english, '') || '  ' FROM sentences"""
+    )
+
+
+async def rebuild_stats_rollups(db: aiosqlite.Connection, student_id: int | None = None):
+    """
+    Recompute student_stats_rollup and student_daily_stats from the source
+    tables, for one student or everyone. The triggers from migrations 9-10 keep
+    them current afterwards; this is for backfills and repairs. Runs on the
+    caller's connection; the caller commits.
+    """
+    where = "WHERE student_id = ?" if student_id is not None else ""
+    params = (student_id,) if student_id is not None else ()
+    await db.execute(f"DELETE FROM student_stats_rollup {where}", params)
+    await db.execute(f"DELETE FROM student_daily_stats {where}", params)
+
+    await db.execute(
+        f"""INSERT INTO student_stats_rollup
+                (student_id, practice_count, study_seconds, last_practice, items_encountered,
+                 mastered, learning, struggling, unseen, estimated_level, level_calculated_at)
+            SELECT student_id,
+                   (SELECT COUNT(*) FROM practice_log p WHERE p.student_id = ids.student_id),
+                   (SELECT COALESCE(SUM(duration_seconds), 0) FROM practice_log p
+                    WHERE p.student_id = ids.student_id),
+                   (SELECT MAX(created_at) FROM practice_log p WHERE p.student_id = ids.student_id),
+                   (SELECT COUNT(*) FROM encounters e WHERE e.student_id = ids.student_id),
+                   COALESCE(m.mastered, 0), COALESCE(m.learning, 0),
+                   COALESCE(m.struggling, 0), COALESCE(m.unseen, 0),
+                   l.estimated_level, l.calculated_at
+            FROM (SELECT student_id FROM practice_log UNION SELECT student_id FROM encounters
+                  UNION SELECT student_id FROM mastery
+                  UNION SELECT student_id FROM student_level_history) ids
+            LEFT JOIN (
+                SELECT student_id,
+                       SUM(CASE WHEN overall_score >= 0.8 THEN 1 ELSE 0 END) AS mastered,
+                       SUM(CASE WHEN overall_score >= 0.5 AND overall_score < 0.8 THEN 1 ELSE 0 END) AS learning,
+                       SUM(CASE WHEN overall_score < 0.5 AND practice_count > 0 THEN 1 ELSE 0 END) AS struggling,
+                       SUM(CASE WHEN practice_count = 0 THEN 1 ELSE 0 END) AS unseen
+                FROM mastery GROUP BY student_id
+            ) m USING (student_id)
+            LEFT JOIN (
+                SELECT student_id, estimated_level, calculated_at FROM (
+                    SELECT student_id, estimated_level, calculated_at,
+                           ROW_NUMBER() OVER (PARTITION BY student_id
+                                              ORDER BY calculated_at DESC, id DESC) AS n
+                    FROM student_level_history
+                ) WHERE n = 1
+            ) l USING (student_id)
+            {where}""",
+        params
+    )
+
+    await db.execute(
+        f"""INSERT INTO student_daily_stats
+                (student_id, day, session_count, scored_count, score_sum, study_seconds)
+            SELECT student_id, date(created_at), COUNT(*), COUNT(overall_score),
+                   COALESCE(SUM(overall_score), 0), COALESCE(SUM(duration_seconds), 0)
+            FROM practice_log
+            WHERE created_at IS NOT NULL {"AND student_id = ?" if student_id is not None else ""}
+            GROUP BY student_id, date(created_at)""",
+        params
+    )
+    # WHERE is required before ON CONFLICT in INSERT ... SELECT
+    await db.execute(
+        f"""INSERT INTO student_daily_stats (student_id, day, new_items)
+            SELECT student_id, date(first_seen), COUNT(*)
+            FROM encounters
+            WHERE first_seen IS NOT NULL {"AND student_id = ?" if student_id is not None else ""}
+            GROUP BY student_id, date(first_seen)
+            ON CONFLICT(student_id, day) DO UPDATE SET new_items = excluded.new_items""",
+        params
+    )
+    await db.execute(
+        f"""INSERT INTO student_daily_stats (student_id, day, practiced_items)
+            SELECT student_id, date(first_practiced), COUNT(*)
+            FROM encounters
+            WHERE first_practiced IS NOT NULL {"AND student_id = ?" if student_id is not None else ""}
+            GROUP BY student_id, date(first_practiced)
+            ON CONFLICT(student_id, day) DO UPDATE SET practiced_items = excluded.practiced_items""",
+        params
+    )
 
 
 async def insert_example(db: aiosqlite.Connection, item_id: int,
@@ -772,6 +1768,21 @@ async def upsert_curriculum_state(db: aiosqlite.Connection, student_id: int,
     )
 
 
+async def advance_curriculum_state(db: aiosqlite.Connection, student_id: int,
+                                   topik_level: int, items_added: int):
+    """Record newly introduced curriculum items in one upsert (position resets to 0)."""
+    await db.execute(
+        """INSERT INTO curriculum_state (student_id, current_topik_level, current_position,
+                                        items_introduced, updated_at)
+           VALUES (?, ?, 0, ?, CURRENT_TIMESTAMP)
+           ON CONFLICT(student_id) DO UPDATE SET
+               current_topik_level = excluded.current_topik_level, current_position = 0,
+               items_introduced = items_introduced + excluded.items_introduced,
+               updated_at = CURRENT_TIMESTAMP""",
+        (student_id, topik_level, items_added)
+    )
+
+
 async def get_sentences_for_items(db: aiosqlite.Connection, item_ids: list[int]) -> list[dict]:
     """Find sentences that contain ANY of the given item IDs, ordered by match count."""
     if not item_ids:
@@ -792,6 +1803,23 @@ async def get_sentences_for_items(db: aiosqlite.Connection, item_ids: list[int])
              "formality": r[3], "topik_level": r[4], "match_count": r[5]} for r in rows]
 
 
+async def get_examples_for_items(db: aiosqlite.Connection, item_ids: list[int]) -> dict[int, list[dict]]:
+    """Teacher example sentences for the given items, grouped by item_id."""
+    if not item_ids:
+        return {}
+    placeholders = ",".join("?" for _ in item_ids)
+    rows = await db.execute_fetchall(
+        f"SELECT item_id, korean, english, formality FROM examples WHERE item_id IN ({placeholders})",
+        item_ids
+    )
+    examples_by_item = {}
+    for r in rows:
+        examples_by_item.setdefault(r[0], []).append({
+            "korean": r[1], "english": r[2], "formality": r[3]
+        })
+    return examples_by_item
+
+
 def _extract_korean_words(text: str) -> list[str]:
     """Extract Korean character sequences from text."""
     import re
@@ -806,30 +1834,87 @@ async def find_matching_items(db: aiosqlite.Connection, korean_sentence: str) ->
     if not words:
         return []
 
-    # Get all items for matching (korean field + dictionary_form)
-    rows = await db.execute_fetchall(
-        "SELECT id, korean, dictionary_form, item_type, topik_level FROM items"
-    )
+    # Item text contains a word or a word contains it (see services/item_index.py)
+    index = await item_index.get_index(db)
+    matched_ids = set()
+    for word in set(words):
+        matched_ids |= index.match_word(word)
 
     matched = []
-    seen_ids = set()
-    for row in rows:
-        item_id, korean, dict_form, item_type, topik_level = row[0], row[1], row[2], row[3], row[4]
-        if item_id in seen_ids:
-            continue
-        # Check if item's korean or dictionary_form appears in the sentence
-        item_korean_clean = korean.replace(" ", "")
-        for word in words:
-            if word in item_korean_clean or item_korean_clean in word:
-                matched.append({"id": item_id, "korean": korean, "item_type": item_type, "topik_level": topik_level})
-                seen_ids.add(item_id)
-                break
-        if item_id not in seen_ids and dict_form:
-            dict_clean = dict_form.replace(" ", "")
-            for word in words:
-                if word in dict_clean or dict_clean in word:
-                    matched.append({"id": item_id, "korean": korean, "item_type": item_type, "topik_level": topik_level})
-                    seen_ids.add(item_id)
-                    break
-
+    for item_id in sorted(matched_ids):
+        item = index.items[item_id]
+        matched.append({"id": item_id, "korean": item["korean"],
+                        "item_type": item["item_type"], "topik_level": item["topik_level"]})
     return matched
+
+
+async def ensure_student_items_state(db: aiosqlite.Connection, item_ids: list[int], student_id: int):
+    """Batch form of ensure_student_item_state for many items at once."""
+    params = [(item_id, student_id) for item_id in item_ids]
+    if not params:
+        return
+    await db.executemany(
+        "INSERT OR IGNORE INTO srs_state (item_id, student_id) VALUES (?, ?)", params
+    )
+    await db.executemany(
+        "INSERT OR IGNORE INTO mastery (item_id, student_id) VALUES (?, ?)", params
+    )
+    due_queue.add_new_items(student_id, item_ids)
+
+
+async def find_items_by_korean(db: aiosqlite.Connection,
+                               lookups: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+    """
+    Resolve many (korean_text, item_type) pairs against the in-memory item
+    index in one pass: normalized korean or dictionary_form first, then the
+    stem of a conjugated form, then a near spelling (see
+    ItemMatchIndex.resolve). Returns {(korean_text, item_type): item}.
+    """
+    index = await item_index.get_index(db)
+    found = {}
+    for text, item_type in set(lookups):
+        item_id = index.resolve(text, item_type) if text else None
+        if item_id is not None:
+            item = index.items[item_id]
+            found[(text, item_type)] = {"id": item_id, "korean": item["korean"], "english": item["english"],
+                                        "item_type": item["item_type"], "topik_level": item["topik_level"]}
+    return found
+
+
+async def record_encounters_with_type(db: aiosqlite.Connection, student_id: int,
+                                      encounter_types: dict[int, str]):
+    """Batch form of record_encounter_with_type: {item_id: encounter_type}."""
+    if not encounter_types:
+        return
+    await db.executemany(
+        """INSERT INTO encounters (student_id, item_id, first_seen, first_practiced, encounter_type)
+           VALUES (?1, ?2, CURRENT_TIMESTAMP,
+                   CASE WHEN ?3 IN ('used_correctly', 'used_incorrectly') THEN CURRENT_TIMESTAMP ELSE NULL END,
+                   ?3)
+           ON CONFLICT(student_id, item_id) DO UPDATE SET
+               encounter_count = encounter_count + 1,
+               first_practiced = COALESCE(first_practiced,
+                   CASE WHEN ?3 IN ('used_correctly', 'used_incorrectly') THEN CURRENT_TIMESTAMP ELSE NULL END),
+               encounter_type = ?3""",
+        [(student_id, item_id, encounter_type)
+         for item_id, encounter_type in encounter_types.items()]
+    )
+
+
+async def update_items_metrics(db: aiosqlite.Connection, student_id: int,
+                               metrics: dict[int, tuple[bool, bool]]):
+    """
+    Batch form of update_item_metrics: {item_id: (was_used, was_error)}.
+    Assumes state rows already exist (see ensure_student_items_state).
+    """
+    if not metrics:
+        return
+    await db.executemany(
+        """UPDATE mastery SET
+               exposure_count = exposure_count + 1,
+               usage_count = usage_count + ?,
+               error_count = error_count + ?
+           WHERE item_id = ? AND student_id = ?""",
+        [(int(was_used), int(was_used and was_error), item_id, student_id)
+         for item_id, (was_used, was_error) in metrics.items()]
+    )
@@ -3,9 +3,11 @@ from fastapi import FastAPI, Request, Depends
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 from app.config import BASE_DIR, AUDIO_PATH
-from app.database import init_db, get_db
+import aiosqlite
+from app.database import init_db, open_pool, close_pool, get_db, get_write_db, write_connection
 from app.auth import require_auth, require_teacher, verify_teacher_password, set_session_cookie, get_session_info, COOKIE_NAME
 from app.models import LoginRequest, StudentLoginRequest, StudentCreate
+from app.services import due_queue
 
 
 @asynccontextmanager
@@ -13,11 +15,18 @@ async def lifespan(app: FastAPI):
     import logging
     logging.basicConfig(level=logging.INFO)
     await init_db()
+    await open_pool()
     AUDIO_PATH.mkdir(parents=True, exist_ok=True)
+    from app.services.prompt_pool import start_worker, stop_worker
+    start_worker()
     from app.bots.telegram_bot import start_telegram_bot, stop_telegram_bot
     await start_telegram_bot()
     yield
     await stop_telegram_bot()
+    await stop_worker()
+    from app.services.openai_service import close_clients
+    await close_clients()
+    await close_pool()
 
 
 app = FastAPI(title="Korean Learning App", lifespan=lifespan)
@@ -26,24 +35,20 @@ app = FastAPI(title="Korean Learning App", lifespan=lifespan)
 # --- Auth routes (public) ---
 
 @app.post("/api/login")
-async def login(req: StudentLoginRequest):
+async def login(req: StudentLoginRequest, db: aiosqlite.Connection = Depends(get_db)):
     import bcrypt
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            "SELECT id, password_hash FROM students WHERE username = ?",
-            (req.username,)
-        )
-        if not rows:
-            return JSONResponse({"error": "Invalid credentials"}, status_code=401)
-        student_id, pw_hash = rows[0][0], rows[0][1]
-        if not pw_hash or not bcrypt.checkpw(req.password.encode(), pw_hash.encode()):
-            return JSONResponse({"error": "Invalid credentials"}, status_code=401)
-        resp = JSONResponse({"ok": True, "role": "student", "student_id": student_id})
-        set_session_cookie(resp, role="student", student_id=student_id)
-        return resp
-    finally:
-        await db.close()
+    rows = await db.execute_fetchall(
+        "SELECT id, password_hash FROM students WHERE username = ?",
+        (req.username,)
+    )
+    if not rows:
+        return JSONResponse({"error": "Invalid credentials"}, status_code=401)
+    student_id, pw_hash = rows[0][0], rows[0][1]
+    if not pw_hash or not bcrypt.checkpw(req.password.encode(), pw_hash.encode()):
+        return JSONResponse({"error": "Invalid credentials"}, status_code=401)
+    resp = JSONResponse({"ok": True, "role": "student", "student_id": student_id})
+    set_session_cookie(resp, role="student", student_id=student_id)
+    return resp
 
 
 @app.post("/api/login/teacher")
@@ -63,22 +68,18 @@ async def logout():
 
 
 @app.get("/api/auth/check")
-async def auth_check(request: Request):
+async def auth_check(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     role, student_id = get_session_info(request)
     if role:
         result = {"authenticated": True, "role": role}
         if role == "student" and student_id:
-            db = await get_db()
-            try:
-                rows = await db.execute_fetchall(
-                    "SELECT username, display_name FROM students WHERE id = ?", (student_id,)
-                )
-                if rows:
-                    result["student_id"] = student_id
-                    result["username"] = rows[0][0]
-                    result["display_name"] = rows[0][1]
-            finally:
-                await db.close()
+            rows = await db.execute_fetchall(
+                "SELECT username, display_name FROM students WHERE id = ?", (student_id,)
+            )
+            if rows:
+                result["student_id"] = student_id
+                result["username"] = rows[0][0]
+                result["display_name"] = rows[0][1]
         return result
     return JSONResponse({"authenticated": False}, status_code=401)
 
@@ -93,46 +94,38 @@ async def health():
 # --- Student management (teacher only) ---
 
 @app.get("/api/students", dependencies=[Depends(require_teacher)])
-async def list_students():
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            "SELECT id, username, display_name, created_at FROM students ORDER BY id"
-        )
-        return {"students": [{"id": r[0], "username": r[1], "display_name": r[2], "created_at": r[3]} for r in rows]}
-    finally:
-        await db.close()
+async def list_students(db: aiosqlite.Connection = Depends(get_db)):
+    rows = await db.execute_fetchall(
+        "SELECT id, username, display_name, created_at FROM students ORDER BY id"
+    )
+    return {"students": [{"id": r[0], "username": r[1], "display_name": r[2], "created_at": r[3]} for r in rows]}
 
 
 @app.post("/api/students", dependencies=[Depends(require_teacher)])
 async def create_student(req: StudentCreate):
     import bcrypt
+    # Hash before taking the writer so bcrypt doesn't hold up other writes
     pw_hash = bcrypt.hashpw(req.password.encode(), bcrypt.gensalt()).decode()
-    db = await get_db()
-    try:
-        cursor = await db.execute(
-            "INSERT INTO students (username, display_name, password_hash) VALUES (?, ?, ?)",
-            (req.username, req.display_name, pw_hash)
-        )
-        await db.commit()
-        return {"id": cursor.lastrowid, "username": req.username}
-    except Exception as e:
-        if "UNIQUE" in str(e):
-            return JSONResponse({"error": "Username already exists"}, status_code=409)
-        raise
-    finally:
-        await db.close()
+    async with write_connection() as db:
+        try:
+            cursor = await db.execute(
+                "INSERT INTO students (username, display_name, password_hash) VALUES (?, ?, ?)",
+                (req.username, req.display_name, pw_hash)
+            )
+            await db.commit()
+            return {"id": cursor.lastrowid, "username": req.username}
+        except Exception as e:
+            if "UNIQUE" in str(e):
+                return JSONResponse({"error": "Username already exists"}, status_code=409)
+            raise
 
 
 @app.delete("/api/students/{student_id}", dependencies=[Depends(require_teacher)])
-async def delete_student(student_id: int):
-    db = await get_db()
-    try:
-        await db.execute("DELETE FROM students WHERE id = ?", (student_id,))
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+async def delete_student(student_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
+    await db.execute("DELETE FROM students WHERE id = ?", (student_id,))
+    due_queue.drop_student(student_id)
+    await db.commit()
+    return {"ok": True}
 
 
 # --- Import routers (all require auth) ---
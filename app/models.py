@@ -134,6 +134,18 @@ class SentenceCreate(BaseModel):
     notes: str = ""
 
 
+class SentenceBreakdownBatch(BaseModel):
+    sentence_ids: list[int]
+
+
+class RescheduleRequest(BaseModel):
+    action: str  # 'shift' (move next_review by days) or 'scale' (multiply intervals by factor)
+    days: float = 0
+    factor: float = 1.0
+    student_id: Optional[int] = None  # None = every student
+    due_only: bool = False
+
+
 class SettingUpdate(BaseModel):
     value: str
 
@@ -1,7 +1,8 @@
 """Student goal tracking endpoints."""
 
-from fastapi import APIRouter, Request
-from app.database import get_db
+import aiosqlite
+from fastapi import APIRouter, Request, Depends
+from app.database import get_db, get_write_db
 from app.models import GoalCreate
 from app.auth import get_student_id
 
@@ -9,102 +10,81 @@ router = APIRouter()
 
 
 @router.get("")
-async def list_goals(request: Request, active_only: bool = True):
+async def list_goals(request: Request, active_only: bool = True, db: aiosqlite.Connection = Depends(get_db)):
     """List goals for the current student with dynamically calculated progress."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        condition = "AND g.active = 1" if active_only else ""
-        rows = await db.execute_fetchall(
-            f"""SELECT g.id, g.goal_type, g.target_value, g.current_value,
-                       g.period, g.deadline, g.created_at, g.completed_at, g.active
-                FROM goals g
-                WHERE g.student_id = ? {condition}
-                ORDER BY g.active DESC, g.created_at DESC""",
-            (student_id,)
-        )
-        goals = []
-        for r in rows:
-            target = r[2]
-            current = await _calculate_goal_progress(db, student_id, r[1], r[2],
-                                                       r[4], r[5], r[6])
-            pct = min(current / target * 100, 100) if target > 0 else 0
-            goals.append({
-                "id": r[0], "goal_type": r[1], "target_value": target,
-                "current_value": current, "period": r[4],
-                "deadline": r[5], "created_at": r[6],
-                "completed_at": r[7], "active": bool(r[8]),
-                "progress_pct": round(pct, 1),
-            })
-        return {"goals": goals}
-    finally:
-        await db.close()
+    condition = "AND g.active = 1" if active_only else ""
+    rows = await db.execute_fetchall(
+        f"""SELECT g.id, g.goal_type, g.target_value, g.current_value,
+                   g.period, g.deadline, g.created_at, g.completed_at, g.active
+            FROM goals g
+            WHERE g.student_id = ? {condition}
+            ORDER BY g.active DESC, g.created_at DESC""",
+        (student_id,)
+    )
+    goals = []
+    for r in rows:
+        target = r[2]
+        current = await _calculate_goal_progress(db, student_id, r[1], r[2],
+                                                   r[4], r[5], r[6])
+        pct = min(current / target * 100, 100) if target > 0 else 0
+        goals.append({
+            "id": r[0], "goal_type": r[1], "target_value": target,
+            "current_value": current, "period": r[4],
+            "deadline": r[5], "created_at": r[6],
+            "completed_at": r[7], "active": bool(r[8]),
+            "progress_pct": round(pct, 1),
+        })
+    return {"goals": goals}
 
 
 async def _calculate_goal_progress(db, student_id, goal_type, target,
                                      period, deadline, created_at):
-    """Calculate current progress for a goal dynamically from practice_log."""
-    # Determine the time window
+    """Calculate current progress for a goal from the student's daily stats."""
+    # Determine the window in whole UTC days
     if period == "daily":
-        time_filter = "AND created_at >= datetime('now', 'start of day')"
+        day_filter, params = "AND day = date('now')", []
     elif period == "weekly":
-        time_filter = "AND created_at >= datetime('now', '-7 days')"
+        day_filter, params = "AND day > date('now', '-7 days')", []
     elif deadline:
-        time_filter = f"AND created_at >= '{created_at}' AND created_at <= '{deadline}'"
+        day_filter, params = "AND day BETWEEN date(?) AND date(?)", [created_at, deadline]
     else:
-        time_filter = f"AND created_at >= '{created_at}'"
+        day_filter, params = "AND day >= date(?)", [created_at]
 
-    if goal_type == "practice_sessions":
-        rows = await db.execute_fetchall(
-            f"SELECT COUNT(*) FROM practice_log WHERE student_id = ? {time_filter}",
-            (student_id,)
-        )
-        return rows[0][0]
-    elif goal_type == "new_items":
-        rows = await db.execute_fetchall(
-            f"""SELECT COUNT(*) FROM encounters
-                WHERE student_id = ? AND first_practiced IS NOT NULL {time_filter.replace('created_at', 'first_practiced')}""",
-            (student_id,)
-        )
-        return rows[0][0]
-    elif goal_type == "study_time":
-        rows = await db.execute_fetchall(
-            f"""SELECT COALESCE(SUM(duration_seconds), 0) / 60 FROM practice_log
-                WHERE student_id = ? {time_filter}""",
-            (student_id,)
-        )
-        return int(rows[0][0])
-    return 0
+    columns = {
+        "practice_sessions": "COALESCE(SUM(session_count), 0)",
+        "new_items": "COALESCE(SUM(practiced_items), 0)",
+        "study_time": "COALESCE(SUM(study_seconds), 0) / 60",
+    }
+    if goal_type not in columns:
+        return 0
+    rows = await db.execute_fetchall(
+        f"SELECT {columns[goal_type]} FROM student_daily_stats WHERE student_id = ? {day_filter}",
+        (student_id, *params)
+    )
+    return int(rows[0][0])
 
 
 @router.post("")
-async def create_goal(req: GoalCreate, request: Request):
+async def create_goal(req: GoalCreate, request: Request, db: aiosqlite.Connection = Depends(get_write_db)):
     """Create a new goal for the current student."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        cursor = await db.execute(
-            """INSERT INTO goals (student_id, goal_type, target_value, period, deadline)
-               VALUES (?, ?, ?, ?, ?)""",
-            (student_id, req.goal_type, req.target_value, req.period, req.deadline)
-        )
-        await db.commit()
-        return {"id": cursor.lastrowid}
-    finally:
-        await db.close()
+    cursor = await db.execute(
+        """INSERT INTO goals (student_id, goal_type, target_value, period, deadline)
+           VALUES (?, ?, ?, ?, ?)""",
+        (student_id, req.goal_type, req.target_value, req.period, req.deadline)
+    )
+    await db.commit()
+    return {"id": cursor.lastrowid}
 
 
 @router.delete("/{goal_id}")
-async def delete_goal(goal_id: int, request: Request):
+async def delete_goal(goal_id: int, request: Request, db: aiosqlite.Connection = Depends(get_write_db)):
     """Deactivate a goal (soft delete)."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        await db.execute(
-            "UPDATE goals SET active = 0 WHERE id = ? AND student_id = ?",
-            (goal_id, student_id)
-        )
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+    await db.execute(
+        "UPDATE goals SET active = 0 WHERE id = ? AND student_id = ?",
+        (goal_id, student_id)
+    )
+    await db.commit()
+    return {"ok": True}
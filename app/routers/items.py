@@ -1,13 +1,42 @@
+import aiosqlite
 from fastapi import APIRouter, Query, Depends, Request
 from fastapi.responses import JSONResponse
-from app.database import get_db, insert_item, insert_example
+from app.database import get_db, get_write_db, insert_item, insert_example
 from app.models import ItemCreate, ItemUpdate, ExampleCreate
 from app.auth import require_teacher, get_student_id
+from app.services import item_index, due_queue
+from app.services.prompt_pool import invalidate_items
+from app.services.pagination import TOTAL_MODES, after_cursor, count_rows, decode_cursor, encode_cursor
+from app.services.search import match_expression, snippet
 import json
 
 router = APIRouter()
 
 
+_ITEM_ORDER = ["i.topik_level", "i.korean", "i.id"]
+_RANKED_ORDER = ["score", "id"]
+_ITEM_COLUMNS = """i.id, i.korean, i.english, i.item_type, i.topik_level, i.source, i.tags, i.notes,
+                   i.pos, i.dictionary_form, i.grammar_category, i.example_count"""
+# The columns items_fts indexes; bm25 weights follow the same order
+_SEARCH_COLUMNS = ["korean", "english", "dictionary_form", "notes", "tags"]
+_ITEM_RANK = "bm25(items_fts, 4.0, 2.0, 3.0, 1.0, 1.0)"
+
+
+def _item_dict(r) -> dict:
+    return {
+        "id": r[0], "korean": r[1], "english": r[2],
+        "item_type": r[3], "topik_level": r[4], "source": r[5],
+        "tags": json.loads(r[6]), "notes": r[7],
+        "pos": r[8], "dictionary_form": r[9], "grammar_category": r[10],
+        "example_count": r[11],
+    }
+
+
+def _item_snippet(item: dict, search: str) -> str | None:
+    return snippet([item["korean"], item["english"], item["dictionary_form"], item["notes"],
+                    json.dumps(item["tags"], ensure_ascii=False)], search)
+
+
 @router.get("")
 async def list_items(
     request: Request,
@@ -17,280 +46,326 @@ async def list_items(
     pos: str = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=200),
+    cursor: str = Query(None),
+    total: str = Query("exact"),
+    db: aiosqlite.Connection = Depends(get_db),
 ):
-    db = await get_db()
-    try:
-        conditions = []
-        params = []
-        if item_type:
-            conditions.append("item_type = ?")
-            params.append(item_type)
-        if topik_level:
-            conditions.append("topik_level = ?")
-            params.append(topik_level)
-        if pos:
-            conditions.append("pos = ?")
-            params.append(pos)
-        if search:
-            conditions.append("(korean LIKE ? OR english LIKE ?)")
-            params.extend([f"%{search}%", f"%{search}%"])
-
-        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-        offset = (page - 1) * per_page
-
-        count_row = await db.execute_fetchall(
-            f"SELECT COUNT(*) as c FROM items {where}", params
-        )
-        total = count_row[0][0]
-
-        rows = await db.execute_fetchall(
-            f"""SELECT i.id, i.korean, i.english, i.item_type, i.topik_level, i.source, i.tags, i.notes,
-                       i.pos, i.dictionary_form, i.grammar_category,
-                       (SELECT COUNT(*) FROM examples e WHERE e.item_id = i.id) as example_count
-                FROM items i {where} ORDER BY i.topik_level, i.korean
-                LIMIT ? OFFSET ?""",
-            params + [per_page, offset]
-        )
-        items = []
-        for r in rows:
-            items.append({
-                "id": r[0], "korean": r[1], "english": r[2],
-                "item_type": r[3], "topik_level": r[4], "source": r[5],
-                "tags": json.loads(r[6]), "notes": r[7],
-                "pos": r[8], "dictionary_form": r[9], "grammar_category": r[10],
-                "example_count": r[11],
-            })
-        return {"items": items, "total": total, "page": page, "per_page": per_page}
-    finally:
-        await db.close()
+    """
+    Items ordered by level, then korean; with `search`, best matches first
+    (BM25), each with a highlighted snippet. Page with `cursor` (the previous
+    response's next_cursor) rather than `page` for large banks; `total` is
+    exact, cached or none (see services.pagination).
+    """
+    if total not in TOTAL_MODES:
+        return JSONResponse({"error": f"total must be one of {', '.join(TOTAL_MODES)}"}, status_code=400)
+    conditions = []
+    params = []
+    if item_type:
+        conditions.append("i.item_type = ?")
+        params.append(item_type)
+    if topik_level:
+        conditions.append("i.topik_level = ?")
+        params.append(topik_level)
+    if pos:
+        conditions.append("i.pos = ?")
+        params.append(pos)
+    search = (search or "").strip()
+    match = await match_expression(db, "items_fts_vocab", search) if search else None
+    if match:
+        return await _search_items(db, match, search, conditions, params, page, per_page, cursor, total)
+    if search:
+        # Too common to rank (see services.search): filter in list order instead
+        conditions.append(f"({' OR '.join(f'i.{c} LIKE ?' for c in _SEARCH_COLUMNS)})")
+        params.extend([f"%{search}%"] * len(_SEARCH_COLUMNS))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    row_count = await count_rows(db, f"SELECT COUNT(*) as c FROM items i {where}", params, total)
+
+    page_conditions, page_params, offset = list(conditions), list(params), (page - 1) * per_page
+    if cursor:
+        try:
+            values = decode_cursor(cursor, len(_ITEM_ORDER))
+            if topik_level:
+                # The level is pinned by the filter; comparing the rest lets the index seek
+                condition, values = after_cursor(_ITEM_ORDER[1:], values[1:])
+            else:
+                condition, values = after_cursor(_ITEM_ORDER, values)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        page_conditions.append(condition)
+        page_params.extend(values)
+        offset = 0
+    page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+
+    rows = await db.execute_fetchall(
+        f"""SELECT {_ITEM_COLUMNS}
+            FROM items i {page_where} ORDER BY {", ".join(_ITEM_ORDER)}
+            LIMIT ? OFFSET ?""",
+        page_params + [per_page + 1, offset]
+    )
+    items = [_item_dict(r) for r in rows[:per_page]]
+    if search:
+        for item in items:
+            item["snippet"] = _item_snippet(item, search)
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor([last["topik_level"], last["korean"], last["id"]])
+    return {"items": items, "total": row_count, "page": None if cursor else page,
+            "per_page": per_page, "next_cursor": next_cursor}
+
+
+async def _search_items(db: aiosqlite.Connection, match: str, search: str, conditions: list[str],
+                        params: list, page: int, per_page: int, cursor: str | None, total: str):
+    """
+    list_items with a search: FTS match, ranked by BM25 then id; cursors are (score, id).
+    Only the page is joined back to items for its columns.
+    """
+    filters = "".join(f" AND {c}" for c in conditions)
+    row_count = await count_rows(
+        db, f"""SELECT COUNT(*) FROM items_fts JOIN items i ON i.id = items_fts.rowid
+                WHERE items_fts MATCH ?{filters}""", [match, *params], total
+    )
+
+    page_where, page_params, offset = "", [], (page - 1) * per_page
+    if cursor:
+        try:
+            condition, page_params = after_cursor(_RANKED_ORDER, decode_cursor(cursor, len(_RANKED_ORDER)))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        page_where, offset = f"WHERE {condition}", 0
+    rows = await db.execute_fetchall(
+        f"""WITH ranked AS MATERIALIZED (
+                SELECT i.id, {_ITEM_RANK} AS score
+                FROM items_fts JOIN items i ON i.id = items_fts.rowid
+                WHERE items_fts MATCH ?{filters}
+            ), page AS MATERIALIZED (
+                SELECT id, score FROM ranked {page_where}
+                ORDER BY score, id
+                LIMIT ? OFFSET ?
+            )
+            SELECT {_ITEM_COLUMNS}, page.score
+            FROM page JOIN items i ON i.id = page.id
+            ORDER BY page.score, page.id""",
+        [match, *params, *page_params, per_page + 1, offset]
+    )
+    items = []
+    for r in rows[:per_page]:
+        item = _item_dict(r)
+        item["score"] = r[12]
+        item["snippet"] = _item_snippet(item, search)
+        items.append(item)
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor([items[-1]["score"], items[-1]["id"]])
+    return {"items": items, "total": row_count, "page": None if cursor else page,
+            "per_page": per_page, "next_cursor": next_cursor}
 
 
 @router.get("/{item_id}")
-async def get_item(item_id: int, request: Request):
+async def get_item(item_id: int, request: Request, db: aiosqlite.Connection = Depends(get_db)):
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT id, korean, english, item_type, topik_level, source, tags, notes,
-                      pos, dictionary_form, grammar_category
-               FROM items WHERE id = ?""", (item_id,)
-        )
-        if not rows:
-            return JSONResponse({"error": "Not found"}, status_code=404)
-        r = rows[0]
-        examples = await db.execute_fetchall(
-            "SELECT id, korean, english, formality FROM examples WHERE item_id = ?",
-            (item_id,)
-        )
-        mastery = await db.execute_fetchall(
-            "SELECT grammar_score, vocab_score, formality_score, overall_score, practice_count FROM mastery WHERE item_id = ? AND student_id = ?",
-            (item_id, student_id)
-        )
-        srs = await db.execute_fetchall(
-            "SELECT ease_factor, interval_days, repetitions, next_review FROM srs_state WHERE item_id = ? AND student_id = ?",
-            (item_id, student_id)
-        )
-        return {
-            "id": r[0], "korean": r[1], "english": r[2],
-            "item_type": r[3], "topik_level": r[4], "source": r[5],
-            "tags": json.loads(r[6]), "notes": r[7],
-            "pos": r[8], "dictionary_form": r[9], "grammar_category": r[10],
-            "examples": [{"id": e[0], "korean": e[1], "english": e[2], "formality": e[3]} for e in examples],
-            "mastery": dict(zip(["grammar_score", "vocab_score", "formality_score", "overall_score", "practice_count"], mastery[0])) if mastery else None,
-            "srs": dict(zip(["ease_factor", "interval_days", "repetitions", "next_review"], srs[0])) if srs else None,
-        }
-    finally:
-        await db.close()
+    rows = await db.execute_fetchall(
+        """SELECT id, korean, english, item_type, topik_level, source, tags, notes,
+                  pos, dictionary_form, grammar_category
+           FROM items WHERE id = ?""", (item_id,)
+    )
+    if not rows:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    r = rows[0]
+    examples = await db.execute_fetchall(
+        "SELECT id, korean, english, formality FROM examples WHERE item_id = ?",
+        (item_id,)
+    )
+    mastery = await db.execute_fetchall(
+        "SELECT grammar_score, vocab_score, formality_score, overall_score, practice_count FROM mastery WHERE item_id = ? AND student_id = ?",
+        (item_id, student_id)
+    )
+    srs = await db.execute_fetchall(
+        "SELECT ease_factor, interval_days, repetitions, next_review FROM srs_state WHERE item_id = ? AND student_id = ?",
+        (item_id, student_id)
+    )
+    return {
+        "id": r[0], "korean": r[1], "english": r[2],
+        "item_type": r[3], "topik_level": r[4], "source": r[5],
+        "tags": json.loads(r[6]), "notes": r[7],
+        "pos": r[8], "dictionary_form": r[9], "grammar_category": r[10],
+        "examples": [{"id": e[0], "korean": e[1], "english": e[2], "formality": e[3]} for e in examples],
+        "mastery": dict(zip(["grammar_score", "vocab_score", "formality_score", "overall_score", "practice_count"], mastery[0])) if mastery else None,
+        "srs": dict(zip(["ease_factor", "interval_days", "repetitions", "next_review"], srs[0])) if srs else None,
+    }
 
 
 @router.post("", dependencies=[Depends(require_teacher)])
-async def create_item(item: ItemCreate):
-    db = await get_db()
-    try:
-        item_id = await insert_item(
-            db, item.korean, item.english, item.item_type,
-            item.topik_level, item.source, item.tags, item.notes,
-            pos=item.pos, dictionary_form=item.dictionary_form,
-            grammar_category=item.grammar_category,
-        )
-        await db.commit()
-        return {"id": item_id}
-    finally:
-        await db.close()
+async def create_item(item: ItemCreate, db: aiosqlite.Connection = Depends(get_write_db)):
+    item_id = await insert_item(
+        db, item.korean, item.english, item.item_type,
+        item.topik_level, item.source, item.tags, item.notes,
+        pos=item.pos, dictionary_form=item.dictionary_form,
+        grammar_category=item.grammar_category,
+    )
+    await db.commit()
+    return {"id": item_id}
 
 
 @router.put("/{item_id}", dependencies=[Depends(require_teacher)])
-async def update_item(item_id: int, item: ItemUpdate):
-    db = await get_db()
-    try:
-        # Build dynamic SET clause from non-None fields
-        fields = {}
-        if item.korean is not None:
-            fields["korean"] = item.korean
-        if item.english is not None:
-            fields["english"] = item.english
-        if item.item_type is not None:
-            fields["item_type"] = item.item_type
-        if item.topik_level is not None:
-            fields["topik_level"] = item.topik_level
-        if item.tags is not None:
-            fields["tags"] = json.dumps(item.tags)
-        if item.notes is not None:
-            fields["notes"] = item.notes
-        if item.pos is not None:
-            fields["pos"] = item.pos
-        if item.dictionary_form is not None:
-            fields["dictionary_form"] = item.dictionary_form
-        if item.grammar_category is not None:
-            fields["grammar_category"] = item.grammar_category
-
-        if not fields:
-            return {"ok": True}
-
-        set_clause = ", ".join(f"{k} = ?" for k in fields)
-        values = list(fields.values()) + [item_id]
-        await db.execute(f"UPDATE items SET {set_clause} WHERE id = ?", values)
-        await db.commit()
+async def update_item(item_id: int, item: ItemUpdate, db: aiosqlite.Connection = Depends(get_write_db)):
+    # Build dynamic SET clause from non-None fields
+    fields = {}
+    if item.korean is not None:
+        fields["korean"] = item.korean
+    if item.english is not None:
+        fields["english"] = item.english
+    if item.item_type is not None:
+        fields["item_type"] = item.item_type
+    if item.topik_level is not None:
+        fields["topik_level"] = item.topik_level
+    if item.tags is not None:
+        fields["tags"] = json.dumps(item.tags)
+    if item.notes is not None:
+        fields["notes"] = item.notes
+    if item.pos is not None:
+        fields["pos"] = item.pos
+    if item.dictionary_form is not None:
+        fields["dictionary_form"] = item.dictionary_form
+    if item.grammar_category is not None:
+        fields["grammar_category"] = item.grammar_category
+
+    if not fields:
         return {"ok": True}
-    finally:
-        await db.close()
+
+    set_clause = ", ".join(f"{k} = ?" for k in fields)
+    values = list(fields.values()) + [item_id]
+    await db.execute(f"UPDATE items SET {set_clause} WHERE id = ?", values)
+    await item_index.refresh_items(db, [item_id])
+    await invalidate_items(db, [item_id])
+    await db.commit()
+    return {"ok": True}
 
 
 @router.post("/{item_id}/examples", dependencies=[Depends(require_teacher)])
-async def add_example(item_id: int, example: ExampleCreate):
-    db = await get_db()
-    try:
-        await insert_example(db, item_id, example.korean, example.english, example.formality)
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+async def add_example(item_id: int, example: ExampleCreate, db: aiosqlite.Connection = Depends(get_write_db)):
+    await insert_example(db, item_id, example.korean, example.english, example.formality)
+    await invalidate_items(db, [item_id])
+    await db.commit()
+    return {"ok": True}
 
 
 @router.delete("/{item_id}/examples/{example_id}", dependencies=[Depends(require_teacher)])
-async def delete_example(item_id: int, example_id: int):
-    db = await get_db()
-    try:
-        await db.execute(
-            "DELETE FROM examples WHERE id = ? AND item_id = ?",
-            (example_id, item_id)
-        )
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+async def delete_example(item_id: int, example_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
+    await db.execute(
+        "DELETE FROM examples WHERE id = ? AND item_id = ?",
+        (example_id, item_id)
+    )
+    await invalidate_items(db, [item_id])
+    await db.commit()
+    return {"ok": True}
 
 
 @router.delete("/{item_id}", dependencies=[Depends(require_teacher)])
-async def delete_item(item_id: int):
-    db = await get_db()
-    try:
-        await db.execute("DELETE FROM items WHERE id = ?", (item_id,))
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+async def delete_item(item_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
+    await db.execute("DELETE FROM items WHERE id = ?", (item_id,))
+    item_index.remove_items([item_id])
+    due_queue.remove_items([item_id])
+    await invalidate_items(db, [item_id])
+    await db.commit()
+    return {"ok": True}
 
 
 @router.get("/duplicates/find", dependencies=[Depends(require_teacher)])
-async def find_duplicates():
+async def find_duplicates(db: aiosqlite.Connection = Depends(get_db)):
     """Find potential duplicate items (exact korean match or same dictionary form)."""
-    db = await get_db()
-    try:
-        # Find groups of items with identical korean text
-        groups = []
-        rows = await db.execute_fetchall(
-            """SELECT korean, COUNT(*) as cnt
-               FROM items GROUP BY korean HAVING cnt > 1
-               ORDER BY cnt DESC"""
-        )
-        for r in rows:
-            items = await db.execute_fetchall(
-                """SELECT id, korean, english, item_type, topik_level, source, tags, notes,
-                          pos, dictionary_form, grammar_category,
-                          (SELECT COUNT(*) FROM examples e WHERE e.item_id = i.id) as example_count,
-                          (SELECT SUM(practice_count) FROM mastery m WHERE m.item_id = i.id) as total_practices
-                   FROM items i WHERE korean = ? ORDER BY id""",
-                (r[0],)
-            )
-            groups.append({
-                "match_type": "exact",
-                "korean": r[0],
-                "items": [{
-                    "id": ir[0], "korean": ir[1], "english": ir[2],
-                    "item_type": ir[3], "topik_level": ir[4], "source": ir[5],
-                    "tags": json.loads(ir[6]), "notes": ir[7],
-                    "pos": ir[8], "dictionary_form": ir[9], "grammar_category": ir[10],
-                    "example_count": ir[11] or 0, "total_practices": ir[12] or 0,
-                } for ir in items],
-            })
-
-        # Find items with same dictionary_form (different surface forms)
-        dict_rows = await db.execute_fetchall(
-            """SELECT dictionary_form, COUNT(*) as cnt
-               FROM items WHERE dictionary_form IS NOT NULL AND dictionary_form != ''
-               GROUP BY dictionary_form HAVING cnt > 1
-               ORDER BY cnt DESC"""
+    # Find groups of items with identical korean text
+    groups = []
+    rows = await db.execute_fetchall(
+        """SELECT korean, COUNT(*) as cnt
+           FROM items GROUP BY korean HAVING cnt > 1
+           ORDER BY cnt DESC"""
+    )
+    for r in rows:
+        items = await db.execute_fetchall(
+            """SELECT id, korean, english, item_type, topik_level, source, tags, notes,
+                      pos, dictionary_form, grammar_category,
+                      (SELECT COUNT(*) FROM examples e WHERE e.item_id = i.id) as example_count,
+                      (SELECT SUM(practice_count) FROM mastery m WHERE m.item_id = i.id) as total_practices
+               FROM items i WHERE korean = ? ORDER BY id""",
+            (r[0],)
         )
-        seen_ids = {item["id"] for g in groups for item in g["items"]}
-        for r in dict_rows:
-            items = await db.execute_fetchall(
-                """SELECT id, korean, english, item_type, topik_level, source, tags, notes,
-                          pos, dictionary_form, grammar_category,
-                          (SELECT COUNT(*) FROM examples e WHERE e.item_id = i.id) as example_count,
-                          (SELECT SUM(practice_count) FROM mastery m WHERE m.item_id = i.id) as total_practices
-                   FROM items i WHERE dictionary_form = ? ORDER BY id""",
-                (r[0],)
-            )
-            item_list = [{
+        groups.append({
+            "match_type": "exact",
+            "korean": r[0],
+            "items": [{
                 "id": ir[0], "korean": ir[1], "english": ir[2],
                 "item_type": ir[3], "topik_level": ir[4], "source": ir[5],
                 "tags": json.loads(ir[6]), "notes": ir[7],
                 "pos": ir[8], "dictionary_form": ir[9], "grammar_category": ir[10],
                 "example_count": ir[11] or 0, "total_practices": ir[12] or 0,
-            } for ir in items]
-            # Skip if all items in this group were already covered by exact match
-            if all(item["id"] in seen_ids for item in item_list):
-                continue
-            groups.append({
-                "match_type": "dictionary_form",
-                "korean": r[0],
-                "items": item_list,
-            })
+            } for ir in items],
+        })
 
-        return {"groups": groups, "total_groups": len(groups)}
-    finally:
-        await db.close()
+    # Find items with same dictionary_form (different surface forms)
+    dict_rows = await db.execute_fetchall(
+        """SELECT dictionary_form, COUNT(*) as cnt
+           FROM items WHERE dictionary_form IS NOT NULL AND dictionary_form != ''
+           GROUP BY dictionary_form HAVING cnt > 1
+           ORDER BY cnt DESC"""
+    )
+    seen_ids = {item["id"] for g in groups for item in g["items"]}
+    for r in dict_rows:
+        items = await db.execute_fetchall(
+            """SELECT id, korean, english, item_type, topik_level, source, tags, notes,
+                      pos, dictionary_form, grammar_category,
+                      (SELECT COUNT(*) FROM examples e WHERE e.item_id = i.id) as example_count,
+                      (SELECT SUM(practice_count) FROM mastery m WHERE m.item_id = i.id) as total_practices
+               FROM items i WHERE dictionary_form = ? ORDER BY id""",
+            (r[0],)
+        )
+        item_list = [{
+            "id": ir[0], "korean": ir[1], "english": ir[2],
+            "item_type": ir[3], "topik_level": ir[4], "source": ir[5],
+            "tags": json.loads(ir[6]), "notes": ir[7],
+            "pos": ir[8], "dictionary_form": ir[9], "grammar_category": ir[10],
+            "example_count": ir[11] or 0, "total_practices": ir[12] or 0,
+        } for ir in items]
+        # Skip if all items in this group were already covered by exact match
+        if all(item["id"] in seen_ids for item in item_list):
+            continue
+        groups.append({
+            "match_type": "dictionary_form",
+            "korean": r[0],
+            "items": item_list,
+        })
+
+    return {"groups": groups, "total_groups": len(groups)}
 
 
 @router.post("/{keep_id}/merge/{remove_id}", dependencies=[Depends(require_teacher)])
-async def merge_items(keep_id: int, remove_id: int):
+async def merge_items(keep_id: int, remove_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
     """Merge remove_id into keep_id: transfer examples and sentence links, then delete."""
     if keep_id == remove_id:
         return JSONResponse({"error": "Cannot merge item with itself"}, status_code=400)
-    db = await get_db()
-    try:
-        # Verify both exist
-        keep = await db.execute_fetchall("SELECT id FROM items WHERE id = ?", (keep_id,))
-        remove = await db.execute_fetchall("SELECT id FROM items WHERE id = ?", (remove_id,))
-        if not keep or not remove:
-            return JSONResponse({"error": "Item not found"}, status_code=404)
-
-        # Transfer examples
-        await db.execute(
-            "UPDATE examples SET item_id = ? WHERE item_id = ?",
-            (keep_id, remove_id)
-        )
-        # Transfer sentence links (ignore conflicts if both items linked to same sentence)
-        await db.execute(
-            "UPDATE OR IGNORE sentence_items SET item_id = ? WHERE item_id = ?",
-            (keep_id, remove_id)
-        )
-        # Clean up any remaining sentence_items for removed item
-        await db.execute("DELETE FROM sentence_items WHERE item_id = ?", (remove_id,))
-        # Delete the duplicate
-        await db.execute("DELETE FROM items WHERE id = ?", (remove_id,))
-        await db.commit()
-        return {"ok": True, "kept": keep_id, "removed": remove_id}
-    finally:
-        await db.close()
+    # Verify both exist
+    keep = await db.execute_fetchall("SELECT id FROM items WHERE id = ?", (keep_id,))
+    remove = await db.execute_fetchall("SELECT id FROM items WHERE id = ?", (remove_id,))
+    if not keep or not remove:
+        return JSONResponse({"error": "Item not found"}, status_code=404)
+
+    # Transfer examples
+    await db.execute(
+        "UPDATE examples SET item_id = ? WHERE item_id = ?",
+        (keep_id, remove_id)
+    )
+    # Transfer sentence links (ignore conflicts if both items linked to same sentence)
+    await db.execute(
+        "UPDATE OR IGNORE sentence_items SET item_id = ? WHERE item_id = ?",
+        (keep_id, remove_id)
+    )
+    # Clean up any remaining sentence_items for removed item
+    await db.execute("DELETE FROM sentence_items WHERE item_id = ?", (remove_id,))
+    # Delete the duplicate
+    await db.execute("DELETE FROM items WHERE id = ?", (remove_id,))
+    item_index.remove_items([remove_id])
+    due_queue.remove_items([remove_id])
+    await invalidate_items(db, [keep_id, remove_id])
+    await db.commit()
+    return {"ok": True, "kept": keep_id, "removed": remove_id}
@@ -1,10 +1,15 @@
 from fastapi import APIRouter, UploadFile, File, Form, Request
 from fastapi.responses import JSONResponse
-from app.database import get_db, record_encounter
+from app.database import (
+    write_connection, record_encounter, get_examples_for_items, insert_practice_log_items,
+    record_item_events,
+)
 from app.models import PracticeRequest
 from app.services.srs import select_review_items
 from app.services.prompt_generator import generate_prompt, generate_prompt_with_sentences, format_sentence_prompt
 from app.services.correction import process_audio_submission
+from app.services.audio_storage import AudioTooLargeError
+from app.services import prompt_pool
 from app.auth import get_student_id
 import json
 import uuid
@@ -15,59 +20,53 @@ router = APIRouter()
 @router.post("/start")
 async def start_practice(req: PracticeRequest, request: Request):
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        # Route to appropriate practice mode
-        if req.lesson_id:
-            return await _start_lesson_practice(db, req, student_id)
-        elif req.mode == "sentence" and req.sentence_id:
-            return await _start_sentence_practice(db, req, student_id)
-        elif req.mode == "reading":
-            return await _start_reading_practice(db, req, student_id)
-        else:
-            # Default: speaking practice
-            return await _start_speaking_practice(db, req, student_id)
-    finally:
-        await db.close()
-
-
-async def _start_speaking_practice(db, req, student_id):
+    # Route to appropriate practice mode. Each mode takes the writer connection only
+    # for its DB work and releases it before any OpenAI call.
+    if req.lesson_id:
+        return await _start_lesson_practice(req, student_id)
+    elif req.mode == "sentence" and req.sentence_id:
+        return await _start_sentence_practice(req, student_id)
+    elif req.mode == "reading":
+        return await _start_reading_practice(req, student_id)
+    else:
+        # Default: speaking practice
+        return await _start_speaking_practice(req, student_id)
+
+
+async def _start_speaking_practice(req, student_id):
     """Start speaking practice with AI-generated or teacher sentence prompts."""
     from app.database import get_setting
-    new_per_session = int(await get_setting("new_items_per_session", "2", student_id=student_id))
-
-    items = await select_review_items(
-        db, count=req.item_count, topik_level=req.topik_level,
-        student_id=student_id, new_items_per_session=new_per_session
-    )
-    if not items:
-        return JSONResponse({"error": "No items available for review"}, status_code=404)
+    async with write_connection() as db:
+        new_per_session = int(await get_setting("new_items_per_session", "2", student_id=student_id, db=db))
 
-    # Fetch example sentences for selected items
-    item_ids = [i["id"] for i in items]
-    if item_ids:
-        placeholders = ",".join("?" for _ in item_ids)
-        example_rows = await db.execute_fetchall(
-            f"SELECT item_id, korean, english, formality FROM examples WHERE item_id IN ({placeholders})",
-            item_ids
+        items = await select_review_items(
+            db, count=req.item_count, topik_level=req.topik_level,
+            student_id=student_id, new_items_per_session=new_per_session
         )
-        examples_by_item = {}
-        for er in example_rows:
-            examples_by_item.setdefault(er[0], []).append({
-                "korean": er[1], "english": er[2], "formality": er[3]
-            })
+        if not items:
+            return JSONResponse({"error": "No items available for review"}, status_code=404)
+
+        # Fetch example sentences for selected items
+        item_ids = [i["id"] for i in items]
+        examples_by_item = await get_examples_for_items(db, item_ids)
         for item in items:
             item["examples"] = examples_by_item.get(item["id"], [])
 
-    # Record encounters (student saw these items)
-    for item_id in item_ids:
-        await record_encounter(db, student_id, item_id, practiced=False)
-    await db.commit()
+        # Record encounters (student saw these items)
+        for item_id in item_ids:
+            await record_encounter(db, student_id, item_id, practiced=False)
+        await db.commit()
 
-    # Try teacher sentence first, fall back to GPT
-    prompt_data = await generate_prompt_with_sentences(items, req.formality, db=db)
+    # Try teacher sentence first, then a prefetched prompt, then live GPT
+    prompt_data = await generate_prompt_with_sentences(
+        items, req.formality, store=True, student_id=student_id
+    )
     session_id = str(uuid.uuid4())
 
+    # Pre-generate the prompt for the session after this one
+    prompt_pool.remember_session(student_id, req.item_count, req.topik_level, req.formality)
+    prompt_pool.schedule_prefetch(student_id)
+
     from datetime import datetime
     return {
         "session_id": session_id,
@@ -83,31 +82,32 @@ async def _start_speaking_practice(db, req, student_id):
     }
 
 
-async def _start_sentence_practice(db, req, student_id):
+async def _start_sentence_practice(req, student_id):
     """Start sentence repetition practice with a specific sentence."""
-    rows = await db.execute_fetchall(
-        "SELECT id, korean, english, formality, topik_level FROM sentences WHERE id = ?",
-        (req.sentence_id,)
-    )
-    if not rows:
-        return JSONResponse({"error": "Sentence not found"}, status_code=404)
-
-    sentence = {"id": rows[0][0], "korean": rows[0][1], "english": rows[0][2],
-                "formality": rows[0][3], "topik_level": rows[0][4]}
-
-    # Get linked items
-    linked = await db.execute_fetchall(
-        """SELECT i.id, i.korean, i.english, i.item_type
-           FROM sentence_items si JOIN items i ON i.id = si.item_id
-           WHERE si.sentence_id = ?""",
-        (req.sentence_id,)
-    )
-    item_ids = [r[0] for r in linked]
-    target_items = [{"id": r[0], "korean": r[1], "english": r[2]} for r in linked]
+    async with write_connection() as db:
+        rows = await db.execute_fetchall(
+            "SELECT id, korean, english, formality, topik_level FROM sentences WHERE id = ?",
+            (req.sentence_id,)
+        )
+        if not rows:
+            return JSONResponse({"error": "Sentence not found"}, status_code=404)
+
+        sentence = {"id": rows[0][0], "korean": rows[0][1], "english": rows[0][2],
+                    "formality": rows[0][3], "topik_level": rows[0][4]}
+
+        # Get linked items
+        linked = await db.execute_fetchall(
+            """SELECT i.id, i.korean, i.english, i.item_type
+               FROM sentence_items si JOIN items i ON i.id = si.item_id
+               WHERE si.sentence_id = ?""",
+            (req.sentence_id,)
+        )
+        item_ids = [r[0] for r in linked]
+        target_items = [{"id": r[0], "korean": r[1], "english": r[2]} for r in linked]
 
-    for item_id in item_ids:
-        await record_encounter(db, student_id, item_id, practiced=False)
-    await db.commit()
+        for item_id in item_ids:
+            await record_encounter(db, student_id, item_id, practiced=False)
+        await db.commit()
 
     prompt_data = await format_sentence_prompt(sentence)
 
@@ -127,39 +127,40 @@ async def _start_sentence_practice(db, req, student_id):
     }
 
 
-async def _start_reading_practice(db, req, student_id):
+async def _start_reading_practice(req, student_id):
     """Return a set of flashcards for passive review."""
     from app.database import get_sentences_for_items
-    items = await select_review_items(
-        db, count=req.item_count, topik_level=req.topik_level,
-        student_id=student_id
-    )
-    if not items:
-        return JSONResponse({"error": "No items available"}, status_code=404)
-
-    # For each item, find a sentence if available
-    cards = []
-    for item in items:
-        sentences = await get_sentences_for_items(db, [item["id"]])
-        card = {
-            "item_id": item["id"],
-            "korean": item["korean"],
-            "english": item["english"],
-            "item_type": item["item_type"],
-            "topik_level": item["topik_level"],
-            "sentence": sentences[0] if sentences else None,
-        }
-        # Fetch examples for the item
-        examples = await db.execute_fetchall(
-            "SELECT korean, english, formality FROM examples WHERE item_id = ?",
-            (item["id"],)
+    async with write_connection() as db:
+        items = await select_review_items(
+            db, count=req.item_count, topik_level=req.topik_level,
+            student_id=student_id
         )
-        card["examples"] = [{"korean": e[0], "english": e[1], "formality": e[2]} for e in examples]
-        cards.append(card)
+        if not items:
+            return JSONResponse({"error": "No items available"}, status_code=404)
+
+        # For each item, find a sentence if available
+        cards = []
+        for item in items:
+            sentences = await get_sentences_for_items(db, [item["id"]])
+            card = {
+                "item_id": item["id"],
+                "korean": item["korean"],
+                "english": item["english"],
+                "item_type": item["item_type"],
+                "topik_level": item["topik_level"],
+                "sentence": sentences[0] if sentences else None,
+            }
+            # Fetch examples for the item
+            examples = await db.execute_fetchall(
+                "SELECT korean, english, formality FROM examples WHERE item_id = ?",
+                (item["id"],)
+            )
+            card["examples"] = [{"korean": e[0], "english": e[1], "formality": e[2]} for e in examples]
+            cards.append(card)
 
-    for item in items:
-        await record_encounter(db, student_id, item["id"], practiced=False)
-    await db.commit()
+        for item in items:
+            await record_encounter(db, student_id, item["id"], practiced=False)
+        await db.commit()
 
     from datetime import datetime
     return {
@@ -170,72 +171,72 @@ async def _start_reading_practice(db, req, student_id):
     }
 
 
-async def _start_lesson_practice(db, req, student_id):
+async def _start_lesson_practice(req, student_id):
     """Start practice with items from a specific curriculum lesson."""
     from datetime import datetime
 
-    # Get lesson info
-    lesson_rows = await db.execute_fetchall(
-        """SELECT l.id, l.lesson_number, l.title, u.unit_number
-           FROM curriculum_lessons l
-           JOIN curriculum_units u ON u.id = l.unit_id
-           WHERE l.id = ?""",
-        (req.lesson_id,)
-    )
+    async with write_connection() as db:
+        # Get lesson info
+        lesson_rows = await db.execute_fetchall(
+            """SELECT l.id, l.lesson_number, l.title, u.unit_number
+               FROM curriculum_lessons l
+               JOIN curriculum_units u ON u.id = l.unit_id
+               WHERE l.id = ?""",
+            (req.lesson_id,)
+        )
 
-    if not lesson_rows:
-        return JSONResponse({"error": "Lesson not found"}, status_code=404)
+        if not lesson_rows:
+            return JSONResponse({"error": "Lesson not found"}, status_code=404)
 
-    lesson_id, lesson_num, lesson_title, unit_num = lesson_rows[0]
+        lesson_id, lesson_num, lesson_title, unit_num = lesson_rows[0]
 
-    # Get items from this lesson
-    item_rows = await db.execute_fetchall(
-        """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level
-           FROM lesson_items li
-           JOIN items i ON i.id = li.item_id
-           WHERE li.lesson_id = ?
-           ORDER BY li.introduced_order
-           LIMIT ?""",
-        (lesson_id, req.item_count)
-    )
+        # Get items from this lesson
+        item_rows = await db.execute_fetchall(
+            """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level
+               FROM lesson_items li
+               JOIN items i ON i.id = li.item_id
+               WHERE li.lesson_id = ?
+               ORDER BY li.introduced_order
+               LIMIT ?""",
+            (lesson_id, req.item_count)
+        )
 
-    if not item_rows:
-        return JSONResponse({"error": "No items in this lesson"}, status_code=404)
+        if not item_rows:
+            return JSONResponse({"error": "No items in this lesson"}, status_code=404)
 
-    items = [{"id": r[0], "korean": r[1], "english": r[2], "item_type": r[3], "topik_level": r[4]} for r in item_rows]
-    item_ids = [i["id"] for i in items]
+        items = [{"id": r[0], "korean": r[1], "english": r[2], "item_type": r[3], "topik_level": r[4]} for r in item_rows]
+        item_ids = [i["id"] for i in items]
 
-    # Get examples for these items
-    placeholders = ",".join("?" for _ in item_ids)
-    example_rows = await db.execute_fetchall(
-        f"SELECT item_id, korean, english, formality FROM examples WHERE item_id IN ({placeholders})",
-        item_ids
-    )
-    examples_by_item = {}
-    for er in example_rows:
-        examples_by_item.setdefault(er[0], []).append({"korean": er[1], "english": er[2], "formality": er[3]})
-    for item in items:
-        item["examples"] = examples_by_item.get(item["id"], [])
+        # Get examples for these items
+        placeholders = ",".join("?" for _ in item_ids)
+        example_rows = await db.execute_fetchall(
+            f"SELECT item_id, korean, english, formality FROM examples WHERE item_id IN ({placeholders})",
+            item_ids
+        )
+        examples_by_item = {}
+        for er in example_rows:
+            examples_by_item.setdefault(er[0], []).append({"korean": er[1], "english": er[2], "formality": er[3]})
+        for item in items:
+            item["examples"] = examples_by_item.get(item["id"], [])
+
+        # Record encounters
+        for item_id in item_ids:
+            await record_encounter(db, student_id, item_id, practiced=False)
 
-    # Record encounters
-    for item_id in item_ids:
-        await record_encounter(db, student_id, item_id, practiced=False)
-    await db.commit()
+        # Update lesson progress
+        await db.execute(
+            """INSERT INTO lesson_progress (student_id, lesson_id, status, started_at, practice_count)
+               VALUES (?, ?, 'in_progress', datetime('now'), 1)
+               ON CONFLICT(student_id, lesson_id) DO UPDATE SET
+                   status = 'in_progress',
+                   practice_count = practice_count + 1,
+                   last_practiced = datetime('now')""",
+            (student_id, lesson_id)
+        )
+        await db.commit()
 
     # Generate prompt
-    prompt_data = await generate_prompt_with_sentences(items, req.formality, db=db)
-
-    # Update lesson progress
-    await db.execute(
-        """INSERT INTO lesson_progress (student_id, lesson_id, status, started_at, practice_count)
-           VALUES (?, ?, 'in_progress', datetime('now'), 1)
-           ON CONFLICT(student_id, lesson_id) DO UPDATE SET
-               status = 'in_progress',
-               practice_count = practice_count + 1,
-               last_practiced = datetime('now')""",
-        (student_id, lesson_id)
-    )
-    await db.commit()
+    prompt_data = await generate_prompt_with_sentences(items, req.formality, store=True)
 
     return {
         "session_id": str(uuid.uuid4()),
@@ -273,16 +274,20 @@ async def submit_practice(
         except (ValueError, TypeError):
             pass
 
-    result = await process_audio_submission(
-        audio_file=audio,
-        item_ids=session["item_ids"],
-        formality=session["formality"],
-        prompt=session["prompt"],
-        student_id=student_id,
-        duration_seconds=duration_seconds,
-        practice_mode=session.get("mode", "speaking"),
-        sentence_id=session.get("sentence_id"),
-    )
+    try:
+        result = await process_audio_submission(
+            audio_file=audio,
+            item_ids=session["item_ids"],
+            formality=session["formality"],
+            prompt=session["prompt"],
+            student_id=student_id,
+            duration_seconds=duration_seconds,
+            practice_mode=session.get("mode", "speaking"),
+            sentence_id=session.get("sentence_id"),
+        )
+    except AudioTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    prompt_pool.on_srs_change(student_id)
     return result
 
 
@@ -299,15 +304,16 @@ async def complete_reading(request: Request):
     # Create rating lookup
     ratings_by_item = {r["item_id"]: r["confidence"] for r in card_ratings}
 
-    db = await get_db()
-    try:
-        from app.services.srs import update_srs_after_practice
+    from app.services.srs import update_srs_after_practice
+    async with write_connection() as db:
         # Record encounters as practiced with confidence-based scoring
+        links = []
         for item_id in item_ids:
             confidence = ratings_by_item.get(item_id, 2)  # Default to 2 (Good) if not rated
             # Convert confidence (1-3) to score (0.4-1.0)
             # 1 (Hard) = 0.4, 2 (Good) = 0.7, 3 (Easy) = 1.0
             score = {1: 0.4, 2: 0.7, 3: 1.0}.get(confidence, 0.7)
+            links.append((item_id, {1: "hard", 3: "easy"}.get(confidence, "good"), score, None))
 
             await record_encounter(db, student_id, item_id, practiced=True)
             await update_srs_after_practice(db, item_id, score, student_id=student_id)
@@ -316,7 +322,7 @@ async def complete_reading(request: Request):
         avg_confidence = sum(ratings_by_item.values()) / len(ratings_by_item) if ratings_by_item else 2
         avg_score = {1: 0.4, 2: 0.7, 3: 1.0}.get(round(avg_confidence), 0.7)
 
-        await db.execute(
+        cursor = await db.execute(
             """INSERT INTO practice_log
                (item_ids, prompt, formality, transcript, overall_score,
                 student_id, duration_seconds, practice_mode, feedback_json)
@@ -326,7 +332,10 @@ async def complete_reading(request: Request):
              student_id, duration_seconds, "reading",
              json.dumps({"card_ratings": card_ratings}))
         )
+        await insert_practice_log_items(db, cursor.lastrowid, student_id, links)
+        await record_item_events(db, student_id, [
+            (item_id, "reviewed", score, None, None, None) for item_id, _, score, _ in links
+        ], log_id=cursor.lastrowid)
         await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+    prompt_pool.on_srs_change(student_id)
+    return {"ok": True}
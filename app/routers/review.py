@@ -1,109 +1,174 @@
 import json
 
-from fastapi import APIRouter, HTTPException, Request
-from app.database import get_db
-from app.auth import get_student_id
+import aiosqlite
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from app.database import get_db, get_write_db
+from app.auth import get_student_id, require_teacher
+from app.models import RescheduleRequest
+from app.services import due_queue, prompt_pool
+from app.services.srs_batch import shift_reviews, scale_intervals
+from app.services.pagination import after_cursor, decode_cursor, encode_cursor
 
 router = APIRouter()
 
 
 @router.get("/queue")
-async def review_queue(request: Request):
+async def review_queue(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     """Get items due for review, ordered by most overdue first."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
+    due = await due_queue.next_due(db, student_id, 100)
+    if not due:
+        return {"queue": [], "total_due": 0}
+    item_ids = [item_id for item_id, _ in due]
+    placeholders = ",".join("?" * len(item_ids))
+    rows = await db.execute_fetchall(
+        f"""SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
+                   s.next_review, s.interval_days, s.repetitions,
+                   m.overall_score, m.practice_count
+            FROM items i
+            JOIN srs_state s ON s.item_id = i.id AND s.student_id = ?
+            LEFT JOIN mastery m ON m.item_id = i.id AND m.student_id = ?
+            WHERE i.id IN ({placeholders})""",
+        [student_id, student_id] + item_ids
+    )
+    by_id = {r[0]: r for r in rows}
+    items = []
+    for item_id in item_ids:
+        r = by_id.get(item_id)
+        if r is None:
+            continue
+        items.append({
+            "id": r[0], "korean": r[1], "english": r[2],
+            "item_type": r[3], "topik_level": r[4],
+            "next_review": r[5], "interval_days": r[6],
+            "repetitions": r[7], "overall_score": r[8],
+            "practice_count": r[9],
+        })
+    return {"queue": items, "total_due": len(items)}
+
+
+@router.post("/reschedule", dependencies=[Depends(require_teacher)])
+async def reschedule(req: RescheduleRequest, db: aiosqlite.Connection = Depends(get_write_db)):
+    """Bulk-reschedule SRS state in one transaction (e.g. shift everything after a vacation)."""
+    if req.action not in ("shift", "scale"):
+        return JSONResponse({"error": "action must be 'shift' or 'scale'"}, status_code=400)
     try:
-        rows = await db.execute_fetchall(
-            """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
-                      s.next_review, s.interval_days, s.repetitions,
-                      m.overall_score, m.practice_count
-               FROM items i
-               JOIN srs_state s ON s.item_id = i.id AND s.student_id = ?
-               LEFT JOIN mastery m ON m.item_id = i.id AND m.student_id = ?
-               WHERE s.next_review <= datetime('now')
-               ORDER BY s.next_review ASC
-               LIMIT 100""",
-            (student_id, student_id)
-        )
-        items = []
-        for r in rows:
-            items.append({
-                "id": r[0], "korean": r[1], "english": r[2],
-                "item_type": r[3], "topik_level": r[4],
-                "next_review": r[5], "interval_days": r[6],
-                "repetitions": r[7], "overall_score": r[8],
-                "practice_count": r[9],
-            })
-        return {"queue": items, "total_due": len(items)}
-    finally:
-        await db.close()
+        if req.action == "shift":
+            result = await shift_reviews(db, req.days, req.student_id, req.due_only)
+        else:
+            result = await scale_intervals(db, req.factor, req.student_id, req.due_only)
+    except (ValueError, OverflowError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    await db.commit()
+    for student_id in result["students"]:
+        prompt_pool.on_srs_change(student_id)
+    return result
 
 
 @router.get("/history")
-async def practice_history(request: Request, limit: int = 20):
-    """Get recent practice sessions."""
+async def practice_history(request: Request, limit: int = 20, cursor: str | None = None,
+                           db: aiosqlite.Connection = Depends(get_db)):
+    """Get recent practice sessions. Pass next_cursor back as `cursor` for older ones."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT id, item_ids, prompt, formality, transcript,
-                      overall_score, created_at
-               FROM practice_log
-               WHERE student_id = ?
-               ORDER BY created_at DESC
-               LIMIT ?""",
-            (student_id, limit)
-        )
-        sessions = []
-        for r in rows:
-            sessions.append({
-                "id": r[0], "item_ids": r[1], "prompt": r[2],
-                "formality": r[3], "transcript": r[4],
-                "overall_score": r[5], "created_at": r[6],
-            })
-        return {"sessions": sessions}
-    finally:
-        await db.close()
+    condition, params = "", []
+    if cursor:
+        try:
+            condition, params = after_cursor(
+                ["created_at", "id"], decode_cursor(cursor, 2), descending=True
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        condition = f"AND {condition}"
+    rows = await db.execute_fetchall(
+        f"""SELECT id, item_ids, prompt, formality, transcript,
+                   overall_score, created_at
+            FROM practice_log
+            WHERE student_id = ? {condition}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?""",
+        [student_id, *params, limit + 1]
+    )
+    sessions = []
+    for r in rows[:limit]:
+        sessions.append({
+            "id": r[0], "item_ids": r[1], "prompt": r[2],
+            "formality": r[3], "transcript": r[4],
+            "overall_score": r[5], "created_at": r[6],
+        })
+    next_cursor = None
+    if len(rows) > limit and sessions:
+        next_cursor = encode_cursor([sessions[-1]["created_at"], sessions[-1]["id"]])
+    return {"sessions": sessions, "next_cursor": next_cursor}
 
 
 @router.get("/history/{session_id}")
-async def practice_session_detail(session_id: int, request: Request):
+async def practice_session_detail(session_id: int, request: Request, db: aiosqlite.Connection = Depends(get_db)):
     """Get full detail for a single practice session including feedback."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT id, item_ids, prompt, formality, transcript,
-                      overall_score, feedback_json, created_at
-               FROM practice_log WHERE id = ? AND student_id = ?""",
-            (session_id, student_id)
-        )
-        if not rows:
-            raise HTTPException(status_code=404, detail="Session not found")
-        row = rows[0]
+    rows = await db.execute_fetchall(
+        """SELECT id, prompt, formality, transcript,
+                  overall_score, feedback_json, created_at
+           FROM practice_log WHERE id = ? AND student_id = ?""",
+        (session_id, student_id)
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Session not found")
+    row = rows[0]
 
-        item_ids = json.loads(row[1]) if row[1] else []
-        feedback = json.loads(row[6]) if row[6] else None
+    feedback = json.loads(row[5]) if row[5] else None
 
-        # Fetch item names for display
-        items = []
-        if item_ids:
-            placeholders = ",".join("?" for _ in item_ids)
-            item_rows = await db.execute_fetchall(
-                f"SELECT id, korean, english, item_type FROM items WHERE id IN ({placeholders})",
-                item_ids
-            )
-            for ir in item_rows:
-                items.append({
-                    "id": ir[0], "korean": ir[1],
-                    "english": ir[2], "item_type": ir[3],
-                })
+    # Items for display, with how each one went in this session
+    item_rows = await db.execute_fetchall(
+        """SELECT i.id, i.korean, i.english, i.item_type, pli.status, pli.score
+           FROM practice_log_items pli
+           JOIN items i ON i.id = pli.item_id
+           WHERE pli.log_id = ?
+           ORDER BY pli.position""",
+        (session_id,)
+    )
+    items = [
+        {"id": ir[0], "korean": ir[1], "english": ir[2], "item_type": ir[3],
+         "status": ir[4], "score": ir[5]}
+        for ir in item_rows
+    ]
+    item_ids = [item["id"] for item in items]
+
+    return {
+        "id": row[0], "item_ids": item_ids, "prompt": row[1],
+        "formality": row[2], "transcript": row[3],
+        "overall_score": row[4], "feedback": feedback,
+        "created_at": row[6], "items": items,
+    }
 
-        return {
-            "id": row[0], "item_ids": item_ids, "prompt": row[2],
-            "formality": row[3], "transcript": row[4],
-            "overall_score": row[5], "feedback": feedback,
-            "created_at": row[7], "items": items,
-        }
-    finally:
-        await db.close()
+
+@router.get("/history/items/{item_id}")
+async def item_attempts(item_id: int, request: Request, limit: int = 20,
+                        db: aiosqlite.Connection = Depends(get_db)):
+    """Get the student's practice sessions that involved one item, newest first."""
+    student_id = get_student_id(request) or 1
+    item_rows = await db.execute_fetchall(
+        "SELECT korean, english, item_type FROM items WHERE id = ?", (item_id,)
+    )
+    if not item_rows:
+        raise HTTPException(status_code=404, detail="Item not found")
+    rows = await db.execute_fetchall(
+        """SELECT pli.log_id, p.created_at, p.practice_mode, p.prompt, p.transcript,
+                  p.overall_score, pli.status, pli.score, pli.encounter_type
+           FROM practice_log_items pli
+           JOIN practice_log p ON p.id = pli.log_id
+           WHERE pli.item_id = ? AND pli.student_id = ?
+           ORDER BY pli.log_id DESC
+           LIMIT ?""",
+        (item_id, student_id, limit)
+    )
+    return {
+        "item": {"id": item_id, "korean": item_rows[0][0],
+                 "english": item_rows[0][1], "item_type": item_rows[0][2]},
+        "attempts": [
+            {"session_id": r[0], "created_at": r[1], "practice_mode": r[2],
+             "prompt": r[3], "transcript": r[4], "overall_score": r[5],
+             "status": r[6], "score": r[7], "encounter_type": r[8]}
+            for r in rows
+        ],
+    }
@@ -2,10 +2,14 @@
 
 import json
 import re
+import aiosqlite
 from fastapi import APIRouter, Query, Depends, Request
 from fastapi.responses import JSONResponse
-from app.database import get_db, insert_sentence, find_matching_items
-from app.models import SentenceCreate
+from app.database import get_db, get_write_db, write_connection, insert_sentence, find_matching_items
+from app.models import SentenceCreate, SentenceBreakdownBatch
+from app.services import item_index
+from app.services.pagination import TOTAL_MODES, after_cursor, count_rows, decode_cursor, encode_cursor
+from app.services.search import match_expression, snippet
 from app.auth import require_teacher, get_student_id
 from app.services.openai_service import chat_completion
 
@@ -19,99 +23,171 @@ def _estimate_sentence_level(linked_items: list[dict]) -> int:
     return max(item["topik_level"] for item in linked_items)
 
 
+_SENTENCE_ORDER = ["s.created_at", "s.id"]
+_RANKED_ORDER = ["score", "id"]
+_SENTENCE_COLUMNS = """s.id, s.korean, s.english, s.formality, s.topik_level, s.source, s.notes,
+                       s.created_at, s.link_count"""
+
+
+def _sentence_dict(r) -> dict:
+    return {
+        "id": r[0], "korean": r[1], "english": r[2],
+        "formality": r[3], "topik_level": r[4], "source": r[5],
+        "notes": r[6], "created_at": r[7], "linked_item_count": r[8],
+    }
+
+
 @router.get("")
 async def list_sentences(
     search: str = Query(None),
     topik_level: int = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=200),
+    cursor: str = Query(None),
+    total: str = Query("exact"),
+    db: aiosqlite.Connection = Depends(get_db),
 ):
-    db = await get_db()
-    try:
-        conditions = []
-        params = []
-        if search:
-            conditions.append("(s.korean LIKE ? OR s.english LIKE ?)")
-            params.extend([f"%{search}%", f"%{search}%"])
-        if topik_level:
-            conditions.append("s.topik_level = ?")
-            params.append(topik_level)
-
-        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-        offset = (page - 1) * per_page
-
-        count_row = await db.execute_fetchall(
-            f"SELECT COUNT(*) FROM sentences s {where}", params
-        )
-        total = count_row[0][0]
-
-        rows = await db.execute_fetchall(
-            f"""SELECT s.id, s.korean, s.english, s.formality, s.topik_level, s.source, s.notes, s.created_at,
-                       (SELECT COUNT(*) FROM sentence_items si WHERE si.sentence_id = s.id) as link_count
-                FROM sentences s {where}
-                ORDER BY s.created_at DESC
-                LIMIT ? OFFSET ?""",
-            params + [per_page, offset]
-        )
-        sentences = []
-        for r in rows:
-            sentences.append({
-                "id": r[0], "korean": r[1], "english": r[2],
-                "formality": r[3], "topik_level": r[4], "source": r[5],
-                "notes": r[6], "created_at": r[7], "linked_item_count": r[8],
-            })
-        return {"sentences": sentences, "total": total, "page": page, "per_page": per_page}
-    finally:
-        await db.close()
+    """
+    Sentences, newest first; with `search`, best matches first with a snippet.
+    Pagination works like /api/items (cursor or page, total mode).
+    """
+    if total not in TOTAL_MODES:
+        return JSONResponse({"error": f"total must be one of {', '.join(TOTAL_MODES)}"}, status_code=400)
+    conditions = []
+    params = []
+    if topik_level:
+        conditions.append("s.topik_level = ?")
+        params.append(topik_level)
+    search = (search or "").strip()
+    match = await match_expression(db, "sentences_fts_vocab", search) if search else None
+    if match:
+        return await _search_sentences(db, match, search, conditions, params, page, per_page, cursor, total)
+    if search:
+        # Too common to rank (see services.search): filter in list order instead
+        conditions.append("(s.korean LIKE ? OR s.english LIKE ?)")
+        params.extend([f"%{search}%"] * 2)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    row_count = await count_rows(db, f"SELECT COUNT(*) FROM sentences s {where}", params, total)
+
+    page_conditions, page_params, offset = list(conditions), list(params), (page - 1) * per_page
+    if cursor:
+        try:
+            condition, values = after_cursor(
+                _SENTENCE_ORDER, decode_cursor(cursor, len(_SENTENCE_ORDER)), descending=True
+            )
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        page_conditions.append(condition)
+        page_params.extend(values)
+        offset = 0
+    page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+
+    rows = await db.execute_fetchall(
+        f"""SELECT {_SENTENCE_COLUMNS}
+            FROM sentences s {page_where}
+            ORDER BY s.created_at DESC, s.id DESC
+            LIMIT ? OFFSET ?""",
+        page_params + [per_page + 1, offset]
+    )
+    sentences = [_sentence_dict(r) for r in rows[:per_page]]
+    if search:
+        for sentence in sentences:
+            sentence["snippet"] = snippet([sentence["korean"], sentence["english"]], search)
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor([sentences[-1]["created_at"], sentences[-1]["id"]])
+    return {"sentences": sentences, "total": row_count, "page": None if cursor else page,
+            "per_page": per_page, "next_cursor": next_cursor}
+
+
+async def _search_sentences(db: aiosqlite.Connection, match: str, search: str, conditions: list[str],
+                            params: list, page: int, per_page: int, cursor: str | None, total: str):
+    """list_sentences with a search: FTS match, ranked by BM25 then id; cursors are (score, id)."""
+    filters = "".join(f" AND {c}" for c in conditions)
+    row_count = await count_rows(
+        db, f"""SELECT COUNT(*) FROM sentences_fts JOIN sentences s ON s.id = sentences_fts.rowid
+                WHERE sentences_fts MATCH ?{filters}""", [match, *params], total
+    )
+
+    page_where, page_params, offset = "", [], (page - 1) * per_page
+    if cursor:
+        try:
+            condition, page_params = after_cursor(_RANKED_ORDER, decode_cursor(cursor, len(_RANKED_ORDER)))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        page_where, offset = f"WHERE {condition}", 0
+    rows = await db.execute_fetchall(
+        f"""WITH ranked AS MATERIALIZED (
+                SELECT s.id, bm25(sentences_fts, 2.0, 1.0) AS score
+                FROM sentences_fts JOIN sentences s ON s.id = sentences_fts.rowid
+                WHERE sentences_fts MATCH ?{filters}
+            ), page AS MATERIALIZED (
+                SELECT id, score FROM ranked {page_where}
+                ORDER BY score, id
+                LIMIT ? OFFSET ?
+            )
+            SELECT {_SENTENCE_COLUMNS}, page.score
+            FROM page JOIN sentences s ON s.id = page.id
+            ORDER BY page.score, page.id""",
+        [match, *params, *page_params, per_page + 1, offset]
+    )
+    sentences = []
+    for r in rows[:per_page]:
+        sentence = _sentence_dict(r)
+        sentence["score"] = r[9]
+        sentence["snippet"] = snippet([sentence["korean"], sentence["english"]], search)
+        sentences.append(sentence)
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor([sentences[-1]["score"], sentences[-1]["id"]])
+    return {"sentences": sentences, "total": row_count, "page": None if cursor else page,
+            "per_page": per_page, "next_cursor": next_cursor}
 
 
 @router.get("/{sentence_id}")
-async def get_sentence(sentence_id: int):
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            "SELECT id, korean, english, formality, topik_level, source, notes, created_at FROM sentences WHERE id = ?",
-            (sentence_id,)
-        )
-        if not rows:
-            return JSONResponse({"error": "Not found"}, status_code=404)
-        r = rows[0]
-
-        # Get linked items
-        linked = await db.execute_fetchall(
-            """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level
-               FROM sentence_items si
-               JOIN items i ON i.id = si.item_id
-               WHERE si.sentence_id = ?""",
-            (sentence_id,)
-        )
-        linked_items = [{"id": li[0], "korean": li[1], "english": li[2],
-                         "item_type": li[3], "topik_level": li[4]} for li in linked]
-
-        return {
-            "id": r[0], "korean": r[1], "english": r[2],
-            "formality": r[3], "topik_level": r[4], "source": r[5],
-            "notes": r[6], "created_at": r[7],
-            "linked_items": linked_items,
-        }
-    finally:
-        await db.close()
+async def get_sentence(sentence_id: int, db: aiosqlite.Connection = Depends(get_db)):
+    rows = await db.execute_fetchall(
+        "SELECT id, korean, english, formality, topik_level, source, notes, created_at FROM sentences WHERE id = ?",
+        (sentence_id,)
+    )
+    if not rows:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    r = rows[0]
+
+    # Get linked items
+    linked = await db.execute_fetchall(
+        """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level
+           FROM sentence_items si
+           JOIN items i ON i.id = si.item_id
+           WHERE si.sentence_id = ?""",
+        (sentence_id,)
+    )
+    linked_items = [{"id": li[0], "korean": li[1], "english": li[2],
+                     "item_type": li[3], "topik_level": li[4]} for li in linked]
+
+    return {
+        "id": r[0], "korean": r[1], "english": r[2],
+        "formality": r[3], "topik_level": r[4], "source": r[5],
+        "notes": r[6], "created_at": r[7],
+        "linked_items": linked_items,
+    }
 
 
 @router.post("", dependencies=[Depends(require_teacher)])
 async def create_sentence(req: SentenceCreate):
-    db = await get_db()
-    try:
-        english = req.english.strip()
-
-        # Auto-translate if no English provided
-        if not english:
-            english = await chat_completion(
-                "Translate the following Korean sentence to natural English. Return ONLY the English translation, nothing else.",
-                req.korean
-            )
-            english = english.strip().strip('"')
+    english = req.english.strip()
+
+    # Auto-translate if no English provided (before taking the writer connection)
+    if not english:
+        english = await chat_completion(
+            "Translate the following Korean sentence to natural English. Return ONLY the English translation, nothing else.",
+            req.korean,
+            cache=True,
+        )
+        english = english.strip().strip('"')
 
+    async with write_connection() as db:
         # Auto-link words to existing items (no AI — pure Python matching)
         matched_items = await find_matching_items(db, req.korean)
         linked_ids = [m["id"] for m in matched_items]
@@ -126,141 +202,124 @@ async def create_sentence(req: SentenceCreate):
         )
         await db.commit()
 
-        return {
-            "id": sentence_id,
-            "english": english,
-            "linked_items": matched_items,
-            "topik_level": topik_level,
-        }
-    finally:
-        await db.close()
+    return {
+        "id": sentence_id,
+        "english": english,
+        "linked_items": matched_items,
+        "topik_level": topik_level,
+    }
 
 
 @router.post("/{sentence_id}/link/{item_id}", dependencies=[Depends(require_teacher)])
-async def link_item(sentence_id: int, item_id: int):
+async def link_item(sentence_id: int, item_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
     """Manually link an item to a sentence."""
-    db = await get_db()
-    try:
-        await db.execute(
-            "INSERT OR IGNORE INTO sentence_items (sentence_id, item_id) VALUES (?, ?)",
-            (sentence_id, item_id)
-        )
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+    await db.execute(
+        "INSERT OR IGNORE INTO sentence_items (sentence_id, item_id) VALUES (?, ?)",
+        (sentence_id, item_id)
+    )
+    await db.commit()
+    return {"ok": True}
 
 
 @router.delete("/{sentence_id}/link/{item_id}", dependencies=[Depends(require_teacher)])
-async def unlink_item(sentence_id: int, item_id: int):
+async def unlink_item(sentence_id: int, item_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
     """Remove a link between an item and a sentence."""
-    db = await get_db()
-    try:
-        await db.execute(
-            "DELETE FROM sentence_items WHERE sentence_id = ? AND item_id = ?",
-            (sentence_id, item_id)
-        )
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+    await db.execute(
+        "DELETE FROM sentence_items WHERE sentence_id = ? AND item_id = ?",
+        (sentence_id, item_id)
+    )
+    await db.commit()
+    return {"ok": True}
+
+
+def _build_breakdown(index: item_index.ItemMatchIndex, sentence_korean: str,
+                     linked_ids: set[int]) -> list[dict]:
+    """Tokenize a sentence and match each Korean token to its best item."""
+    # Tokenize sentence into Korean words and non-Korean separators
+    tokens = re.findall(r'[가-힣]+|[^가-힣]+', sentence_korean)
+
+    breakdown = []
+    for token in tokens:
+        if not re.match(r'[가-힣]+', token):
+            # Non-Korean token (space, punctuation)
+            breakdown.append({"text": token, "type": "separator"})
+            continue
+
+        # Prefer an exact korean match, then exact dictionary form, then the
+        # longest item containing / contained in the token
+        best_match = None
+        item_id = index.best_match(token)
+        if item_id is not None:
+            item = index.items[item_id]
+            best_match = {
+                "id": item_id, "korean": item["korean"], "english": item["english"],
+                "item_type": item["item_type"], "topik_level": item["topik_level"],
+                "pos": item["pos"], "dictionary_form": item["dictionary_form"],
+                "linked": item_id in linked_ids,
+            }
 
+        breakdown.append({
+            "text": token,
+            "type": "word",
+            "match": best_match,
+        })
+    return breakdown
+
+
+async def _breakdowns(db: aiosqlite.Connection, sentence_ids: list[int]) -> list[dict]:
+    """Breakdowns for many sentences with two queries; missing ids are skipped."""
+    if not sentence_ids:
+        return []
+    placeholders = ",".join("?" * len(sentence_ids))
+    rows = await db.execute_fetchall(
+        f"SELECT id, korean, english, formality, topik_level FROM sentences WHERE id IN ({placeholders})",
+        sentence_ids
+    )
+    # Linked items for these sentences
+    linked = await db.execute_fetchall(
+        f"SELECT sentence_id, item_id FROM sentence_items WHERE sentence_id IN ({placeholders})",
+        sentence_ids
+    )
+    linked_by_sentence = {}
+    for sentence_id, item_id in linked:
+        linked_by_sentence.setdefault(sentence_id, set()).add(item_id)
+
+    index = await item_index.get_index(db)
+    sentences = {r[0]: r for r in rows}
+    return [
+        {
+            "sentence_id": sentence_id,
+            "korean": sentences[sentence_id][1],
+            "english": sentences[sentence_id][2],
+            "formality": sentences[sentence_id][3],
+            "topik_level": sentences[sentence_id][4],
+            "breakdown": _build_breakdown(
+                index, sentences[sentence_id][1], linked_by_sentence.get(sentence_id, set())
+            ),
+        }
+        for sentence_id in dict.fromkeys(sentence_ids) if sentence_id in sentences
+    ]
 
-@router.get("/{sentence_id}/breakdown")
-async def sentence_breakdown(sentence_id: int):
-    """Word-by-word breakdown of a sentence, matching each token to items."""
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            "SELECT korean, english, formality, topik_level FROM sentences WHERE id = ?",
-            (sentence_id,)
-        )
-        if not rows:
-            return JSONResponse({"error": "Not found"}, status_code=404)
-        sentence_korean = rows[0][0]
-        sentence_english = rows[0][1]
-        formality = rows[0][2]
-        topik_level = rows[0][3]
-
-        # Get linked items for this sentence
-        linked = await db.execute_fetchall(
-            """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level, i.pos, i.dictionary_form
-               FROM sentence_items si
-               JOIN items i ON i.id = si.item_id
-               WHERE si.sentence_id = ?""",
-            (sentence_id,)
-        )
-        items_map = {}
-        for li in linked:
-            items_map[li[0]] = {
-                "id": li[0], "korean": li[1], "english": li[2],
-                "item_type": li[3], "topik_level": li[4], "pos": li[5],
-                "dictionary_form": li[6],
-            }
 
-        # Tokenize sentence into Korean words and non-Korean separators
-        tokens = re.findall(r'[가-힣]+|[^가-힣]+', sentence_korean)
+@router.post("/breakdowns")
+async def sentence_breakdowns(body: SentenceBreakdownBatch, db: aiosqlite.Connection = Depends(get_db)):
+    """Word-by-word breakdowns for many sentences at once (max 200)."""
+    if len(body.sentence_ids) > 200:
+        return JSONResponse({"error": "At most 200 sentence_ids per request"}, status_code=400)
+    return {"breakdowns": await _breakdowns(db, body.sentence_ids)}
 
-        # For each Korean token, try to match against linked items
-        all_items = await db.execute_fetchall(
-            "SELECT id, korean, dictionary_form, item_type, topik_level, pos, english FROM items"
-        )
 
-        breakdown = []
-        for token in tokens:
-            if not re.match(r'[가-힣]+', token):
-                # Non-Korean token (space, punctuation)
-                breakdown.append({"text": token, "type": "separator"})
-                continue
-
-            # Try to find a matching item
-            best_match = None
-            for item in all_items:
-                item_korean = item[1].replace(" ", "")
-                dict_form = (item[2] or "").replace(" ", "")
-                # Check if the token contains or is contained in the item
-                if token in item_korean or item_korean in token:
-                    best_match = {
-                        "id": item[0], "korean": item[1], "english": item[6],
-                        "item_type": item[3], "topik_level": item[4], "pos": item[5],
-                        "dictionary_form": item[2],
-                        "linked": item[0] in items_map,
-                    }
-                    # Prefer exact matches
-                    if token == item_korean:
-                        break
-                elif dict_form and (token in dict_form or dict_form in token):
-                    best_match = {
-                        "id": item[0], "korean": item[1], "english": item[6],
-                        "item_type": item[3], "topik_level": item[4], "pos": item[5],
-                        "dictionary_form": item[2],
-                        "linked": item[0] in items_map,
-                    }
-
-            breakdown.append({
-                "text": token,
-                "type": "word",
-                "match": best_match,
-            })
-
-        return {
-            "sentence_id": sentence_id,
-            "korean": sentence_korean,
-            "english": sentence_english,
-            "formality": formality,
-            "topik_level": topik_level,
-            "breakdown": breakdown,
-        }
-    finally:
-        await db.close()
+@router.get("/{sentence_id}/breakdown")
+async def sentence_breakdown(sentence_id: int, db: aiosqlite.Connection = Depends(get_db)):
+    """Word-by-word breakdown of a sentence, matching each token to items."""
+    results = await _breakdowns(db, [sentence_id])
+    if not results:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    return results[0]
 
 
 @router.delete("/{sentence_id}", dependencies=[Depends(require_teacher)])
-async def delete_sentence(sentence_id: int):
-    db = await get_db()
-    try:
-        await db.execute("DELETE FROM sentences WHERE id = ?", (sentence_id,))
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+async def delete_sentence(sentence_id: int, db: aiosqlite.Connection = Depends(get_write_db)):
+    await db.execute("DELETE FROM sentences WHERE id = ?", (sentence_id,))
+    await db.commit()
+    return {"ok": True}
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Request
-from app.database import get_db
+import aiosqlite
+from fastapi import APIRouter, Request, Depends
+from app.database import get_db, get_write_db, set_setting
 from app.models import SettingUpdate
-from app.auth import get_student_id
+from app.auth import get_student_id, require_teacher
 
 router = APIRouter()
 
@@ -33,75 +34,65 @@ def _mask_key(value: str) -> str:
 
 
 @router.get("")
-async def get_settings(request: Request):
+async def get_settings(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     student_id = get_student_id(request) or 0
-    db = await get_db()
-    try:
-        # Get global settings + student-specific overrides
-        rows = await db.execute_fetchall("SELECT key, value FROM settings WHERE student_id = 0")
-        if student_id:
-            student_rows = await db.execute_fetchall(
-                "SELECT key, value FROM settings WHERE student_id = ?", (student_id,)
-            )
+    # Get global settings + student-specific overrides
+    rows = await db.execute_fetchall("SELECT key, value FROM settings WHERE student_id = 0")
+    if student_id:
+        student_rows = await db.execute_fetchall(
+            "SELECT key, value FROM settings WHERE student_id = ?", (student_id,)
+        )
+    else:
+        student_rows = []
+    settings = dict(DEFAULTS)
+    for r in rows:
+        if r[0] in SENSITIVE_KEYS:
+            settings[r[0]] = _mask_key(r[1])
+            settings[f"{r[0]}_set"] = bool(r[1])
         else:
-            student_rows = []
-        settings = dict(DEFAULTS)
-        for r in rows:
-            if r[0] in SENSITIVE_KEYS:
-                settings[r[0]] = _mask_key(r[1])
-                settings[f"{r[0]}_set"] = bool(r[1])
-            else:
-                settings[r[0]] = r[1]
-        # Student-specific settings override globals
-        for r in student_rows:
-            if r[0] in SENSITIVE_KEYS:
-                settings[r[0]] = _mask_key(r[1])
-                settings[f"{r[0]}_set"] = bool(r[1])
-            else:
-                settings[r[0]] = r[1]
-
-        # OpenAI key .env fallback
-        if "openai_api_key" not in settings:
-            from app.config import OPENAI_API_KEY
-            if OPENAI_API_KEY and OPENAI_API_KEY != "sk-...":
-                settings["openai_api_key"] = _mask_key(OPENAI_API_KEY)
-                settings["openai_api_key_set"] = True
+            settings[r[0]] = r[1]
+    # Student-specific settings override globals
+    for r in student_rows:
+        if r[0] in SENSITIVE_KEYS:
+            settings[r[0]] = _mask_key(r[1])
+            settings[f"{r[0]}_set"] = bool(r[1])
+        else:
+            settings[r[0]] = r[1]
+
+    # OpenAI key .env fallback
+    if "openai_api_key" not in settings:
+        from app.config import OPENAI_API_KEY
+        if OPENAI_API_KEY and OPENAI_API_KEY != "sk-...":
+            settings["openai_api_key"] = _mask_key(OPENAI_API_KEY)
+            settings["openai_api_key_set"] = True
+        else:
+            settings["openai_api_key"] = ""
+            settings["openai_api_key_set"] = False
+
+    # Bot config .env fallbacks
+    import app.config as cfg
+    for key, (env_attr, is_sensitive) in BOT_CONFIG_KEYS.items():
+        if key not in settings:
+            env_val = getattr(cfg, env_attr, "")
+            if is_sensitive:
+                settings[key] = _mask_key(env_val) if env_val else ""
+                settings[f"{key}_set"] = bool(env_val)
             else:
-                settings["openai_api_key"] = ""
-                settings["openai_api_key_set"] = False
+                settings[key] = env_val or ""
 
-        # Bot config .env fallbacks
-        import app.config as cfg
-        for key, (env_attr, is_sensitive) in BOT_CONFIG_KEYS.items():
-            if key not in settings:
-                env_val = getattr(cfg, env_attr, "")
-                if is_sensitive:
-                    settings[key] = _mask_key(env_val) if env_val else ""
-                    settings[f"{key}_set"] = bool(env_val)
-                else:
-                    settings[key] = env_val or ""
-
-        return settings
-    finally:
-        await db.close()
+    return settings
 
 
 @router.put("/{key}")
-async def update_setting(key: str, body: SettingUpdate, request: Request):
+async def update_setting(key: str, body: SettingUpdate, request: Request,
+                         db: aiosqlite.Connection = Depends(get_write_db)):
     student_id = get_student_id(request) or 0
     # Bot config keys are always global (student_id=0)
     if key in BOT_CONFIG_KEYS or key in ("openai_api_key",):
         student_id = 0
-    db = await get_db()
-    try:
-        await db.execute(
-            "INSERT OR REPLACE INTO settings (key, value, student_id) VALUES (?, ?, ?)",
-            (key, body.value, student_id)
-        )
-        await db.commit()
-        return {"ok": True}
-    finally:
-        await db.close()
+    await set_setting(key, body.value, student_id, db=db)
+    await db.commit()
+    return {"ok": True}
 
 
 @router.post("/openai-key/test")
@@ -125,6 +116,28 @@ async def get_bot_status():
     }
 
 
+@router.get("/ai-cache", dependencies=[Depends(require_teacher)])
+async def get_ai_cache_stats():
+    """Hit/miss counters for the Whisper/GPT result cache."""
+    from app.services.ai_cache import get_stats
+    return get_stats()
+
+
+@router.delete("/ai-cache", dependencies=[Depends(require_teacher)])
+async def clear_ai_cache():
+    """Drop all cached transcripts and completions."""
+    from app.services.ai_cache import clear
+    await clear()
+    return {"ok": True}
+
+
+@router.get("/prompt-pool", dependencies=[Depends(require_teacher)])
+async def get_prompt_pool_stats():
+    """Hit rate and queue state of the speaking prompt prefetch worker."""
+    from app.services.prompt_pool import get_stats
+    return get_stats()
+
+
 @router.post("/telegram/restart")
 async def restart_telegram():
     """Restart the Telegram bot with current config."""
@@ -1,509 +1,519 @@
+from datetime import datetime, timedelta
+
+import aiosqlite
 from fastapi import APIRouter, Request, Depends
-from app.database import get_db, calculate_student_level
+from fastapi.responses import JSONResponse
+from app.database import get_db, calculate_student_level, get_item_events, get_items_events
 from app.auth import get_student_id, require_teacher
+from app.services import due_queue
+from app.services.forecast import forecast_student, forecast_students
 
 router = APIRouter()
 
 
 @router.get("")
-async def get_stats(request: Request):
+async def get_stats(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        # Overall counts (items are shared)
-        total = await db.execute_fetchall("SELECT COUNT(*) FROM items")
-        vocab_count = await db.execute_fetchall("SELECT COUNT(*) FROM items WHERE item_type='vocab'")
-        grammar_count = await db.execute_fetchall("SELECT COUNT(*) FROM items WHERE item_type='grammar'")
-
-        # Items by TOPIK level
-        by_level = await db.execute_fetchall(
-            "SELECT topik_level, COUNT(*) FROM items GROUP BY topik_level ORDER BY topik_level"
-        )
-
-        # Due for review (per student)
-        due = await db.execute_fetchall(
-            "SELECT COUNT(*) FROM srs_state WHERE student_id = ? AND next_review <= datetime('now')",
-            (student_id,)
-        )
-
-        # Mastery distribution (per student)
-        mastery_dist = await db.execute_fetchall(
-            """SELECT
-                SUM(CASE WHEN overall_score >= 0.8 THEN 1 ELSE 0 END) as mastered,
-                SUM(CASE WHEN overall_score >= 0.5 AND overall_score < 0.8 THEN 1 ELSE 0 END) as learning,
-                SUM(CASE WHEN overall_score < 0.5 AND practice_count > 0 THEN 1 ELSE 0 END) as struggling,
-                SUM(CASE WHEN practice_count = 0 THEN 1 ELSE 0 END) as unseen
-               FROM mastery WHERE student_id = ?""",
-            (student_id,)
-        )
-
-        # Recent practice count (last 7 days, per student)
-        recent = await db.execute_fetchall(
-            "SELECT COUNT(*) FROM practice_log WHERE student_id = ? AND created_at >= datetime('now', '-7 days')",
-            (student_id,)
-        )
-
-        # Average score (last 7 days, per student)
-        avg_score = await db.execute_fetchall(
-            "SELECT AVG(overall_score) FROM practice_log WHERE student_id = ? AND created_at >= datetime('now', '-7 days') AND overall_score IS NOT NULL",
-            (student_id,)
-        )
-
-        # Student level
-        level_rows = await db.execute_fetchall(
-            """SELECT estimated_level FROM student_level_history
-               WHERE student_id = ? ORDER BY calculated_at DESC LIMIT 1""",
-            (student_id,)
-        )
-        current_level = level_rows[0][0] if level_rows else None
-
-        # Encounter count
-        encounter_count = await db.execute_fetchall(
-            "SELECT COUNT(*) FROM encounters WHERE student_id = ?",
-            (student_id,)
-        )
-
-        # Study time tracking
-        total_study_time = await db.execute_fetchall(
-            "SELECT COALESCE(SUM(duration_seconds), 0) FROM practice_log WHERE student_id = ?",
-            (student_id,)
-        )
-        study_time_7d = await db.execute_fetchall(
-            "SELECT COALESCE(SUM(duration_seconds), 0) FROM practice_log WHERE student_id = ? AND created_at >= datetime('now', '-7 days')",
-            (student_id,)
-        )
-
-        md = mastery_dist[0] if mastery_dist else (0, 0, 0, 0)
-        return {
-            "total_items": total[0][0],
-            "vocab_count": vocab_count[0][0],
-            "grammar_count": grammar_count[0][0],
-            "by_level": [{"level": r[0], "count": r[1]} for r in by_level],
-            "due_for_review": due[0][0],
-            "mastery": {
-                "mastered": md[0] or 0,
-                "learning": md[1] or 0,
-                "struggling": md[2] or 0,
-                "unseen": md[3] or 0,
-            },
-            "recent_practice_count": recent[0][0],
-            "recent_avg_score": round(avg_score[0][0], 2) if avg_score[0][0] else None,
-            "estimated_level": current_level,
-            "items_encountered": encounter_count[0][0],
-            "total_study_seconds": total_study_time[0][0],
-            "study_seconds_7d": study_time_7d[0][0],
-        }
-    finally:
-        await db.close()
+    # Overall counts (items are shared)
+    counts = await db.execute_fetchall(
+        """SELECT COUNT(*),
+                  SUM(CASE WHEN item_type='vocab' THEN 1 ELSE 0 END),
+                  SUM(CASE WHEN item_type='grammar' THEN 1 ELSE 0 END)
+           FROM items"""
+    )
+    total, vocab_count, grammar_count = counts[0]
+
+    # Items by TOPIK level
+    by_level = await db.execute_fetchall(
+        "SELECT topik_level, COUNT(*) FROM items GROUP BY topik_level ORDER BY topik_level"
+    )
+
+    # Due for review (per student)
+    due = await due_queue.count_due(db, student_id)
+    due_next_24h = await due_queue.count_due(db, student_id, within_hours=24)
+
+    # Mastery distribution, level, encounters and study time (kept by triggers)
+    rollup = await db.execute_fetchall(
+        """SELECT mastered, learning, struggling, unseen, estimated_level,
+                  items_encountered, study_seconds
+           FROM student_stats_rollup WHERE student_id = ?""",
+        (student_id,)
+    )
+    rollup = rollup[0] if rollup else (0, 0, 0, 0, None, 0, 0)
+
+    # Practice count, average score and study time over the last 7 days (today included)
+    recent = await db.execute_fetchall(
+        """SELECT COALESCE(SUM(session_count), 0), SUM(score_sum) / SUM(scored_count),
+                  COALESCE(SUM(study_seconds), 0)
+           FROM student_daily_stats
+           WHERE student_id = ? AND day > date('now', '-7 days')""",
+        (student_id,)
+    )
+    recent_count, recent_avg, study_time_7d = recent[0]
+
+    return {
+        "total_items": total,
+        "vocab_count": vocab_count or 0,
+        "grammar_count": grammar_count or 0,
+        "by_level": [{"level": r[0], "count": r[1]} for r in by_level],
+        "due_for_review": due,
+        "due_next_24h": due_next_24h,
+        "mastery": {
+            "mastered": rollup[0],
+            "learning": rollup[1],
+            "struggling": rollup[2],
+            "unseen": rollup[3],
+        },
+        "recent_practice_count": recent_count,
+        "recent_avg_score": round(recent_avg, 2) if recent_avg else None,
+        "estimated_level": rollup[4],
+        "items_encountered": rollup[5],
+        "total_study_seconds": rollup[6],
+        "study_seconds_7d": study_time_7d,
+    }
 
 
 @router.get("/level-history")
-async def get_level_history(request: Request):
+async def get_level_history(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     """Get student's TOPIK level progression over time."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT estimated_level, calculated_at FROM student_level_history
-               WHERE student_id = ? ORDER BY calculated_at ASC""",
-            (student_id,)
-        )
-        return {
-            "history": [{"level": r[0], "date": r[1]} for r in rows]
-        }
-    finally:
-        await db.close()
+    rows = await db.execute_fetchall(
+        """SELECT estimated_level, calculated_at FROM student_level_history
+           WHERE student_id = ? ORDER BY calculated_at ASC""",
+        (student_id,)
+    )
+    return {
+        "history": [{"level": r[0], "date": r[1]} for r in rows]
+    }
 
 
 @router.get("/encounters")
-async def get_encounters(request: Request):
+async def get_encounters(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     """Get student's encounter data — items they've seen/practiced."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT e.item_id, i.korean, i.english, i.item_type, i.topik_level,
-                      e.first_seen, e.first_practiced, e.encounter_count
-               FROM encounters e
-               JOIN items i ON i.id = e.item_id
-               WHERE e.student_id = ?
-               ORDER BY e.first_seen DESC
-               LIMIT 100""",
-            (student_id,)
-        )
-        return {
-            "total": len(rows),
-            "encounters": [{
-                "item_id": r[0], "korean": r[1], "english": r[2],
-                "item_type": r[3], "topik_level": r[4],
-                "first_seen": r[5], "first_practiced": r[6],
-                "encounter_count": r[7],
-            } for r in rows]
-        }
-    finally:
-        await db.close()
+    rows = await db.execute_fetchall(
+        """SELECT e.item_id, i.korean, i.english, i.item_type, i.topik_level,
+                  e.first_seen, e.first_practiced, e.encounter_count
+           FROM encounters e
+           JOIN items i ON i.id = e.item_id
+           WHERE e.student_id = ?
+           ORDER BY e.first_seen DESC
+           LIMIT 100""",
+        (student_id,)
+    )
+    return {
+        "total": len(rows),
+        "encounters": [{
+            "item_id": r[0], "korean": r[1], "english": r[2],
+            "item_type": r[3], "topik_level": r[4],
+            "first_seen": r[5], "first_practiced": r[6],
+            "encounter_count": r[7],
+        } for r in rows]
+    }
+
+
+# Downsampling buckets for the daily time series -> SQL expression for the bucket start
+_BUCKETS = {
+    "day": "day",
+    "week": "date(day, 'weekday 0', '-6 days')",  # Monday
+    "month": "date(day, 'start of month')",
+}
+
+
+def _bucket_error():
+    return JSONResponse(
+        {"error": f"bucket must be one of {', '.join(_BUCKETS)}"}, status_code=400
+    )
+
+
+def _since(days: float) -> str:
+    """UTC timestamp `days` ago, in the format item_events.ts uses."""
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
 
 
 @router.get("/activity")
-async def get_activity(request: Request, days: int = 30):
-    """Practice activity over the last N days — daily practice count and avg score."""
+async def get_activity(request: Request, days: int = 30, bucket: str = "day",
+                       db: aiosqlite.Connection = Depends(get_db)):
+    """Practice activity over the last N days (today included) — practice count,
+    avg score and study time per day, week or month."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT DATE(created_at) as day,
-                      COUNT(*) as session_count,
-                      AVG(overall_score) as avg_score,
-                      COALESCE(SUM(duration_seconds), 0) as study_seconds
-               FROM practice_log
-               WHERE student_id = ? AND created_at >= datetime('now', ?)
-               GROUP BY DATE(created_at)
-               ORDER BY day ASC""",
-            (student_id, f'-{days} days')
-        )
-        return {
-            "activity": [{
-                "date": r[0],
-                "sessions": r[1],
-                "avg_score": round(r[2], 2) if r[2] else None,
-                "study_seconds": r[3],
-            } for r in rows]
-        }
-    finally:
-        await db.close()
+    if bucket not in _BUCKETS:
+        return _bucket_error()
+    rows = await db.execute_fetchall(
+        f"""SELECT {_BUCKETS[bucket]} AS period,
+                  SUM(session_count),
+                  SUM(score_sum) / SUM(scored_count),
+                  SUM(study_seconds)
+           FROM student_daily_stats
+           WHERE student_id = ? AND day > date('now', ?) AND session_count > 0
+           GROUP BY period
+           ORDER BY period ASC""",
+        (student_id, f'-{days} days')
+    )
+    return {
+        "bucket": bucket,
+        "activity": [{
+            "date": r[0],
+            "sessions": r[1],
+            "avg_score": round(r[2], 2) if r[2] else None,
+            "study_seconds": r[3],
+        } for r in rows]
+    }
 
 
 @router.get("/mastery-by-level")
-async def get_mastery_by_level(request: Request):
+async def get_mastery_by_level(request: Request, db: aiosqlite.Connection = Depends(get_db)):
     """Mastery breakdown per TOPIK level for the current student."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT i.topik_level,
-                      COUNT(*) as total,
-                      SUM(CASE WHEN m.overall_score >= 0.8 THEN 1 ELSE 0 END) as mastered,
-                      SUM(CASE WHEN m.overall_score >= 0.5 AND m.overall_score < 0.8 THEN 1 ELSE 0 END) as learning,
-                      SUM(CASE WHEN m.overall_score < 0.5 AND m.practice_count > 0 THEN 1 ELSE 0 END) as struggling,
-                      SUM(CASE WHEN m.practice_count = 0 THEN 1 ELSE 0 END) as unseen,
-                      AVG(CASE WHEN m.practice_count > 0 THEN m.overall_score END) as avg_score
-               FROM mastery m
-               JOIN items i ON i.id = m.item_id
-               WHERE m.student_id = ?
-               GROUP BY i.topik_level
-               ORDER BY i.topik_level""",
-            (student_id,)
-        )
-        return {
-            "levels": [{
-                "level": r[0], "total": r[1],
-                "mastered": r[2] or 0, "learning": r[3] or 0,
-                "struggling": r[4] or 0, "unseen": r[5] or 0,
-                "avg_score": round(r[6], 2) if r[6] else None,
-            } for r in rows]
-        }
-    finally:
-        await db.close()
+    rows = await db.execute_fetchall(
+        """SELECT i.topik_level,
+                  COUNT(*) as total,
+                  SUM(CASE WHEN m.overall_score >= 0.8 THEN 1 ELSE 0 END) as mastered,
+                  SUM(CASE WHEN m.overall_score >= 0.5 AND m.overall_score < 0.8 THEN 1 ELSE 0 END) as learning,
+                  SUM(CASE WHEN m.overall_score < 0.5 AND m.practice_count > 0 THEN 1 ELSE 0 END) as struggling,
+                  SUM(CASE WHEN m.practice_count = 0 THEN 1 ELSE 0 END) as unseen,
+                  AVG(CASE WHEN m.practice_count > 0 THEN m.overall_score END) as avg_score
+           FROM mastery m
+           JOIN items i ON i.id = m.item_id
+           WHERE m.student_id = ?
+           GROUP BY i.topik_level
+           ORDER BY i.topik_level""",
+        (student_id,)
+    )
+    return {
+        "levels": [{
+            "level": r[0], "total": r[1],
+            "mastered": r[2] or 0, "learning": r[3] or 0,
+            "struggling": r[4] or 0, "unseen": r[5] or 0,
+            "avg_score": round(r[6], 2) if r[6] else None,
+        } for r in rows]
+    }
 
 
 @router.get("/vocab-growth")
-async def get_vocab_growth(request: Request, days: int = 90):
-    """Cumulative items encountered over time."""
+async def get_vocab_growth(request: Request, days: int = 90, bucket: str = "day",
+                           db: aiosqlite.Connection = Depends(get_db)):
+    """Cumulative items encountered over time, per day, week or month."""
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        rows = await db.execute_fetchall(
-            """SELECT DATE(first_seen) as day, COUNT(*) as new_items
-               FROM encounters
-               WHERE student_id = ? AND first_seen >= datetime('now', ?)
-               GROUP BY DATE(first_seen)
-               ORDER BY day ASC""",
-            (student_id, f'-{days} days')
-        )
-        # Make cumulative
-        cumulative = []
-        total = 0
-        for r in rows:
-            total += r[1]
-            cumulative.append({"date": r[0], "new": r[1], "cumulative": total})
-        return {"growth": cumulative}
-    finally:
-        await db.close()
+    if bucket not in _BUCKETS:
+        return _bucket_error()
+    rows = await db.execute_fetchall(
+        f"""SELECT {_BUCKETS[bucket]} AS period, SUM(new_items)
+           FROM student_daily_stats
+           WHERE student_id = ? AND day > date('now', ?) AND new_items > 0
+           GROUP BY period
+           ORDER BY period ASC""",
+        (student_id, f'-{days} days')
+    )
+    # Make cumulative
+    cumulative = []
+    total = 0
+    for r in rows:
+        total += r[1]
+        cumulative.append({"date": r[0], "new": r[1], "cumulative": total})
+    return {"bucket": bucket, "growth": cumulative}
+
+
+@router.get("/forecast")
+async def get_forecast(request: Request, days: int = 14, quality: float | None = None,
+                       new_per_day: int = 0, db: aiosqlite.Connection = Depends(get_db)):
+    """Projected reviews per day, simulated forward from the current SRS state."""
+    student_id = get_student_id(request) or 1
+    days = max(1, min(days, 90))
+    new_per_day = max(0, min(new_per_day, 50))
+    if quality is not None:
+        quality = max(0.0, min(quality, 1.0))
+    return await forecast_student(db, student_id, days, quality, new_per_day)
 
 
-@router.get("/teacher/overview", dependencies=[Depends(require_teacher)])
-async def teacher_overview():
-    """Teacher dashboard: overview of all students' progress."""
-    db = await get_db()
-    try:
-        students = await db.execute_fetchall(
-            "SELECT id, username, display_name, created_at FROM students ORDER BY id"
-        )
-        total_items = await db.execute_fetchall("SELECT COUNT(*) FROM items")
+# Sortable overview columns -> SQL expression
+_OVERVIEW_SORT_KEYS = {
+    "id": "s.id", "username": "s.username", "display_name": "s.display_name",
+    "created_at": "s.created_at", "total_practices": "total_practices",
+    "recent_practices": "recent_practices", "recent_avg_score": "recent_avg_score",
+    "last_practice": "last_practice", "due_for_review": "due_for_review",
+    "mastered": "mastered", "learning": "learning", "struggling": "struggling",
+    "unseen": "unseen", "estimated_level": "estimated_level",
+    "items_encountered": "items_encountered",
+}
 
-        result = []
-        for s in students:
-            sid = s[0]
 
-            # Practice count (all time + last 7 days)
-            total_practices = await db.execute_fetchall(
-                "SELECT COUNT(*) FROM practice_log WHERE student_id = ?", (sid,)
-            )
-            recent_practices = await db.execute_fetchall(
-                "SELECT COUNT(*) FROM practice_log WHERE student_id = ? AND created_at >= datetime('now', '-7 days')",
-                (sid,)
-            )
-            # Average score (last 7 days)
-            avg_score = await db.execute_fetchall(
-                "SELECT AVG(overall_score) FROM practice_log WHERE student_id = ? AND created_at >= datetime('now', '-7 days') AND overall_score IS NOT NULL",
-                (sid,)
-            )
-            # Last practice date
-            last_practice = await db.execute_fetchall(
-                "SELECT MAX(created_at) FROM practice_log WHERE student_id = ?", (sid,)
-            )
-            # Due for review
-            due = await db.execute_fetchall(
-                "SELECT COUNT(*) FROM srs_state WHERE student_id = ? AND next_review <= datetime('now')",
-                (sid,)
-            )
-            # Mastery distribution
-            mastery = await db.execute_fetchall(
-                """SELECT
-                    SUM(CASE WHEN overall_score >= 0.8 THEN 1 ELSE 0 END),
-                    SUM(CASE WHEN overall_score >= 0.5 AND overall_score < 0.8 THEN 1 ELSE 0 END),
-                    SUM(CASE WHEN overall_score < 0.5 AND practice_count > 0 THEN 1 ELSE 0 END),
-                    SUM(CASE WHEN practice_count = 0 THEN 1 ELSE 0 END)
-                   FROM mastery WHERE student_id = ?""",
-                (sid,)
-            )
-            # Estimated level
-            level_row = await db.execute_fetchall(
-                "SELECT estimated_level FROM student_level_history WHERE student_id = ? ORDER BY calculated_at DESC LIMIT 1",
-                (sid,)
-            )
-            # Items encountered
-            enc_count = await db.execute_fetchall(
-                "SELECT COUNT(*) FROM encounters WHERE student_id = ?", (sid,)
+@router.get("/teacher/overview", dependencies=[Depends(require_teacher)])
+async def teacher_overview(sort: str = "id", order: str = "asc", limit: int | None = None,
+                           offset: int = 0, forecast_days: int = 7,
+                           db: aiosqlite.Connection = Depends(get_db)):
+    """Teacher dashboard: overview of all students' progress.
+
+    Every metric comes from one query over the stats rollups (recent
+    practice is the last 7 days of student_daily_stats). sort is any
+    key in _OVERVIEW_SORT_KEYS; limit/offset page the result. The review
+    forecast (forecast_days, 0 to skip) is computed for the returned page only.
+    """
+    if sort not in _OVERVIEW_SORT_KEYS or order.lower() not in ("asc", "desc"):
+        return JSONResponse(
+            {"error": f"sort must be one of {', '.join(_OVERVIEW_SORT_KEYS)}; order asc or desc"},
+            status_code=400
+        )
+    totals = await db.execute_fetchall(
+        "SELECT (SELECT COUNT(*) FROM items), (SELECT COUNT(*) FROM students)"
+    )
+
+    rows = await db.execute_fetchall(
+        f"""WITH recent AS (
+                SELECT student_id, SUM(session_count) AS recent_practices,
+                       SUM(score_sum) / SUM(scored_count) AS recent_avg_score
+                FROM student_daily_stats
+                WHERE day > date('now', '-7 days') GROUP BY student_id
+            ),
+            due AS (
+                SELECT student_id, COUNT(*) AS due_for_review FROM srs_state
+                WHERE next_review <= datetime('now') GROUP BY student_id
             )
-
-            md = mastery[0] if mastery and mastery[0][0] is not None else (0, 0, 0, 0)
-            result.append({
-                "id": sid,
-                "username": s[1],
-                "display_name": s[2],
-                "created_at": s[3],
-                "total_practices": total_practices[0][0],
-                "recent_practices": recent_practices[0][0],
-                "recent_avg_score": round(avg_score[0][0], 2) if avg_score[0][0] else None,
-                "last_practice": last_practice[0][0],
-                "due_for_review": due[0][0],
-                "mastery": {
-                    "mastered": md[0] or 0,
-                    "learning": md[1] or 0,
-                    "struggling": md[2] or 0,
-                    "unseen": md[3] or 0,
-                },
-                "estimated_level": level_row[0][0] if level_row else None,
-                "items_encountered": enc_count[0][0],
-            })
-
-        return {
-            "total_items": total_items[0][0],
-            "students": result,
+            SELECT s.id, s.username, s.display_name, s.created_at,
+                   COALESCE(r.practice_count, 0) AS total_practices,
+                   COALESCE(rc.recent_practices, 0) AS recent_practices,
+                   rc.recent_avg_score AS recent_avg_score,
+                   r.last_practice AS last_practice,
+                   COALESCE(d.due_for_review, 0) AS due_for_review,
+                   COALESCE(r.mastered, 0) AS mastered,
+                   COALESCE(r.learning, 0) AS learning,
+                   COALESCE(r.struggling, 0) AS struggling,
+                   COALESCE(r.unseen, 0) AS unseen,
+                   r.estimated_level AS estimated_level,
+                   COALESCE(r.items_encountered, 0) AS items_encountered
+            FROM students s
+            LEFT JOIN student_stats_rollup r ON r.student_id = s.id
+            LEFT JOIN recent rc ON rc.student_id = s.id
+            LEFT JOIN due d ON d.student_id = s.id
+            ORDER BY {_OVERVIEW_SORT_KEYS[sort]} {order.upper()}, s.id
+            LIMIT ? OFFSET ?""",
+        (limit if limit is not None else -1, max(0, offset))
+    )
+
+    forecast_days = max(0, min(forecast_days, 90))
+    forecasts = {}
+    if forecast_days:
+        forecasts = await forecast_students(db, [r[0] for r in rows], days=forecast_days)
+
+    result = []
+    for r in rows:
+        entry = {
+            "id": r[0],
+            "username": r[1],
+            "display_name": r[2],
+            "created_at": r[3],
+            "total_practices": r[4],
+            "recent_practices": r[5],
+            "recent_avg_score": round(r[6], 2) if r[6] else None,
+            "last_practice": r[7],
+            "due_for_review": r[8],
+            "mastery": {
+                "mastered": r[9],
+                "learning": r[10],
+                "struggling": r[11],
+                "unseen": r[12],
+            },
+            "estimated_level": r[13],
+            "items_encountered": r[14],
         }
-    finally:
-        await db.close()
+        if r[0] in forecasts:
+            entry["forecast_due"] = forecasts[r[0]]["total_due"]
+            entry["forecast_peak"] = forecasts[r[0]]["peak"]
+        result.append(entry)
+
+    return {
+        "total_items": totals[0][0],
+        "total_students": totals[0][1],
+        "forecast_days": forecast_days,
+        "students": result,
+    }
 
 
 @router.get("/weaknesses")
-async def get_weaknesses(request: Request, limit: int = 20):
+async def get_weaknesses(request: Request, limit: int = 20, trend_days: int = 28,
+                         db: aiosqlite.Connection = Depends(get_db)):
     """
     Identify items with poor absorption or high error rates.
     Returns items sorted by weakness score (combination of low absorption, high errors, stagnation).
+    trend is the change in average attempt score between the older and the
+    newer half of the last trend_days (None without attempts in both halves).
     """
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        # Query items with comprehensive metrics
-        rows = await db.execute_fetchall(
-            """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
-                      m.exposure_count, m.usage_count, m.error_count,
-                      m.overall_score, m.practice_count, m.last_practiced
-               FROM items i
-               JOIN mastery m ON m.item_id = i.id
-               WHERE m.student_id = ? AND m.exposure_count > 0
-               ORDER BY
-                   -- Weakness score: high exposure + low usage + high errors + low mastery
-                   CASE
-                       WHEN m.usage_count = 0 THEN m.exposure_count * 2.0
-                       ELSE (m.error_count::REAL / NULLIF(m.usage_count, 0)) * m.exposure_count * (1.0 - m.overall_score)
-                   END DESC
-               LIMIT ?""",
-            (student_id, limit)
-        )
-
-        result = []
-        for r in rows:
-            absorption_rate = (r[6] / r[5]) if r[5] > 0 else 0.0  # usage / exposure
-            error_rate = (r[7] / r[6]) if r[6] > 0 else 0.0  # errors / usage
-            is_stagnant = r[5] >= 5 and r[8] < 0.5  # exposure >= 5 and mastery < 0.5
-
-            result.append({
-                "id": r[0],
-                "korean": r[1],
-                "english": r[2],
-                "item_type": r[3],
-                "topik_level": r[4],
-                "exposure_count": r[5],
-                "usage_count": r[6],
-                "error_count": r[7],
-                "overall_score": r[8],
-                "absorption_rate": round(absorption_rate, 2),
-                "error_rate": round(error_rate, 2),
-                "is_stagnant": is_stagnant,
-                "last_practiced": r[10],
-                "weakness_type": "not_absorbing" if absorption_rate < 0.3 and r[5] > 3 else (
-                    "high_errors" if error_rate > 0.5 and r[6] > 2 else (
-                        "stagnant" if is_stagnant else "needs_practice"
-                    )
+    # Query items with comprehensive metrics
+    rows = await db.execute_fetchall(
+        """SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
+                  m.exposure_count, m.usage_count, m.error_count,
+                  m.overall_score, m.practice_count, m.last_practiced
+           FROM items i
+           JOIN mastery m ON m.item_id = i.id
+           WHERE m.student_id = ? AND m.exposure_count > 0
+           ORDER BY
+               -- Weakness score: high exposure + low usage + high errors + low mastery
+               CASE
+                   WHEN m.usage_count = 0 THEN m.exposure_count * 2.0
+                   ELSE (CAST(m.error_count AS REAL) / NULLIF(m.usage_count, 0)) * m.exposure_count * (1.0 - m.overall_score)
+               END DESC
+           LIMIT ?""",
+        (student_id, limit)
+    )
+    events = await get_items_events(db, student_id, [r[0] for r in rows], since=_since(trend_days))
+    midpoint = _since(trend_days / 2)
+
+    result = []
+    for r in rows:
+        absorption_rate = (r[6] / r[5]) if r[5] > 0 else 0.0  # usage / exposure
+        error_rate = (r[7] / r[6]) if r[6] > 0 else 0.0  # errors / usage
+        is_stagnant = r[5] >= 5 and r[8] < 0.5  # exposure >= 5 and mastery < 0.5
+        older = [e["score"] for e in events.get(r[0], []) if e["score"] is not None and e["ts"] < midpoint]
+        newer = [e["score"] for e in events.get(r[0], []) if e["score"] is not None and e["ts"] >= midpoint]
+        trend = round(sum(newer) / len(newer) - sum(older) / len(older), 2) if older and newer else None
+
+        result.append({
+            "id": r[0],
+            "korean": r[1],
+            "english": r[2],
+            "item_type": r[3],
+            "topik_level": r[4],
+            "exposure_count": r[5],
+            "usage_count": r[6],
+            "error_count": r[7],
+            "overall_score": r[8],
+            "absorption_rate": round(absorption_rate, 2),
+            "error_rate": round(error_rate, 2),
+            "is_stagnant": is_stagnant,
+            "trend": trend,
+            "recent_attempts": len(newer),
+            "last_practiced": r[10],
+            "weakness_type": "not_absorbing" if absorption_rate < 0.3 and r[5] > 3 else (
+                "high_errors" if error_rate > 0.5 and r[6] > 2 else (
+                    "stagnant" if is_stagnant else "needs_practice"
                 )
-            })
+            )
+        })
 
-        return {"weaknesses": result}
-    finally:
-        await db.close()
+    return {"weaknesses": result}
 
 
 @router.get("/item-timeline/{item_id}")
-async def get_item_timeline(item_id: int, request: Request, days: int = 30):
+async def get_item_timeline(item_id: int, request: Request, days: int = 30,
+                            db: aiosqlite.Connection = Depends(get_db)):
     """
     Get temporal data for a specific item: when it was exposed, used correctly, used incorrectly.
     """
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        # Get item details
-        item_row = await db.execute_fetchall(
-            "SELECT korean, english, item_type FROM items WHERE id = ?",
-            (item_id,)
-        )
-        if not item_row:
-            return {"error": "Item not found"}
-
-        # Get encounter timeline
-        from datetime import datetime, timedelta
-        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-
-        encounters = await db.execute_fetchall(
-            """SELECT DATE(first_seen) as date, encounter_type, COUNT(*) as count
-               FROM encounters
-               WHERE student_id = ? AND item_id = ? AND first_seen >= ?
-               GROUP BY date, encounter_type
-               ORDER BY date ASC""",
-            (student_id, item_id, cutoff)
-        )
-
-        # Get current metrics
-        metrics = await db.execute_fetchall(
-            """SELECT exposure_count, usage_count, error_count, overall_score
-               FROM mastery WHERE student_id = ? AND item_id = ?""",
-            (student_id, item_id)
-        )
-
-        timeline = []
-        for e in encounters:
-            timeline.append({
-                "date": e[0],
-                "type": e[1],
-                "count": e[2]
-            })
-
-        return {
-            "item": {
-                "id": item_id,
-                "korean": item_row[0][0],
-                "english": item_row[0][1],
-                "item_type": item_row[0][2]
-            },
-            "metrics": {
-                "exposure_count": metrics[0][0] if metrics else 0,
-                "usage_count": metrics[0][1] if metrics else 0,
-                "error_count": metrics[0][2] if metrics else 0,
-                "overall_score": metrics[0][3] if metrics else 0.0
-            },
-            "timeline": timeline
-        }
-    finally:
-        await db.close()
+    # Get item details
+    item_row = await db.execute_fetchall(
+        "SELECT korean, english, item_type FROM items WHERE id = ?",
+        (item_id,)
+    )
+    if not item_row:
+        return {"error": "Item not found"}
+
+    # Every attempt in the window, from the append-only event log
+    events = await get_item_events(db, student_id, item_id, since=_since(days))
+
+    # Get current metrics
+    metrics = await db.execute_fetchall(
+        """SELECT exposure_count, usage_count, error_count, overall_score
+           FROM mastery WHERE student_id = ? AND item_id = ?""",
+        (student_id, item_id)
+    )
+
+    days_by_type = {}
+    for e in events:
+        day = days_by_type.setdefault((e["ts"][:10], e["event_type"]), [])
+        day.append(e["score"])
+    timeline = []
+    for (date, event_type), scores in days_by_type.items():
+        scored = [sc for sc in scores if sc is not None]
+        timeline.append({
+            "date": date,
+            "type": event_type,
+            "count": len(scores),
+            "avg_score": round(sum(scored) / len(scored), 2) if scored else None,
+        })
+
+    return {
+        "item": {
+            "id": item_id,
+            "korean": item_row[0][0],
+            "english": item_row[0][1],
+            "item_type": item_row[0][2]
+        },
+        "metrics": {
+            "exposure_count": metrics[0][0] if metrics else 0,
+            "usage_count": metrics[0][1] if metrics else 0,
+            "error_count": metrics[0][2] if metrics else 0,
+            "overall_score": metrics[0][3] if metrics else 0.0
+        },
+        "timeline": timeline,
+        "events": [{"ts": e["ts"], "type": e["event_type"], "score": e["score"],
+                    "session_id": e["log_id"]} for e in events]
+    }
 
 
 @router.get("/error-patterns")
-async def get_error_patterns(request: Request, limit: int = 20):
+async def get_error_patterns(request: Request, limit: int = 20, db: aiosqlite.Connection = Depends(get_db)):
     """
     Identify common error patterns: which items are frequently used incorrectly.
     Groups by item_type and grammar_category for pattern analysis.
     """
     student_id = get_student_id(request) or 1
-    db = await get_db()
-    try:
-        # Top items with highest error rates
-        top_errors = await db.execute_fetchall(
-            """SELECT i.id, i.korean, i.english, i.item_type, i.grammar_category,
-                      m.error_count, m.usage_count,
-                      ROUND(m.error_count::REAL / NULLIF(m.usage_count, 0), 2) as error_rate
-               FROM items i
-               JOIN mastery m ON m.item_id = i.id
-               WHERE m.student_id = ? AND m.usage_count > 0 AND m.error_count > 0
-               ORDER BY error_rate DESC, m.error_count DESC
-               LIMIT ?""",
-            (student_id, limit)
-        )
-
-        # Group by item type
-        type_patterns = await db.execute_fetchall(
-            """SELECT i.item_type,
-                      COUNT(*) as item_count,
-                      SUM(m.error_count) as total_errors,
-                      SUM(m.usage_count) as total_usage,
-                      ROUND(SUM(m.error_count)::REAL / NULLIF(SUM(m.usage_count), 0), 2) as avg_error_rate
-               FROM items i
-               JOIN mastery m ON m.item_id = i.id
-               WHERE m.student_id = ? AND m.usage_count > 0
-               GROUP BY i.item_type""",
-            (student_id,)
-        )
-
-        # Group by grammar category (for grammar items)
-        grammar_patterns = await db.execute_fetchall(
-            """SELECT i.grammar_category,
-                      COUNT(*) as item_count,
-                      SUM(m.error_count) as total_errors,
-                      SUM(m.usage_count) as total_usage,
-                      ROUND(SUM(m.error_count)::REAL / NULLIF(SUM(m.usage_count), 0), 2) as avg_error_rate
-               FROM items i
-               JOIN mastery m ON m.item_id = i.id
-               WHERE m.student_id = ? AND i.item_type = 'grammar' AND m.usage_count > 0
-                     AND i.grammar_category IS NOT NULL
-               GROUP BY i.grammar_category
-               ORDER BY avg_error_rate DESC""",
-            (student_id,)
-        )
-
-        return {
-            "top_errors": [{
-                "id": r[0], "korean": r[1], "english": r[2], "item_type": r[3],
-                "grammar_category": r[4], "error_count": r[5], "usage_count": r[6],
-                "error_rate": r[7]
-            } for r in top_errors],
-            "by_type": [{
-                "item_type": r[0], "item_count": r[1], "total_errors": r[2],
-                "total_usage": r[3], "avg_error_rate": r[4]
-            } for r in type_patterns],
-            "by_grammar_category": [{
-                "category": r[0], "item_count": r[1], "total_errors": r[2],
-                "total_usage": r[3], "avg_error_rate": r[4]
-            } for r in grammar_patterns]
-        }
-    finally:
-        await db.close()
+    # Top items with highest error rates
+    top_errors = await db.execute_fetchall(
+        """SELECT i.id, i.korean, i.english, i.item_type, i.grammar_category,
+                  m.error_count, m.usage_count,
+                  ROUND(m.error_count::REAL / NULLIF(m.usage_count, 0), 2) as error_rate
+           FROM items i
+           JOIN mastery m ON m.item_id = i.id
+           WHERE m.student_id = ? AND m.usage_count > 0 AND m.error_count > 0
+           ORDER BY error_rate DESC, m.error_count DESC
+           LIMIT ?""",
+        (student_id, limit)
+    )
+
+    # Group by item type
+    type_patterns = await db.execute_fetchall(
+        """SELECT i.item_type,
+                  COUNT(*) as item_count,
+                  SUM(m.error_count) as total_errors,
+                  SUM(m.usage_count) as total_usage,
+                  ROUND(SUM(m.error_count)::REAL / NULLIF(SUM(m.usage_count), 0), 2) as avg_error_rate
+           FROM items i
+           JOIN mastery m ON m.item_id = i.id
+           WHERE m.student_id = ? AND m.usage_count > 0
+           GROUP BY i.item_type""",
+        (student_id,)
+    )
+
+    # Group by grammar category (for grammar items)
+    grammar_patterns = await db.execute_fetchall(
+        """SELECT i.grammar_category,
+                  COUNT(*) as item_count,
+                  SUM(m.error_count) as total_errors,
+                  SUM(m.usage_count) as total_usage,
+                  ROUND(SUM(m.error_count)::REAL / NULLIF(SUM(m.usage_count), 0), 2) as avg_error_rate
+           FROM items i
+           JOIN mastery m ON m.item_id = i.id
+           WHERE m.student_id = ? AND i.item_type = 'grammar' AND m.usage_count > 0
+                 AND i.grammar_category IS NOT NULL
+           GROUP BY i.grammar_category
+           ORDER BY avg_error_rate DESC""",
+        (student_id,)
+    )
+
+    return {
+        "top_errors": [{
+            "id": r[0], "korean": r[1], "english": r[2], "item_type": r[3],
+            "grammar_category": r[4], "error_count": r[5], "usage_count": r[6],
+            "error_rate": r[7]
+        } for r in top_errors],
+        "by_type": [{
+            "item_type": r[0], "item_count": r[1], "total_errors": r[2],
+            "total_usage": r[3], "avg_error_rate": r[4]
+        } for r in type_patterns],
+        "by_grammar_category": [{
+            "category": r[0], "item_count": r[1], "total_errors": r[2],
+            "total_usage": r[3], "avg_error_rate": r[4]
+        } for r in grammar_patterns]
+    }
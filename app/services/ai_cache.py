@@ -0,0 +1,112 @@
+"""Cache for Whisper transcripts and GPT completions.
+
+Two layers: an in-process LRU in front of the ai_cache table. Transcripts are
+keyed by the SHA-256 of the audio; completions by a hash of everything that
+determines the response (model, prompts, temperature, response format).
+Entries expire after AI_CACHE_TTL_SECONDS and the table is trimmed to the
+newest AI_CACHE_MAX_ROWS rows on every insert.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from app.config import AI_CACHE_TTL_SECONDS, AI_CACHE_MEMORY_ENTRIES, AI_CACHE_MAX_ROWS
+from app.database import read_connection, write_connection
+
+logger = logging.getLogger(__name__)
+
+# key -> (created_at, value), most recently used last
+_memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_stats = {
+    kind: {"memory_hits": 0, "db_hits": 0, "misses": 0}
+    for kind in ("transcription", "completion")
+}
+
+
+def transcription_key(audio_sha256: str) -> str:
+    return f"transcription:{audio_sha256}"
+
+
+def completion_key(**request) -> str:
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return "completion:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _remember(key: str, created_at: float, value: str):
+    _memory[key] = (created_at, value)
+    _memory.move_to_end(key)
+    while len(_memory) > AI_CACHE_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+async def get(kind: str, key: str) -> str | None:
+    """Return the cached value for key, or None on a miss or expired entry."""
+    cutoff = time.time() - AI_CACHE_TTL_SECONDS
+    entry = _memory.get(key)
+    if entry and entry[0] >= cutoff:
+        _memory.move_to_end(key)
+        _stats[kind]["memory_hits"] += 1
+        return entry[1]
+    _memory.pop(key, None)
+
+    try:
+        async with read_connection() as db:
+            rows = await db.execute_fetchall(
+                "SELECT created_at, value FROM ai_cache WHERE cache_key = ? AND created_at >= ?",
+                (key, cutoff)
+            )
+    except Exception as e:
+        logger.warning(f"AI cache lookup failed: {e}")
+        rows = []
+
+    if rows:
+        _remember(key, rows[0][0], rows[0][1])
+        _stats[kind]["db_hits"] += 1
+        return rows[0][1]
+    _stats[kind]["misses"] += 1
+    return None
+
+
+async def put(kind: str, key: str, value: str):
+    """Store a value in both layers and evict expired/excess rows."""
+    now = time.time()
+    _remember(key, now, value)
+    try:
+        async with write_connection() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO ai_cache (cache_key, kind, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, kind, value, now)
+            )
+            await db.execute(
+                "DELETE FROM ai_cache WHERE created_at < ?", (now - AI_CACHE_TTL_SECONDS,)
+            )
+            await db.execute(
+                """DELETE FROM ai_cache WHERE cache_key IN (
+                       SELECT cache_key FROM ai_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (AI_CACHE_MAX_ROWS,)
+            )
+            await db.commit()
+    except Exception as e:
+        logger.warning(f"AI cache write failed: {e}")
+
+
+def get_stats() -> dict:
+    """Hit/miss counters per kind since startup, plus the in-memory size."""
+    stats = {}
+    for kind, counts in _stats.items():
+        lookups = sum(counts.values())
+        hits = counts["memory_hits"] + counts["db_hits"]
+        stats[kind] = {**counts, "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
+    stats["memory_entries"] = len(_memory)
+    return stats
+
+
+async def clear():
+    """Drop every cached entry (both layers)."""
+    _memory.clear()
+    async with write_connection() as db:
+        await db.execute("DELETE FROM ai_cache")
+        await db.commit()
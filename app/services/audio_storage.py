@@ -0,0 +1,67 @@
+"""Audio storage: stream uploaded recordings to disk off the event loop."""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+from fastapi import UploadFile
+from app.config import AUDIO_PATH, AUDIO_MAX_UPLOAD_BYTES, AUDIO_CHUNK_SIZE
+
+
+class AudioTooLargeError(ValueError):
+    """Raised when an upload exceeds AUDIO_MAX_UPLOAD_BYTES."""
+
+
+@dataclass
+class StoredAudio:
+    path: Path
+    filename: str  # original upload name; Whisper infers the format from it
+    size: int
+    sha256: str
+
+
+def _copy_to_disk(src: BinaryIO, dest: Path, max_bytes: int) -> tuple[int, str]:
+    """Copy src to dest in chunks, hashing as we go. Runs on a worker thread."""
+    digest = hashlib.sha256()
+    size = 0
+    partial = dest.with_name(dest.name + ".part")
+    src.seek(0)
+    try:
+        with partial.open("wb") as out:
+            while chunk := src.read(AUDIO_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AudioTooLargeError(
+                        f"Audio upload exceeds {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(partial, dest)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
+async def store_upload(upload: UploadFile,
+                       max_bytes: int = AUDIO_MAX_UPLOAD_BYTES) -> StoredAudio:
+    """
+    Persist an uploaded recording under AUDIO_PATH.
+
+    The body is streamed from the upload's spooled file to disk in
+    AUDIO_CHUNK_SIZE pieces on a worker thread, so the event loop never
+    blocks on disk I/O and the audio is never held in memory as a whole.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise AudioTooLargeError(f"Audio upload exceeds {max_bytes} bytes")
+
+    filename = upload.filename or "audio.webm"
+    ext = filename.split(".")[-1] if "." in filename else "webm"
+    path = AUDIO_PATH / f"{uuid.uuid4()}.{ext}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    size, sha256 = await asyncio.to_thread(_copy_to_disk, upload.file, path, max_bytes)
+    return StoredAudio(path=path, filename=filename, size=size, sha256=sha256)
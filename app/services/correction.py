@@ -1,13 +1,20 @@
 """Core AI correction pipeline."""
 
+import asyncio
 import json
-import uuid
-from pathlib import Path
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import UploadFile
-from app.config import AUDIO_PATH
-from app.database import get_db, record_encounter, calculate_student_level, record_encounter_with_type, update_item_metrics
+from app.database import (
+    read_connection, write_connection, calculate_student_level, find_items_by_korean,
+    insert_practice_log_items, record_item_events,
+)
+from app.services.audio_storage import store_upload
 from app.services.openai_service import transcribe_audio, chat_completion
-from app.services.srs import update_srs_after_practice
+from app.services.srs import apply_practice_results
+
+logger = logging.getLogger(__name__)
 
 CORRECTION_SYSTEM_PROMPT = """You are an expert Korean language teacher analyzing a student's spoken Korean.
 You will receive:
@@ -66,22 +73,9 @@ Be encouraging but honest. Point out specific issues with clear explanations."""
 
 
 async def find_database_item_by_korean(db, korean_text: str, item_type: str = None) -> dict | None:
-    """Find a database item by Korean text. Matches against korean field or dictionary_form."""
-    if item_type:
-        rows = await db.execute_fetchall(
-            "SELECT id, korean, english, item_type, topik_level FROM items WHERE (korean = ? OR dictionary_form = ?) AND item_type = ?",
-            (korean_text, korean_text, item_type)
-        )
-    else:
-        rows = await db.execute_fetchall(
-            "SELECT id, korean, english, item_type, topik_level FROM items WHERE korean = ? OR dictionary_form = ?",
-            (korean_text, korean_text)
-        )
-
-    if rows:
-        return {"id": rows[0][0], "korean": rows[0][1], "english": rows[0][2],
-                "item_type": rows[0][3], "topik_level": rows[0][4]}
-    return None
+    """Find a database item by Korean text (see find_items_by_korean for how it matches)."""
+    found = await find_items_by_korean(db, [(korean_text, item_type)])
+    return found.get((korean_text, item_type))
 
 
 async def log_unknown_item(db, korean: str, english: str, item_type: str,
@@ -94,43 +88,69 @@ async def log_unknown_item(db, korean: str, english: str, item_type: str,
     )
 
 
-async def process_audio_submission(audio_file: UploadFile, item_ids: list[int],
-                                    formality: str, prompt: str,
-                                    student_id: int = 1,
-                                    duration_seconds: int | None = None,
-                                    practice_mode: str = "speaking",
-                                    sentence_id: int | None = None) -> dict:
-    """Full pipeline: save audio -> transcribe -> correct -> update SRS."""
-    # Save audio
-    audio_bytes = await audio_file.read()
-    audio_id = str(uuid.uuid4())
-    ext = audio_file.filename.split(".")[-1] if audio_file.filename and "." in audio_file.filename else "webm"
-    audio_path = AUDIO_PATH / f"{audio_id}.{ext}"
-    audio_path.parent.mkdir(parents=True, exist_ok=True)
-    audio_path.write_bytes(audio_bytes)
-
-    # Transcribe
-    transcript = await transcribe_audio(audio_bytes, audio_file.filename or "audio.webm")
-
-    # Get target items from DB
-    db = await get_db()
+@asynccontextmanager
+async def _stage(timings: dict, name: str):
+    """Record the wall-clock duration of a pipeline stage in milliseconds."""
+    start = time.perf_counter()
     try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _load_target_items(item_ids: list[int]) -> list[dict]:
+    """Fetch the practice target items for the correction prompt."""
+    if not item_ids:
+        return []
+    async with read_connection() as db:
         placeholders = ",".join("?" * len(item_ids))
         rows = await db.execute_fetchall(
             f"SELECT id, korean, english, item_type FROM items WHERE id IN ({placeholders})",
             item_ids
         )
-        target_items = [
-            {"id": r[0], "korean": r[1], "english": r[2], "item_type": r[3]}
-            for r in rows
-        ]
+    return [
+        {"id": r[0], "korean": r[1], "english": r[2], "item_type": r[3]}
+        for r in rows
+    ]
 
-        # Get AI correction
-        items_desc = "\n".join(
-            f"- {item['korean']} ({item['english']}) [{item['item_type']}]"
-            for item in target_items
-        )
-        user_msg = f"""Practice prompt: {prompt}
+
+async def process_audio_submission(audio_file: UploadFile, item_ids: list[int],
+                                    formality: str, prompt: str,
+                                    student_id: int = 1,
+                                    duration_seconds: int | None = None,
+                                    practice_mode: str = "speaking",
+                                    sentence_id: int | None = None) -> dict:
+    """Full pipeline: save audio -> transcribe -> correct -> update SRS.
+
+    The recording is streamed to disk (on a worker thread) and Whisper reads
+    it back from there; the target item lookup runs concurrently with both.
+    Raises AudioTooLargeError if the upload exceeds AUDIO_MAX_UPLOAD_BYTES.
+    """
+    timings = {}
+    pipeline_start = time.perf_counter()
+
+    async def save_and_transcribe():
+        async with _stage(timings, "save_audio"):
+            stored = await store_upload(audio_file)
+        async with _stage(timings, "transcribe"):
+            transcript = await transcribe_audio(stored.path, stored.filename, stored.sha256)
+        return stored, transcript
+
+    async def load_targets():
+        async with _stage(timings, "load_targets"):
+            target_items = await _load_target_items(item_ids)
+            items_desc = "\n".join(
+                f"- {item['korean']} ({item['english']}) [{item['item_type']}]"
+                for item in target_items
+            )
+            return target_items, items_desc
+
+    (stored, transcript), (target_items, items_desc) = await asyncio.gather(
+        save_and_transcribe(), load_targets()
+    )
+
+    # Get AI correction (no pooled connection is held during the API call)
+    user_msg = f"""Practice prompt: {prompt}
 Expected formality: {formality}
 
 Target items:
@@ -139,29 +159,41 @@ Target items:
 Student's transcribed speech:
 {transcript}"""
 
+    async with _stage(timings, "correct"):
         correction_raw = await chat_completion(
             CORRECTION_SYSTEM_PROMPT, user_msg,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            cache=True,
         )
-        correction = json.loads(correction_raw)
-        correction["transcript"] = transcript
-
-        # Add backwards compatibility fields for UI
-        if "grammar" not in correction and "grammar_used" in correction:
-            correction["grammar"] = correction["grammar_used"]
-        if "vocabulary" not in correction and "items_used" in correction:
-            correction["vocabulary"] = [
-                {"word": item["korean"], "status": item["status"], "explanation": item["explanation"]}
-                for item in correction["items_used"]
-            ]
+    correction = json.loads(correction_raw)
+    correction["transcript"] = transcript
 
+    # Add backwards compatibility fields for UI
+    if "grammar" not in correction and "grammar_used" in correction:
+        correction["grammar"] = correction["grammar_used"]
+    if "vocabulary" not in correction and "items_used" in correction:
+        correction["vocabulary"] = [
+            {"word": item["korean"], "status": item["status"], "explanation": item["explanation"]}
+            for item in correction["items_used"]
+        ]
+
+    async with _stage(timings, "persist"), write_connection() as db:
         # Process ALL items the student actually used (comprehensive tracking)
         formality_score = 1.0 if not correction.get("formality", {}).get("issues") else 0.5
         items_to_update = {}  # {item_id: score}
 
+        # Resolve every reported item in one lookup
+        vocab_used = correction.get("items_used", [])
+        grammar_used = correction.get("grammar_used", [])
+        db_items = await find_items_by_korean(
+            db,
+            [(v["korean"], "vocab") for v in vocab_used]
+            + [(g["pattern"], "grammar") for g in grammar_used]
+        )
+
         # Process vocabulary items used
-        for vocab_item in correction.get("items_used", []):
-            db_item = await find_database_item_by_korean(db, vocab_item["korean"], "vocab")
+        for vocab_item in vocab_used:
+            db_item = db_items.get((vocab_item["korean"], "vocab"))
             if db_item:
                 # Score based on status
                 score = 1.0 if vocab_item["status"] == "correct" else (0.5 if vocab_item["status"] == "wrong_form" else 0.0)
@@ -173,13 +205,14 @@ Student's transcribed speech:
                     "formality": formality_score,
                     "was_used": True,
                     "was_error": is_error,
-                    "encounter_type": "used_incorrectly" if is_error else "used_correctly"
+                    "encounter_type": "used_incorrectly" if is_error else "used_correctly",
+                    "status": vocab_item["status"]
                 }
             # TODO: Log unknown items for teacher review (needs unknown_items table)
 
         # Process grammar patterns used
-        for grammar_item in correction.get("grammar_used", []):
-            db_item = await find_database_item_by_korean(db, grammar_item["pattern"], "grammar")
+        for grammar_item in grammar_used:
+            db_item = db_items.get((grammar_item["pattern"], "grammar"))
             if db_item:
                 # Score based on status
                 score = 1.0 if grammar_item["status"] == "correct" else (0.5 if grammar_item["status"] == "wrong_form" else 0.0)
@@ -191,7 +224,8 @@ Student's transcribed speech:
                     "formality": formality_score,
                     "was_used": True,
                     "was_error": is_error,
-                    "encounter_type": "used_incorrectly" if is_error else "used_correctly"
+                    "encounter_type": "used_incorrectly" if is_error else "used_correctly",
+                    "status": grammar_item["status"]
                 }
             # TODO: Log unknown items for teacher review
 
@@ -206,39 +240,39 @@ Student's transcribed speech:
                     "formality": formality_score,
                     "was_used": False,
                     "was_error": False,
-                    "encounter_type": "missing"
+                    "encounter_type": "missing",
+                    "status": "missing"
                 }
 
-        # Update SRS for ALL items (both used and target)
-        for item_id, item_data in items_to_update.items():
-            await update_srs_after_practice(
-                db, item_id, item_data["overall"],
-                {"grammar_score": item_data["grammar"], "vocab_score": item_data["vocab"], "formality_score": item_data["formality"]},
-                student_id=student_id
-            )
-            # Record detailed encounter with type for weakness tracking
-            await record_encounter_with_type(db, student_id, item_id, item_data["encounter_type"])
-            # Update comprehensive metrics (exposure, usage, error counts)
-            await update_item_metrics(db, student_id, item_id,
-                                     was_used=item_data["was_used"],
-                                     was_error=item_data["was_error"])
+        # Update SRS, mastery, encounters and metrics for ALL items in one batch
+        await apply_practice_results(db, student_id, items_to_update)
 
         # Recalculate student level after practice
         await calculate_student_level(db, student_id)
 
         # Log the practice session (include ALL items encountered, not just target items)
         all_item_ids = list(items_to_update.keys())
-        await db.execute(
+        cursor = await db.execute(
             """INSERT INTO practice_log
                (item_ids, prompt, formality, audio_path, transcript, overall_score, feedback_json,
                 student_id, duration_seconds, practice_mode, sentence_id)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (json.dumps(all_item_ids), prompt, formality, str(audio_path),
+            (json.dumps(all_item_ids), prompt, formality, str(stored.path),
              transcript, correction["overall_score"], json.dumps(correction), student_id,
              duration_seconds, practice_mode, sentence_id)
         )
+        await insert_practice_log_items(db, cursor.lastrowid, student_id, [
+            (item_id, data["status"], data["overall"], data["encounter_type"])
+            for item_id, data in items_to_update.items()
+        ])
+        await record_item_events(db, student_id, [
+            (item_id, data["encounter_type"], data["overall"], data["grammar"],
+             data["vocab"], data["formality"])
+            for item_id, data in items_to_update.items()
+        ], log_id=cursor.lastrowid)
         await db.commit()
 
-        return correction
-    finally:
-        await db.close()
+    timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
+    logger.info("Correction pipeline timings (ms) for student %s: %s", student_id, timings)
+
+    return correction
@@ -0,0 +1,161 @@
+"""Per-student due queues: srs_state.next_review kept ordered in memory.
+
+Answers "how many items are due", "which items are due next" and "due within
+the next N hours" without scanning srs_state. Each student's queue is loaded
+lazily on first use and then kept current by the SRS write paths
+(update_srs_batch, the lazy state inserts) and by item/student deletion.
+
+next_review values are compared as strings, exactly like the SQL
+`next_review <= datetime('now')` they replace, so the answers match.
+
+Consistency follows the item index: mutations happen under the writer lock,
+students touched by the open writer transaction are "pending" and a queue is
+only cached from a load that did not overlap any write. A rolled-back
+transaction drops the queues it touched so they reload. New state rows are
+buffered and only enter a cached queue once their transaction commits.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+import aiosqlite
+
+
+class StudentDueQueue:
+    def __init__(self, rows=()):
+        self._due: dict[int, str | None] = {}
+        self._entries: list[tuple[str, int]] = []
+        for item_id, next_review in rows:
+            self._due[item_id] = next_review
+            if next_review is not None:
+                self._entries.append((next_review, item_id))
+        self._entries.sort()
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._due
+
+    def set(self, item_id: int, next_review: str | None):
+        self.discard(item_id)
+        self._due[item_id] = next_review
+        if next_review is not None:
+            insort(self._entries, (next_review, item_id))
+
+    def discard(self, item_id: int):
+        if item_id not in self._due:
+            return
+        old = self._due.pop(item_id)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, (old, item_id))]
+
+    def count_until(self, when: str) -> int:
+        return bisect_right(self._entries, (when, float("inf")))
+
+    def due_until(self, when: str, limit: int) -> list[tuple[int, str]]:
+        """(item_id, next_review) for items due by `when`, most overdue first."""
+        end = min(self.count_until(when), limit)
+        return [(item_id, next_review) for next_review, item_id in self._entries[:end]]
+
+
+_queues: dict[int, StudentDueQueue] = {}
+_pending: set[int] = set()  # students changed by the open writer transaction
+_pending_all = False  # a change that touched every student (item deletion)
+_pending_new: dict[int, set[int]] = {}  # student -> items inserted by the open transaction
+_generation = 0
+
+
+def now_str(hours: float = 0) -> str:
+    """UTC time in SQLite's datetime('now') format, optionally offset."""
+    return (datetime.utcnow() + timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def get_queue(db: aiosqlite.Connection, student_id: int) -> StudentDueQueue:
+    queue = _queues.get(student_id)
+    if queue is not None:
+        return queue
+    generation = _generation
+    rows = await db.execute_fetchall(
+        "SELECT item_id, next_review FROM srs_state WHERE student_id = ?", (student_id,)
+    )
+    queue = StudentDueQueue((r[0], r[1]) for r in rows)
+    # Don't cache a snapshot that may miss an overlapping or uncommitted write
+    if generation == _generation and not _pending_all and student_id not in _pending:
+        _queues[student_id] = queue
+    return queue
+
+
+async def count_due(db: aiosqlite.Connection, student_id: int, within_hours: float = 0) -> int:
+    """Items due now (or within the next within_hours)."""
+    return (await get_queue(db, student_id)).count_until(now_str(within_hours))
+
+
+async def next_due(db: aiosqlite.Connection, student_id: int, limit: int) -> list[tuple[int, str]]:
+    """Up to `limit` (item_id, next_review) pairs due now, most overdue first."""
+    return (await get_queue(db, student_id)).due_until(now_str(), limit)
+
+
+def _touch(student_id: int):
+    global _generation
+    _generation += 1
+    _pending.add(student_id)
+
+
+def set_next_review(student_id: int, next_reviews: dict[int, str]):
+    """After an SRS update: {item_id: next_review}."""
+    _touch(student_id)
+    queue = _queues.get(student_id)
+    if queue is not None:
+        for item_id, next_review in next_reviews.items():
+            queue.set(item_id, next_review)
+
+
+def add_new_items(student_id: int, item_ids: list[int]):
+    """After INSERT OR IGNORE of state rows: new rows default to due now (on commit)."""
+    _touch(student_id)
+    _pending_new.setdefault(student_id, set()).update(item_ids)
+
+
+def remove_items(item_ids: list[int]):
+    """Items were deleted (their srs_state rows cascade for every student)."""
+    global _generation, _pending_all
+    _generation += 1
+    _pending_all = True
+    for queue in _queues.values():
+        for item_id in item_ids:
+            queue.discard(item_id)
+
+
+def drop_student(student_id: int):
+    _touch(student_id)
+    _queues.pop(student_id, None)
+
+
+def end_transaction(rolled_back: bool):
+    """Called when the writer is released."""
+    global _generation, _pending_all
+    if _pending or _pending_all:
+        # Loads that overlapped this transaction must not be cached
+        _generation += 1
+        if rolled_back:
+            if _pending_all:
+                _queues.clear()
+            for student_id in _pending:
+                _queues.pop(student_id, None)
+        else:
+            now = now_str()
+            for student_id, item_ids in _pending_new.items():
+                queue = _queues.get(student_id)
+                if queue is not None:
+                    for item_id in item_ids:
+                        if item_id not in queue:
+                            queue.set(item_id, now)
+    _pending.clear()
+    _pending_new.clear()
+    _pending_all = False
+
+
+def reset():
+    """Forget all queues (pool closed)."""
+    global _pending_all
+    _queues.clear()
+    _pending.clear()
+    _pending_new.clear()
+    _pending_all = False
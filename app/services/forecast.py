@@ -0,0 +1,156 @@
+"""Review workload forecast: projected due counts per day for a student.
+
+Runs the SM-2 rules forward over the student's srs_state (all items at once,
+see srs_batch.sm2_step). Each simulated day, every item due that day is
+reviewed once with a quality drawn from the student's recent practice_log
+scores (or a fixed quality), and rescheduled. Items failed on a day come back
+the next day rather than the same day. Optionally new_per_day fresh items are
+introduced each day, to see what a given new_items_per_session would do.
+
+The simulation is seeded per student, so repeated calls give the same answer
+for the same state.
+"""
+
+from datetime import datetime
+import aiosqlite
+import numpy as np
+from app.config import FORECAST_HISTORY_DAYS, FORECAST_DEFAULT_QUALITY
+from app.services.srs_batch import sm2_step, parse_times
+
+_DAY = np.timedelta64(1, "D")
+
+
+async def _quality_samples(db: aiosqlite.Connection,
+                           student_ids: list[int]) -> dict[int, list[float]]:
+    """The newest (up to 500) recent practice scores of each student."""
+    placeholders = ",".join("?" * len(student_ids))
+    rows = await db.execute_fetchall(
+        f"""SELECT student_id, overall_score FROM (
+                SELECT student_id, overall_score,
+                       ROW_NUMBER() OVER (PARTITION BY student_id ORDER BY id DESC) AS n
+                FROM practice_log
+                WHERE student_id IN ({placeholders}) AND overall_score IS NOT NULL
+                      AND created_at >= datetime('now', ?)
+            ) WHERE n <= 500""",
+        [*student_ids, f"-{FORECAST_HISTORY_DAYS} days"]
+    )
+    samples = {}
+    for student_id, score in rows:
+        samples.setdefault(student_id, []).append(score)
+    return samples
+
+
+def _simulate(student_ids: list[int], state: dict[int, list], samples: dict[int, list[float]],
+              now: datetime, days: int, new_per_day: int) -> list[list[dict]]:
+    """
+    Run every student's items forward together. Each student draws from
+    their own RNG (one uniform per item per day), so a student's projection
+    doesn't depend on who else is simulated alongside.
+    """
+    today = np.datetime64(now.date(), "D")
+    sizes = [len(state.get(sid, [])) + new_per_day * days for sid in student_ids]
+    owner = np.repeat(np.arange(len(student_ids)), sizes)
+
+    ease, interval, reps, next_review, unseen = [], [], [], [], []
+    for sid in student_ids:
+        rows = state.get(sid, [])
+        ease += [r[0] for r in rows] + [2.5] * new_per_day * days
+        interval += [r[1] or 0.0 for r in rows] + [0.0] * new_per_day * days
+        reps += [r[2] for r in rows] + [0] * new_per_day * days
+        next_review += [r[3] for r in rows]
+        unseen += [False] * len(rows) + [True] * new_per_day * days
+    ease = np.array(ease, dtype=np.float64)
+    interval = np.array(interval, dtype=np.float64)
+    reps = np.array(reps, dtype=np.int64)
+    unseen = np.array(unseen, dtype=bool)
+
+    due_day = np.empty(len(ease), dtype=np.int64)
+    due_day[~unseen] = np.maximum(
+        0, (parse_times(next_review, now).astype("datetime64[D]") - today) // _DAY
+    )
+    # New items are introduced new_per_day at a time, one batch per day
+    due_day[unseen] = np.tile(np.repeat(np.arange(days), new_per_day), len(student_ids))
+
+    # Quality samples, flattened: student k's are pool[start[k]:start[k] + count[k]]
+    pools = [np.clip(np.array(samples[sid], dtype=np.float64), 0.0, 1.0) for sid in student_ids]
+    count = np.array([len(p) for p in pools])
+    start = np.concatenate(([0], np.cumsum(count)[:-1]))
+    pool = np.concatenate(pools)
+    rngs = [np.random.default_rng(sid) for sid in student_ids]
+
+    due_counts = np.zeros((days, len(student_ids)), dtype=np.int64)
+    new_counts = np.zeros((days, len(student_ids)), dtype=np.int64)
+    for day in range(days):
+        draws = np.concatenate([rng.random(n) for rng, n in zip(rngs, sizes)])
+        idx = np.flatnonzero(due_day == day)
+        if not idx.size:
+            continue
+        who = owner[idx]
+        fresh = unseen[idx]
+        new_counts[day] = np.bincount(who[fresh], minlength=len(student_ids))
+        due_counts[day] = np.bincount(who[~fresh], minlength=len(student_ids))
+        unseen[idx] = False
+        q = pool[start[who] + (draws[idx] * count[who]).astype(np.int64)]
+        ease[idx], interval[idx], reps[idx] = sm2_step(q, ease[idx], interval[idx], reps[idx])
+        due_day[idx] = day + np.maximum(1, np.rint(interval[idx])).astype(np.int64)
+
+    dates = [str(today + day) for day in range(days)]
+    return [
+        [{"date": dates[day], "due": int(due_counts[day, k]), "new": int(new_counts[day, k])}
+         for day in range(days)]
+        for k in range(len(student_ids))
+    ]
+
+
+async def forecast_students(db: aiosqlite.Connection, student_ids: list[int], days: int = 14,
+                            quality: float | None = None, new_per_day: int = 0) -> dict[int, dict]:
+    """
+    Day-by-day projections for several students (two queries and one
+    simulation in total), keyed by student id. Starts today (UTC); day 0
+    includes overdue items and those due later today.
+    quality: fixed assumed quality (0-1) instead of each student's history.
+    """
+    if not student_ids:
+        return {}
+    history = {} if quality is not None else await _quality_samples(db, student_ids)
+    placeholders = ",".join("?" * len(student_ids))
+    rows = await db.execute_fetchall(
+        f"""SELECT student_id, ease_factor, interval_days, repetitions, next_review
+            FROM srs_state WHERE student_id IN ({placeholders})""",
+        student_ids
+    )
+    state = {}
+    for r in rows:
+        state.setdefault(r[0], []).append(r[1:])
+
+    samples, sources = {}, {}
+    for student_id in student_ids:
+        if quality is not None:
+            samples[student_id], sources[student_id] = [quality], "fixed"
+        elif history.get(student_id):
+            samples[student_id], sources[student_id] = history[student_id], "history"
+        else:
+            samples[student_id], sources[student_id] = [FORECAST_DEFAULT_QUALITY], "default"
+
+    projections = _simulate(student_ids, state, samples, datetime.utcnow(), days, new_per_day)
+    result = {}
+    for student_id, projection in zip(student_ids, projections):
+        source = sources[student_id]
+        result[student_id] = {
+            "student_id": student_id,
+            "days": projection,
+            "total_due": sum(d["due"] for d in projection),
+            "peak": max(projection, key=lambda d: d["due"]) if projection else None,
+            "quality": {
+                "source": source,
+                "mean": round(float(np.clip(samples[student_id], 0.0, 1.0).mean()), 3),
+                "samples": len(samples[student_id]) if source == "history" else 0,
+            },
+        }
+    return result
+
+
+async def forecast_student(db: aiosqlite.Connection, student_id: int, days: int = 14,
+                           quality: float | None = None, new_per_day: int = 0) -> dict:
+    """Projection for one student (see forecast_students)."""
+    return (await forecast_students(db, [student_id], days, quality, new_per_day))[student_id]
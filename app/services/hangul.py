@@ -0,0 +1,127 @@
+"""Hangul normalization for matching AI-reported words to the item bank.
+
+Keys are the text with spaces and pattern marks (-, ~) removed and every
+syllable decomposed into compatibility jamo, so "-을 수 있다" and "(으)ㄹ 수 있다"
+share the key ㅇㅡㄹㅅㅜㅇㅣㅆㄷㅏ, and a one-letter slip such as 하새요 is one
+edit away from 하세요 instead of a whole syllable.
+
+Pattern notation is expanded into every spelling it stands for: "(으)면" gives
+으면 and 면, "-았/었어요" gives 았어요 and 었어요, "있다/없다" gives both words.
+
+stem_keys() undoes the common verb endings (먹었어 -> 먹, 봐요 -> 보), so a
+conjugated word can be looked up by the stem of an item's dictionary form.
+Irregular stems (들어 for 듣다) are not recovered.
+"""
+
+import re
+import unicodedata
+
+_INITIALS = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_VOWELS = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_FINALS = ["", *"ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"]
+
+_MARKS = re.compile(r"[-~～‐–—.…]")
+_OPTIONAL = re.compile(r"\(([^()]*)\)")
+MAX_VARIANTS = 16
+
+# Stem vowels that merge with a following 아/어 (보+아요 -> 봐요, 마시+어 -> 마셔)
+_CONTRACTED = {"ㅘ": "ㅗ", "ㅝ": "ㅜ", "ㅙ": "ㅚ", "ㅕ": "ㅣ", "ㅓ": "ㅡ", "ㅏ": "ㅡ"}
+
+# Verb endings; particles that look like endings (는, 은, 을, 면) are left out so
+# a noun that is not in the bank is not mistaken for a verb (나는 -> 나다)
+_ENDINGS = [
+    "어요", "아요", "여요", "어", "아", "여",
+    "었어요", "았어요", "였어요", "었어", "았어", "였어", "었다", "았다", "였다",
+    "었습니다", "았습니다", "였습니다", "습니다", "ㅂ니다", "습니까", "ㅂ니까",
+    "어서", "아서", "여서", "어도", "아도", "어야", "아야",
+    "는데", "은데", "었는데", "았는데", "고", "지만", "지요", "죠", "네요", "지",
+    "으세요", "세요", "으셨어요", "셨어요", "으면", "으니까", "니까",
+    "겠어요", "겠다", "고싶어요", "고싶다", "을거예요", "ㄹ거예요",
+]
+
+
+def decompose(text: str) -> str:
+    """Split Hangul syllables into compatibility jamo; other characters are kept."""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_INITIALS[code // 588] + _VOWELS[code % 588 // 28] + _FINALS[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _token_variants(token: str) -> set[str]:
+    optional = _OPTIONAL.search(token)
+    if optional:
+        before, after = token[:optional.start()], token[optional.end():]
+        return _token_variants(before + optional.group(1) + after) | _token_variants(before + after)
+    parts = token.split("/")
+    if len(parts) == 1 or not all(parts):
+        return {token.replace("/", "")}
+    if len({len(p) for p in parts}) == 1:
+        # Whole alternatives: 았/었, 이/가
+        return set(parts)
+    # The slash joins the syllables either side: 았/었어요, 아/어/여요
+    prefix, suffix = parts[0][:-1], parts[-1][1:]
+    return {prefix + alt + suffix for alt in [parts[0][-1], *parts[1:-1], parts[-1][0]]}
+
+
+def lookup_keys(text: str) -> set[str]:
+    """Every normalized, decomposed spelling of text (at most MAX_VARIANTS)."""
+    text = _MARKS.sub("", unicodedata.normalize("NFC", text or "").lower())
+    variants = {""}
+    for token in text.split():
+        variants = {v + t for v in variants for t in _token_variants(token)}
+        if len(variants) > MAX_VARIANTS:
+            variants = set(sorted(variants)[:MAX_VARIANTS])
+    return {decompose(v) for v in variants if v}
+
+
+_ENDING_KEYS = sorted({decompose(e) for e in _ENDINGS}, key=len, reverse=True)
+
+
+def dictionary_stem(key: str) -> str | None:
+    """The stem of a decomposed dictionary form (먹다 -> 먹), or None if it isn't one."""
+    if key.endswith("ㄷㅏ") and len(key) > 2:
+        return key[:-2]
+    return None
+
+
+def stem_keys(key: str) -> set[str]:
+    """Possible dictionary stems of a decomposed conjugated word."""
+    stems = set()
+    for ending in _ENDING_KEYS:
+        if key.endswith(ending) and len(key) > len(ending):
+            stems.add(key[:-len(ending)])
+        if ending[:2] not in ("ㅇㅏ", "ㅇㅓ", "ㅇㅕ"):
+            continue
+        # The ending's 아/어 merged into the stem vowel (갔어, 봐요, 해요)
+        rest = ending[2:]
+        if not key.endswith(rest) or len(key) <= len(rest):
+            continue
+        stem = key[:len(key) - len(rest)]
+        vowel = stem[-1]
+        if rest and vowel == ending[1]:
+            stems.add(stem)  # 가+았어 -> 갔어
+        if vowel in _CONTRACTED:
+            stems.add(stem[:-1] + _CONTRACTED[vowel])
+        if vowel == "ㅐ" and stem[-2:-1] == "ㅎ":
+            stems.add(stem[:-1] + "ㅏ")  # 하+여 -> 해
+    return stems
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
@@ -0,0 +1,284 @@
+"""In-memory index for matching Korean words against the item bank.
+
+An item matches a word when its korean text or dictionary_form (spaces
+removed) contains the word, or is contained in it. Two structures answer that
+without scanning every item:
+- _by_text maps each cleaned text to item ids; every substring of a word is
+  looked up there (item text inside the word).
+- _grams maps each 1- and 2-character gram to the ids whose texts contain it;
+  intersecting the word's bigram postings gives the candidates for the other
+  direction (word inside item text), which are then verified.
+
+A second set of structures resolves a word the AI reported (correction
+feedback) to a single item by its normalized key (services/hangul.py):
+- _by_key maps every lookup key of an item's korean and dictionary_form;
+- _by_stem maps the stems of verbs, adjectives and grammar patterns whose key
+  is a dictionary form (먹다 -> 먹), so conjugated words (먹었어) find them;
+- _key_grams maps jamo trigrams of the keys, giving the candidates
+  for a small edit-distance match (공부하새요 -> 공부하세요) without comparing
+  every key.
+
+The index is loaded from the writer connection when the pool opens and kept
+current by the item write helpers (insert_item, delete_items_by_ids) and the
+items router. Those mutations happen under the writer lock, so if that
+transaction is rolled back instead of committed the index is rebuilt from the
+same connection (see ConnectionPool.writer). Changes made by another process,
+such as the scripts in scripts/, are not seen until restart.
+"""
+
+from collections import Counter
+
+import aiosqlite
+
+from app.services.hangul import dictionary_stem, edit_distance, lookup_keys, stem_keys
+
+_COLUMNS = "id, korean, english, dictionary_form, item_type, topik_level, pos"
+_STEM_POS = {"verb", "adjective"}  # a NULL pos may be a noun ending in 다 (바다)
+# Keys this long (in jamo) may match with this many edits; shorter ones must match exactly
+_FUZZY_EDITS = [(12, 2), (7, 1)]
+
+
+class ItemMatchIndex:
+    def __init__(self):
+        self.items: dict[int, dict] = {}
+        self._texts: dict[int, tuple[str, ...]] = {}
+        self._by_text: dict[str, set[int]] = {}
+        self._grams: dict[str, set[int]] = {}
+        self._match_all: set[int] = set()  # items whose cleaned text is empty
+        self._keys: dict[int, tuple[set[str], set[str]]] = {}  # item id -> (keys, stems)
+        self._by_key: dict[str, set[int]] = {}
+        self._by_stem: dict[str, set[int]] = {}
+        self._key_grams: dict[str, set[int]] = {}
+
+    @staticmethod
+    def _clean_texts(item: dict) -> tuple[str, ...]:
+        texts = [item["korean"].replace(" ", "")]
+        if item["dictionary_form"]:
+            texts.append(item["dictionary_form"].replace(" ", ""))
+        return tuple(dict.fromkeys(texts))
+
+    def add(self, item: dict):
+        item_id = item["id"]
+        if item_id in self.items:
+            self.remove(item_id)
+        texts = self._clean_texts(item)
+        self.items[item_id] = item
+        self._texts[item_id] = texts
+        for text in texts:
+            if not text:
+                self._match_all.add(item_id)
+                continue
+            self._by_text.setdefault(text, set()).add(item_id)
+            for gram in _grams(text):
+                self._grams.setdefault(gram, set()).add(item_id)
+
+        keys = lookup_keys(item["korean"]) | lookup_keys(item["dictionary_form"])
+        stems = set()
+        if item["item_type"] == "grammar" or item["pos"] in _STEM_POS:
+            stems = {stem for stem in map(dictionary_stem, keys) if stem}
+        self._keys[item_id] = (keys, stems)
+        for key in keys:
+            self._by_key.setdefault(key, set()).add(item_id)
+            for gram in _key_grams(key):
+                self._key_grams.setdefault(gram, set()).add(item_id)
+        for stem in stems:
+            self._by_stem.setdefault(stem, set()).add(item_id)
+
+    def remove(self, item_id: int):
+        if self.items.pop(item_id, None) is None:
+            return
+        self._match_all.discard(item_id)
+        for text in self._texts.pop(item_id):
+            _discard(self._by_text, text, item_id)
+            for gram in _grams(text):
+                _discard(self._grams, gram, item_id)
+        keys, stems = self._keys.pop(item_id)
+        for key in keys:
+            _discard(self._by_key, key, item_id)
+            for gram in _key_grams(key):
+                _discard(self._key_grams, gram, item_id)
+        for stem in stems:
+            _discard(self._by_stem, stem, item_id)
+
+    def match_word(self, word: str) -> set[int]:
+        """Ids of items whose text contains word or is contained in it."""
+        if not word:
+            return set(self.items)
+        matched = set(self._match_all)
+
+        # Item text inside the word: look up every substring of the word
+        for i in range(len(word)):
+            for j in range(i + 1, len(word) + 1):
+                ids = self._by_text.get(word[i:j])
+                if ids:
+                    matched |= ids
+
+        # Word inside item text: candidates share all of the word's grams
+        if len(word) == 1:
+            matched |= self._grams.get(word, set())
+        else:
+            postings = [self._grams.get(g) for g in {word[i:i + 2] for i in range(len(word) - 1)}]
+            if all(postings):
+                postings.sort(key=len)
+                candidates = postings[0].intersection(*postings[1:])
+                matched |= {
+                    item_id for item_id in candidates - matched
+                    if any(word in text for text in self._texts[item_id])
+                }
+        return matched
+
+    def best_match(self, word: str) -> int | None:
+        """The single best item for a word (see rank_for_word), or None."""
+        matched = self.match_word(word)
+        if not matched:
+            return None
+        return min(matched, key=lambda item_id: self.rank_for_word(word, item_id))
+
+    def rank_for_word(self, word: str, item_id: int) -> tuple:
+        """Sort key preferring exact korean, then exact dictionary form, then longest text."""
+        item = self.items[item_id]
+        korean = item["korean"].replace(" ", "")
+        dict_form = (item["dictionary_form"] or "").replace(" ", "")
+        return (korean != word, dict_form != word,
+                -max(len(t) for t in self._texts[item_id]), item_id)
+
+    def resolve(self, text: str, item_type: str | None = None) -> int | None:
+        """
+        The item an AI-reported word or pattern refers to, or None. Tries, in
+        order: the same normalized key (exact korean first, then exact
+        dictionary form, then lowest id), the stem of a conjugated form
+        (longest stem first, and only if a single item has it), then the
+        closest key within a few jamo edits when exactly one item text is
+        that close.
+        """
+        keys = lookup_keys(text)
+
+        def of_type(ids) -> set[int]:
+            return {i for i in ids if item_type is None or self.items[i]["item_type"] == item_type}
+
+        exact = of_type(i for key in keys for i in self._by_key.get(key, ()))
+        if exact:
+            return min(exact, key=lambda i: (self.items[i]["korean"] != text,
+                                             self.items[i]["dictionary_form"] != text, i))
+
+        stems = sorted({stem for key in keys for stem in stem_keys(key)}, key=len, reverse=True)
+        for stem in stems:
+            ids = of_type(self._by_stem.get(stem, ()))
+            if ids:
+                return min(ids) if len(ids) == 1 else None  # two verbs share the stem
+
+        return self._closest(keys, of_type)
+
+    def _closest(self, keys: set[str], of_type) -> int | None:
+        best: dict[str, set[int]] = {}  # item key -> ids, at the best distance so far
+        best_distance = None
+        for key in keys:
+            limit = next((edits for length, edits in _FUZZY_EDITS if len(key) >= length), 0)
+            if best_distance is not None:
+                limit = min(limit, best_distance)
+            if not limit:
+                continue
+            # An edit touches at most three trigrams, so a match shares all but 3 * limit of them
+            grams = _key_grams(key)
+            shared = Counter(i for gram in grams for i in self._key_grams.get(gram, ()))
+            needed = max(1, len(grams) - 3 * limit)
+            for item_id in of_type(i for i, n in shared.items() if n >= needed):
+                for item_key in self._keys[item_id][0]:
+                    distance = edit_distance(key, item_key, limit)
+                    if distance > limit:
+                        continue
+                    if best_distance is None or distance < best_distance:
+                        best, best_distance = {}, distance
+                        limit = distance
+                    best.setdefault(item_key, set()).add(item_id)
+        if len(best) != 1:
+            return None  # nothing close, or two different texts equally close
+        return min(next(iter(best.values())))
+
+
+def _key_grams(key: str) -> set[str]:
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def _grams(text: str) -> set[str]:
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _discard(postings: dict[str, set[int]], key: str, item_id: int):
+    ids = postings.get(key)
+    if ids is not None:
+        ids.discard(item_id)
+        if not ids:
+            del postings[key]
+
+
+def _row_to_item(r) -> dict:
+    return {"id": r[0], "korean": r[1], "english": r[2], "dictionary_form": r[3],
+            "item_type": r[4], "topik_level": r[5], "pos": r[6]}
+
+
+_index: ItemMatchIndex | None = None
+_dirty = False  # mutated inside the current writer transaction
+
+
+async def load(db: aiosqlite.Connection):
+    """(Re)build the index from the items table."""
+    global _index, _dirty
+    rows = await db.execute_fetchall(f"SELECT {_COLUMNS} FROM items")
+    index = ItemMatchIndex()
+    for r in rows:
+        index.add(_row_to_item(r))
+    _index = index
+    _dirty = False
+
+
+async def get_index(db: aiosqlite.Connection) -> ItemMatchIndex:
+    """Return the index, loading it from db on first use (e.g. in scripts)."""
+    if _index is None:
+        await load(db)
+    return _index
+
+
+def unload():
+    global _index, _dirty
+    _index = None
+    _dirty = False
+
+
+def add_item(item: dict):
+    global _dirty
+    if _index is not None:
+        _index.add(item)
+        _dirty = True
+
+
+def remove_items(item_ids: list[int]):
+    global _dirty
+    if _index is not None:
+        for item_id in item_ids:
+            _index.remove(item_id)
+        _dirty = True
+
+
+async def refresh_items(db: aiosqlite.Connection, item_ids: list[int]):
+    """Re-read the given items through db (seeing its uncommitted writes) and update the index."""
+    global _dirty
+    if _index is None or not item_ids:
+        return
+    placeholders = ",".join("?" * len(item_ids))
+    rows = await db.execute_fetchall(
+        f"SELECT {_COLUMNS} FROM items WHERE id IN ({placeholders})", item_ids
+    )
+    for item_id in item_ids:
+        _index.remove(item_id)
+    for r in rows:
+        _index.add(_row_to_item(r))
+    _dirty = True
+
+
+async def end_transaction(db: aiosqlite.Connection, rolled_back: bool):
+    """Called when the writer is released; rebuilds if item changes were rolled back."""
+    global _dirty
+    if _dirty and rolled_back:
+        await load(db)
+    _dirty = False
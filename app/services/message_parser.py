@@ -5,7 +5,7 @@ import json
 import logging
 from app.services.openai_service import chat_completion
 from app.database import (
-    get_db, get_setting, set_setting, insert_item,
+    write_connection, get_setting, get_settings_many, set_setting, insert_item,
     check_duplicate_item, delete_items_by_ids,
 )
 
@@ -185,8 +185,12 @@ async def parse_teacher_message(message: str, context: dict | None = None) -> li
 
 async def _load_teacher_context() -> dict:
     """Load sticky teacher context from settings."""
-    level_str = await get_setting("teacher_default_level", "1")
-    tags_str = await get_setting("teacher_default_tags", "")
+    values = await get_settings_many(
+        ["teacher_default_level", "teacher_default_tags"],
+        defaults={"teacher_default_level": "1", "teacher_default_tags": ""},
+    )
+    level_str = values["teacher_default_level"]
+    tags_str = values["teacher_default_tags"]
     return {
         "default_level": int(level_str) if level_str.isdigit() else 1,
         "default_tags": [t.strip() for t in tags_str.split(",") if t.strip()] if tags_str else [],
@@ -234,14 +238,11 @@ async def _handle_command(cmd: dict) -> str:
         if not last_batch:
             return "Nothing to undo."
         item_ids = [int(x) for x in last_batch.split(",") if x.strip()]
-        db = await get_db()
-        try:
+        async with write_connection() as db:
             deleted = await delete_items_by_ids(db, item_ids)
+            await set_setting("teacher_last_batch_ids", "", db=db)
             await db.commit()
-            await set_setting("teacher_last_batch_ids", "")
-            return f"Undone: deleted {deleted} item(s) from last batch."
-        finally:
-            await db.close()
+        return f"Undone: deleted {deleted} item(s) from last batch."
 
     return "Unknown command."
 
@@ -289,8 +290,7 @@ async def process_teacher_items(message: str, source: str = "telegram") -> dict:
         }
 
     # 4. Check duplicates and insert
-    db = await get_db()
-    try:
+    async with write_connection() as db:
         created = []
         duplicates = []
         for item in parsed_items:
@@ -312,40 +312,38 @@ async def process_teacher_items(message: str, source: str = "telegram") -> dict:
             )
             created.append({"item": item, "id": item_id})
 
-        await db.commit()
-
         # 5. Save last batch IDs for undo
         if created:
             batch_ids = ",".join(str(c["id"]) for c in created)
-            await set_setting("teacher_last_batch_ids", batch_ids)
+            await set_setting("teacher_last_batch_ids", batch_ids, db=db)
 
-        # 6. Build reply
-        lines = []
-        if created:
-            lines.append(f"Added {len(created)} item(s):")
-            for c in created:
-                lines.append(_format_item_line(c["item"], c["id"]))
-
-        if duplicates:
-            dup_parts = [f"{d['korean']} (#{d['id']})" for d in duplicates]
-            lines.append(f"\u26a0\ufe0f Skipped {len(duplicates)} duplicate(s): {', '.join(dup_parts)}")
-
-        if not created and not duplicates:
-            lines.append("No items were added.")
-
-        # Show context if non-default
-        ctx_parts = []
-        if ctx["default_level"] > 1:
-            ctx_parts.append(f"TOPIK {ctx['default_level']}")
-        if ctx["default_tags"]:
-            ctx_parts.append(f"tags: {', '.join(ctx['default_tags'])}")
-        if ctx_parts:
-            lines.append(f"Context: {', '.join(ctx_parts)}")
+        await db.commit()
 
-        return {
-            "message": "\n".join(lines),
-            "created_ids": [c["id"] for c in created],
-            "is_command": False,
-        }
-    finally:
-        await db.close()
+    # 6. Build reply
+    lines = []
+    if created:
+        lines.append(f"Added {len(created)} item(s):")
+        for c in created:
+            lines.append(_format_item_line(c["item"], c["id"]))
+
+    if duplicates:
+        dup_parts = [f"{d['korean']} (#{d['id']})" for d in duplicates]
+        lines.append(f"\u26a0\ufe0f Skipped {len(duplicates)} duplicate(s): {', '.join(dup_parts)}")
+
+    if not created and not duplicates:
+        lines.append("No items were added.")
+
+    # Show context if non-default
+    ctx_parts = []
+    if ctx["default_level"] > 1:
+        ctx_parts.append(f"TOPIK {ctx['default_level']}")
+    if ctx["default_tags"]:
+        ctx_parts.append(f"tags: {', '.join(ctx['default_tags'])}")
+    if ctx_parts:
+        lines.append(f"Context: {', '.join(ctx_parts)}")
+
+    return {
+        "message": "\n".join(lines),
+        "created_ids": [c["id"] for c in created],
+        "is_command": False,
+    }
@@ -1,45 +1,109 @@
+import asyncio
+import hashlib
+from pathlib import Path
+import httpx
 import openai
-from app.config import OPENAI_API_KEY
+from app.services import ai_cache
+from app.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE, OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_TIMEOUT_SECONDS, OPENAI_CONNECT_TIMEOUT, OPENAI_MAX_RETRIES,
+)
+
+# One long-lived client per API key so TLS connections are reused across calls.
+# When the openai_api_key setting changes, a new client is built and the old one
+# is retired (closed at shutdown, so in-flight requests on it can finish).
+_clients: dict[str, openai.AsyncOpenAI] = {}
+_retired: list[openai.AsyncOpenAI] = []
+_clients_lock = asyncio.Lock()
 
 
 async def _get_api_key() -> str:
     """Get API key from DB settings first, fall back to .env."""
-    try:
-        from app.database import get_db
-        db = await get_db()
-        try:
-            rows = await db.execute_fetchall(
-                "SELECT value FROM settings WHERE key = 'openai_api_key'"
-            )
-            if rows and rows[0][0]:
-                return rows[0][0]
-        finally:
-            await db.close()
-    except Exception:
-        pass
-    return OPENAI_API_KEY
+    from app.database import get_setting
+    return await get_setting("openai_api_key", OPENAI_API_KEY)
+
+
+def _build_client(key: str) -> openai.AsyncOpenAI:
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT),
+    )
+    return openai.AsyncOpenAI(api_key=key, base_url=OPENAI_BASE_URL, http_client=http_client,
+                              max_retries=OPENAI_MAX_RETRIES)
 
 
 async def _get_client() -> openai.AsyncOpenAI:
     key = await _get_api_key()
-    return openai.AsyncOpenAI(api_key=key)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    async with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # Key changed (or first call): retire clients for old keys
+            _retired.extend(_clients.values())
+            _clients.clear()
+            client = _clients[key] = _build_client(key)
+    return client
+
+
+async def close_clients():
+    """Close all pooled OpenAI clients. Called on app shutdown."""
+    clients = list(_clients.values()) + _retired
+    _clients.clear()
+    _retired.clear()
+    for client in clients:
+        await client.close()
+
 
+async def transcribe_audio(audio: bytes | Path, filename: str = "audio.webm",
+                           audio_sha256: str | None = None) -> str:
+    """Transcribe Korean audio using Whisper API.
+
+    audio may be raw bytes or a path to a stored recording; a path is opened
+    in a worker thread and the handle passed as (name, file), so the upload
+    streams from disk instead of from a second copy of the recording (the
+    name carries the format Whisper needs). Results are cached
+    by audio_sha256 (computed here for bytes; paths are cached only when the
+    caller supplies it).
+    """
+    if audio_sha256 is None and isinstance(audio, bytes):
+        audio_sha256 = hashlib.sha256(audio).hexdigest()
+    key = ai_cache.transcription_key(audio_sha256) if audio_sha256 else None
+    if key:
+        cached = await ai_cache.get("transcription", key)
+        if cached is not None:
+            return cached
 
-async def transcribe_audio(audio_bytes: bytes, filename: str = "audio.webm") -> str:
-    """Transcribe Korean audio using Whisper API."""
     client = await _get_client()
-    response = await client.audio.transcriptions.create(
-        model="whisper-1",
-        file=(filename, audio_bytes),
-        language="ko",
-    )
+    file = await asyncio.to_thread(audio.open, "rb") if isinstance(audio, Path) else audio
+    try:
+        response = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename, file),
+            language="ko",
+        )
+    finally:
+        if file is not audio:
+            await asyncio.to_thread(file.close)
+    if key:
+        await ai_cache.put("transcription", key, response.text)
     return response.text
 
 
 async def chat_completion(system_prompt: str, user_prompt: str,
-                          response_format: dict | None = None) -> str:
-    """Call GPT-4o with given prompts."""
-    client = await _get_client()
+                          response_format: dict | None = None,
+                          cache: bool = False) -> str:
+    """Call GPT-4o with given prompts.
+
+    With cache=True an identical request (same model, prompts, temperature and
+    response format) is answered from the AI cache. Leave it off where a fresh
+    response is wanted, e.g. prompt generation.
+    """
     kwargs = {
         "model": "gpt-4o",
         "messages": [
@@ -50,5 +114,16 @@ async def chat_completion(system_prompt: str, user_prompt: str,
     }
     if response_format:
         kwargs["response_format"] = response_format
+
+    key = ai_cache.completion_key(**kwargs) if cache else None
+    if key:
+        cached = await ai_cache.get("completion", key)
+        if cached is not None:
+            return cached
+
+    client = await _get_client()
     response = await client.chat.completions.create(**kwargs)
-    return response.choices[0].message.content
+    content = response.choices[0].message.content
+    if key and content is not None:
+        await ai_cache.put("completion", key, content)
+    return content
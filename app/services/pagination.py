@@ -0,0 +1,74 @@
+"""Keyset (cursor) pagination and cached row counts for the list endpoints.
+
+A cursor is the sort key of the last row on a page, JSON-encoded and
+base64url'd so clients treat it as opaque. The next page is everything that
+sorts after it, which an index on the sort columns finds directly, so deep
+pages cost the same as the first one (OFFSET walks and discards every
+skipped row).
+
+Totals are a separate COUNT(*) over the filtered set. Callers can ask for
+an exact count, a cached one (up to LIST_TOTAL_CACHE_SECONDS old, shared by
+every request with the same filter) or none at all.
+"""
+
+import base64
+import json
+import time
+import aiosqlite
+from app.config import LIST_TOTAL_CACHE_SECONDS
+
+TOTAL_MODES = ("exact", "cached", "none")
+
+_MAX_CACHED_TOTALS = 512
+_totals: dict[tuple, tuple[float, int]] = {}
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """The sort key in a cursor; ValueError if it isn't one of `size` values."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return values
+
+
+def after_cursor(columns: list[str], values: list, descending: bool = False) -> tuple[str, list]:
+    """
+    WHERE condition (and its params) for rows that sort after `values` under
+    ORDER BY columns (all ASC or all DESC). Written as a row-value comparison
+    so SQLite can seek an index on the same columns. Only the leading column
+    may be NULL; under DESC it must not be (NULLs would sort last and be skipped).
+    """
+    op = "<" if descending else ">"
+    if values[0] is None:
+        rest = ", ".join(columns[1:])
+        marks = ", ".join("?" * (len(columns) - 1))
+        if descending:
+            return f"({columns[0]} IS NULL AND ({rest}) {op} ({marks}))", values[1:]
+        # NULLs sort first: every non-NULL row comes after
+        return f"({columns[0]} IS NOT NULL OR ({rest}) {op} ({marks}))", values[1:]
+    return f"({', '.join(columns)}) {op} ({', '.join('?' * len(columns))})", values
+
+
+async def count_rows(db: aiosqlite.Connection, sql: str, params: list, mode: str) -> int | None:
+    """Run a COUNT(*) query according to `mode` (see TOTAL_MODES); exact counts refresh the cache."""
+    if mode == "none":
+        return None
+    key = (sql, tuple(params))
+    now = time.monotonic()
+    if mode == "cached":
+        hit = _totals.get(key)
+        if hit and now - hit[0] < LIST_TOTAL_CACHE_SECONDS:
+            return hit[1]
+    total = (await db.execute_fetchall(sql, params))[0][0]
+    if len(_totals) >= _MAX_CACHED_TOTALS:
+        _totals.clear()
+    _totals[key] = (now, total)
+    return total
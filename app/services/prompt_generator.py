@@ -24,8 +24,16 @@ Guidelines:
 - Keep it focused - don't require too many items at once"""
 
 
-async def generate_prompt(items: list[dict], formality: str, db=None) -> dict:
-    """Generate practice prompt using GPT-4o. If db provided, store as sentence with auto-linking."""
+async def generate_prompt(items: list[dict], formality: str, store: bool = False) -> dict:
+    """Generate practice prompt using GPT-4o. If store is set, save as sentence with auto-linking."""
+    prompt_data = await request_prompt(items, formality)
+    if store:
+        await store_prompt(prompt_data, formality)
+    return prompt_data
+
+
+async def request_prompt(items: list[dict], formality: str) -> dict:
+    """Ask GPT-4o for a prompt covering the items. Touches no database state."""
     items_desc_parts = []
     for item in items:
         line = f"- {item['korean']} ({item['english']})"
@@ -55,12 +63,18 @@ Generate a practice prompt that requires using these items."""
         SYSTEM_PROMPT, user_msg,
         response_format={"type": "json_object"}
     )
-    prompt_data = json.loads(result)
+    return json.loads(result)
 
-    # Store as sentence if db provided
-    if db:
-        from app.database import find_matching_items, insert_sentence
 
+async def store_prompt(prompt_data: dict, formality: str):
+    """Save a generated prompt as an ai_generated sentence, auto-linked to its items.
+
+    Sets sentence_id and source on prompt_data. Must be called without a pooled
+    connection held (it takes the writer).
+    """
+    from app.database import write_connection, find_matching_items, insert_sentence
+
+    async with write_connection() as db:
         matched_items = await find_matching_items(db, prompt_data["prompt"])
         linked_ids = [m["id"] for m in matched_items]
 
@@ -72,29 +86,41 @@ Generate a practice prompt that requires using these items."""
             formality, topik_level, source="ai_generated",
             linked_item_ids=linked_ids
         )
-        prompt_data["sentence_id"] = sentence_id
-        prompt_data["source"] = "ai_generated"
+        await db.commit()
+    prompt_data["sentence_id"] = sentence_id
+    prompt_data["source"] = "ai_generated"
 
-    return prompt_data
 
+async def generate_prompt_with_sentences(items: list[dict], formality: str, store: bool = False,
+                                         student_id: int | None = None) -> dict:
+    """Try to find a teacher sentence matching the items. Fall back to GPT generation.
 
-async def generate_prompt_with_sentences(items: list[dict], formality: str, db=None) -> dict:
-    """Try to find a teacher sentence matching the items. Fall back to GPT generation."""
-    if db:
-        from app.database import get_sentences_for_items
-        item_ids = [i["id"] for i in items]
+    When student_id is given, a prompt prefetched for exactly these items is
+    served from the prompt pool before resorting to a live GPT call.
+    """
+    from app.database import read_connection, get_sentences_for_items
+    item_ids = [i["id"] for i in items]
+    async with read_connection() as db:
         sentences = await get_sentences_for_items(db, item_ids)
-        if sentences:
-            # Pick the sentence with most matching items (already ordered by match_count DESC)
-            best = sentences[0]
-            return {
-                "prompt": best["korean"],
-                "prompt_english": best["english"],
-                "sentence_id": best["id"],
-                "source": "teacher_sentence",
-            }
-    # Fallback to GPT generation - NOW PASS DB
-    result = await generate_prompt(items, formality, db=db)
+    if sentences:
+        # Pick the sentence with most matching items (already ordered by match_count DESC)
+        best = sentences[0]
+        return {
+            "prompt": best["korean"],
+            "prompt_english": best["english"],
+            "sentence_id": best["id"],
+            "source": "teacher_sentence",
+        }
+    # Prefetched prompt for this exact item set, if the background worker made one
+    result = None
+    if student_id is not None:
+        from app.services.prompt_pool import take_prompt
+        result = await take_prompt(student_id, item_ids, formality)
+        if result and store:
+            await store_prompt(result, formality)
+    # Fallback to GPT generation
+    if result is None:
+        result = await generate_prompt(items, formality, store=store)
     if "sentence_id" not in result:
         result["sentence_id"] = None
     if "source" not in result:
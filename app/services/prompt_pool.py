@@ -0,0 +1,214 @@
+"""Prompt pool: speaking prompts generated ahead of time by a background worker.
+
+After a student starts a speaking session, or their SRS state changes, the
+worker predicts the item set select_review_items will pick next (by running it
+inside a transaction that is rolled back) and, when no sentence already covers
+those items, asks GPT for a prompt in advance. /api/practice/start takes a
+pooled prompt for the exact item set and formality, and only falls back to a
+live GPT call on a miss.
+"""
+
+import asyncio
+import logging
+from app.config import (
+    PROMPT_PREFETCH_ENABLED, PROMPT_POOL_DEPTH, PROMPT_PREFETCH_QUEUE_SIZE,
+    PROMPT_POOL_MAX_AGE_HOURS,
+)
+from app.database import (
+    read_connection, write_connection, get_setting, get_sentences_for_items,
+    get_examples_for_items, rollback_write,
+)
+
+logger = logging.getLogger(__name__)
+
+_queue: asyncio.Queue | None = None
+_queued: dict[int, bool] = {}  # student_id -> prune stale entries when processed
+_worker_task: asyncio.Task | None = None
+# Last speaking-session parameters per student, used to predict the next one
+_session_params: dict[int, dict] = {}
+_stats = {"hits": 0, "misses": 0, "generated": 0, "invalidated": 0, "dropped": 0, "errors": 0}
+
+
+def item_key(item_ids: list[int]) -> str:
+    """Canonical key for an item set: sorted, comma-separated ids."""
+    return ",".join(str(i) for i in sorted(set(item_ids)))
+
+
+def _max_age() -> str:
+    return f"-{PROMPT_POOL_MAX_AGE_HOURS} hours"
+
+
+def start_worker():
+    global _queue, _worker_task
+    if not PROMPT_PREFETCH_ENABLED or _worker_task is not None:
+        return
+    _queue = asyncio.Queue(maxsize=PROMPT_PREFETCH_QUEUE_SIZE)
+    _worker_task = asyncio.create_task(_worker())
+    logger.info("Prompt prefetch worker started")
+
+
+async def stop_worker():
+    global _queue, _worker_task
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    try:
+        await _worker_task
+    except asyncio.CancelledError:
+        pass
+    _worker_task = None
+    _queue = None
+    _queued.clear()
+
+
+def remember_session(student_id: int, item_count: int, topik_level: int | None, formality: str):
+    """Record the parameters of a speaking session so the next one can be predicted."""
+    _session_params[student_id] = {
+        "item_count": item_count, "topik_level": topik_level, "formality": formality,
+    }
+
+
+def schedule_prefetch(student_id: int, prune: bool = False):
+    """Queue a prefetch for the student (no-op if the worker is off or the queue is full)."""
+    if _queue is None or student_id not in _session_params:
+        return
+    if student_id in _queued:
+        _queued[student_id] = _queued[student_id] or prune
+        return
+    try:
+        _queue.put_nowait(student_id)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        return
+    _queued[student_id] = prune
+
+
+def on_srs_change(student_id: int):
+    """SRS state changed: the predicted next item set may differ, so re-predict and prune."""
+    schedule_prefetch(student_id, prune=True)
+
+
+async def invalidate_items(db, item_ids: list[int]) -> int:
+    """Drop pooled prompts covering any of the items (their text or examples changed).
+
+    Runs on the caller's writer connection; the caller commits.
+    """
+    removed = 0
+    for item_id in item_ids:
+        cursor = await db.execute(
+            "DELETE FROM prompt_pool WHERE ',' || item_key || ',' LIKE ?",
+            (f"%,{item_id},%",)
+        )
+        removed += cursor.rowcount
+    _stats["invalidated"] += removed
+    return removed
+
+
+async def take_prompt(student_id: int, item_ids: list[int], formality: str) -> dict | None:
+    """Remove and return a pooled prompt for exactly these items, or None on a miss."""
+    key = item_key(item_ids)
+    async with read_connection() as db:
+        rows = await db.execute_fetchall(
+            """SELECT id, prompt, prompt_english FROM prompt_pool
+               WHERE student_id = ? AND item_key = ? AND formality = ?
+                     AND created_at >= datetime('now', ?)
+               ORDER BY id DESC LIMIT 1""",
+            (student_id, key, formality, _max_age())
+        )
+    if rows:
+        async with write_connection() as db:
+            cursor = await db.execute("DELETE FROM prompt_pool WHERE id = ?", (rows[0][0],))
+            await db.commit()
+        # rowcount 0 means a concurrent request claimed it first
+        if cursor.rowcount:
+            _stats["hits"] += 1
+            return {"prompt": rows[0][1], "prompt_english": rows[0][2]}
+    _stats["misses"] += 1
+    return None
+
+
+def get_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        "queued": len(_queued),
+        "running": _worker_task is not None,
+    }
+
+
+async def _worker():
+    while True:
+        student_id = await _queue.get()
+        prune = _queued.pop(student_id, False)
+        try:
+            await _prefetch(student_id, prune)
+        except Exception as e:
+            _stats["errors"] += 1
+            logger.warning(f"Prompt prefetch failed for student {student_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def _prefetch(student_id: int, prune: bool = False):
+    from app.services.srs import select_review_items
+    from app.services.prompt_generator import request_prompt
+
+    params = _session_params.get(student_id)
+    if not params:
+        return
+    formality = params["formality"]
+
+    async with write_connection() as db:
+        new_per_session = int(await get_setting("new_items_per_session", "2", student_id=student_id, db=db))
+        items = await select_review_items(
+            db, count=params["item_count"], topik_level=params["topik_level"],
+            student_id=student_id, new_items_per_session=new_per_session
+        )
+        # Dry run: discard the lazy state rows and curriculum update it made
+        await rollback_write(db)
+        if not items:
+            return
+        item_ids = [i["id"] for i in items]
+        key = item_key(item_ids)
+
+        # Drop expired entries, and on SRS change anything that no longer matches
+        # the predicted next session
+        cursor = await db.execute(
+            """DELETE FROM prompt_pool WHERE student_id = ?
+               AND (created_at < datetime('now', ?)
+                    OR (? AND NOT (item_key = ? AND formality = ?)))""",
+            (student_id, _max_age(), prune, key, formality)
+        )
+        _stats["invalidated"] += cursor.rowcount
+        await db.commit()
+
+        existing = await db.execute_fetchall(
+            "SELECT 1 FROM prompt_pool WHERE student_id = ? AND item_key = ? AND formality = ?",
+            (student_id, key, formality)
+        )
+        # A sentence already covers these items, so start won't need GPT
+        if existing or await get_sentences_for_items(db, item_ids):
+            return
+        examples_by_item = await get_examples_for_items(db, item_ids)
+
+    for item in items:
+        item["examples"] = examples_by_item.get(item["id"], [])
+    prompt_data = await request_prompt(items, formality)
+
+    async with write_connection() as db:
+        await db.execute(
+            """INSERT OR REPLACE INTO prompt_pool
+               (student_id, item_key, formality, prompt, prompt_english)
+               VALUES (?, ?, ?, ?, ?)""",
+            (student_id, key, formality, prompt_data["prompt"], prompt_data["prompt_english"])
+        )
+        # Depth limit: keep only the newest entries per student
+        await db.execute(
+            """DELETE FROM prompt_pool WHERE student_id = ? AND id NOT IN (
+                   SELECT id FROM prompt_pool WHERE student_id = ? ORDER BY id DESC LIMIT ?
+               )""",
+            (student_id, student_id, PROMPT_POOL_DEPTH)
+        )
+        await db.commit()
+    _stats["generated"] += 1
@@ -0,0 +1,70 @@
+"""Full-text search over items and sentences (items_fts / sentences_fts).
+
+Both FTS5 tables use the trigram tokenizer, so a search is a substring match
+like the LIKE '%...%' it replaces (case-insensitive, any script), but answered
+from the index and ranked with BM25. The whole search string is one substring.
+
+Trigram queries need at least three characters, and most Korean words are
+one or two syllables. Indexed fields are therefore stored with two trailing
+spaces, so every character starts at least one trigram, and a short search is
+expanded to the indexed trigrams that begin with it (read from the fts5vocab
+table in one range scan). A single common syllable can start thousands of
+trigrams; past MAX_EXPANDED_TERMS the search matches so much of the table that
+ranking means little, and callers fall back to a plain substring filter, which
+fills a page of such a common string almost at once.
+
+Snippets are cut in Python from the page's own columns: FTS5's snippet()
+would highlight whole trigrams and re-walk every expanded term for each row.
+"""
+
+import re
+
+import aiosqlite
+
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+SNIPPET_CONTEXT = 30  # characters kept either side of the first hit
+MAX_EXPANDED_TERMS = 64
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+async def match_expression(db: aiosqlite.Connection, vocab_table: str, text: str) -> str | None:
+    """
+    The MATCH expression for a substring search, or None when the search is
+    too short to use the index well (see MAX_EXPANDED_TERMS).
+    vocab_table: the fts5vocab table of the FTS table being searched.
+    """
+    text = text.strip()
+    if len(text) >= 3:
+        return _quote(text)
+    prefix = text.lower()
+    rows = await db.execute_fetchall(
+        f"SELECT term FROM {vocab_table} WHERE term >= ? AND term < ? LIMIT ?",
+        (prefix, prefix + "\U0010ffff", MAX_EXPANDED_TERMS + 1)
+    )
+    if len(rows) > MAX_EXPANDED_TERMS:
+        return None
+    if not rows:
+        # Shorter than a trigram, so it matches nothing, as the search should
+        return _quote(text)
+    return " OR ".join(_quote(r[0]) for r in rows)
+
+
+def snippet(fields: list[str | None], text: str) -> str | None:
+    """
+    The first field (in the order given) that contains the search, trimmed
+    around the first hit, with every hit wrapped in SNIPPET_OPEN/SNIPPET_CLOSE.
+    """
+    pattern = re.compile(re.escape(text.strip()), re.IGNORECASE)
+    for value in fields:
+        first = pattern.search(value or "")
+        if not first:
+            continue
+        start = max(0, first.start() - SNIPPET_CONTEXT)
+        end = min(len(value), first.end() + SNIPPET_CONTEXT)
+        marked = pattern.sub(lambda m: SNIPPET_OPEN + m.group(0) + SNIPPET_CLOSE, value[start:end])
+        return ("…" if start else "") + marked + ("…" if end < len(value) else "")
+    return None
@@ -3,7 +3,16 @@
 import math
 from datetime import datetime, timedelta
 import aiosqlite
-from app.database import ensure_student_item_state
+from app.database import (
+    ensure_student_items_state, record_encounters_with_type, update_items_metrics,
+    advance_curriculum_state,
+)
+from app.services import due_queue
+from app.services.srs_batch import sm2_for_rows
+
+
+# Items added by the teacher (as opposed to seeded curriculum)
+_TEACHER_SOURCES = "('telegram', 'signal', 'manual')"
 
 
 async def select_review_items(db: aiosqlite.Connection, count: int = 3,
@@ -13,107 +22,69 @@ async def select_review_items(db: aiosqlite.Connection, count: int = 3,
     """Select items for practice with 4-tier priority:
     0. Teacher-assigned unseen items (source: telegram/signal/manual)
     1. Overdue items (teacher-assigned boosted to front)
-    2. Lowest mastery items
+    2. Lowest mastery items (least recently reviewed first on ties)
     3. Curriculum-ordered unseen items (topik_level ASC, id ASC)
+
+    All tiers come from one query. A later tier is only reached once every
+    candidate of the earlier ones is taken, so the tiers can be computed as
+    disjoint sets (unseen teacher items / overdue / not yet due / other unseen),
+    each capped with its own top-N sort, and then concatenated in tier order.
     """
-    level_filter = "AND i.topik_level = ?" if topik_level else ""
-    level_params = [topik_level] if topik_level else []
-    items = []
-
-    # Tier 0: Teacher-assigned unseen items (always prioritized)
-    teacher_unseen = await db.execute_fetchall(
-        f"""SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
-                   NULL as overall_score, datetime('now') as next_review
-            FROM items i
-            WHERE i.source IN ('telegram', 'signal', 'manual')
-                  AND i.id NOT IN (SELECT item_id FROM srs_state WHERE student_id = ?)
-                  {level_filter}
-            ORDER BY i.created_at ASC
-            LIMIT ?""",
-        [student_id] + level_params + [count]
+    level_filter = "AND i.topik_level = :level" if topik_level else ""
+    unseen = "NOT EXISTS (SELECT 1 FROM srs_state s WHERE s.item_id = i.id AND s.student_id = :student_id)"
+    seen_columns = "i.id, i.korean, i.english, i.item_type, i.topik_level, m.overall_score, s.next_review"
+    seen_from = """FROM srs_state s
+                   JOIN items i ON i.id = s.item_id
+                   LEFT JOIN mastery m ON m.item_id = i.id AND m.student_id = :student_id
+                   WHERE s.student_id = :student_id"""
+
+    rows = await db.execute_fetchall(
+        f"""SELECT id, korean, english, item_type, topik_level, overall_score, next_review, tier
+            FROM (
+                SELECT * FROM (
+                    SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
+                           NULL AS overall_score, datetime('now') AS next_review,
+                           0 AS tier, i.created_at AS k1, NULL AS k2, i.id AS k3
+                    FROM items i
+                    WHERE i.source IN {_TEACHER_SOURCES} AND {unseen} {level_filter}
+                    ORDER BY k1, k3 LIMIT :count)
+                UNION ALL
+                SELECT * FROM (
+                    SELECT {seen_columns}, 1,
+                           CASE WHEN i.source IN {_TEACHER_SOURCES} THEN 0 ELSE 1 END, s.next_review, i.id
+                    {seen_from} AND s.next_review <= datetime('now') {level_filter}
+                    ORDER BY 9, 10, 11 LIMIT :count)
+                UNION ALL
+                SELECT * FROM (
+                    SELECT {seen_columns}, 2,
+                           COALESCE(m.overall_score, 0), s.last_reviewed, i.id
+                    {seen_from} AND s.next_review > datetime('now') {level_filter}
+                    ORDER BY 9, 10, 11 LIMIT :count)
+                UNION ALL
+                SELECT * FROM (
+                    SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
+                           NULL, datetime('now'), 3, i.topik_level, i.id, NULL
+                    FROM items i
+                    WHERE COALESCE(i.source, '') NOT IN {_TEACHER_SOURCES} AND {unseen} {level_filter}
+                    ORDER BY 9, 10 LIMIT :new_items)
+            )
+            ORDER BY tier, k1, k2, k3
+            LIMIT :count""",
+        {"student_id": student_id, "level": topik_level, "count": count,
+         "new_items": max(0, new_items_per_session)}
     )
-    for r in teacher_unseen:
-        item = _row_to_dict(r)
-        await ensure_student_item_state(db, item["id"], student_id)
-        items.append(item)
-
-    # Tier 1: Overdue items (teacher-assigned first)
-    if len(items) < count:
-        existing_ids = [i["id"] for i in items]
-        placeholders = ",".join("?" * len(existing_ids)) if existing_ids else "0"
-        remaining = count - len(items)
-
-        overdue = await db.execute_fetchall(
-            f"""SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
-                       m.overall_score, s.next_review
-                FROM items i
-                JOIN srs_state s ON s.item_id = i.id AND s.student_id = ?
-                LEFT JOIN mastery m ON m.item_id = i.id AND m.student_id = ?
-                WHERE s.next_review <= datetime('now')
-                      AND i.id NOT IN ({placeholders}) {level_filter}
-                ORDER BY
-                    CASE WHEN i.source IN ('telegram','signal','manual') THEN 0 ELSE 1 END,
-                    s.next_review ASC
-                LIMIT ?""",
-            [student_id, student_id] + existing_ids + level_params + [remaining]
-        )
-        items.extend([_row_to_dict(r) for r in overdue])
-
-    # Tier 2: Lowest mastery items
-    if len(items) < count:
-        existing_ids = [i["id"] for i in items]
-        placeholders = ",".join("?" * len(existing_ids)) if existing_ids else "0"
-        remaining = count - len(items)
-
-        weak = await db.execute_fetchall(
-            f"""SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
-                       m.overall_score, s.next_review
-                FROM items i
-                JOIN srs_state s ON s.item_id = i.id AND s.student_id = ?
-                LEFT JOIN mastery m ON m.item_id = i.id AND m.student_id = ?
-                WHERE i.id NOT IN ({placeholders}) {level_filter}
-                ORDER BY COALESCE(m.overall_score, 0) ASC, RANDOM()
-                LIMIT ?""",
-            [student_id, student_id] + existing_ids + level_params + [remaining]
-        )
-        items.extend([_row_to_dict(r) for r in weak])
-
-    # Tier 3: Curriculum-ordered unseen items (capped by new_items_per_session)
-    if len(items) < count:
-        existing_ids = [i["id"] for i in items]
-        placeholders = ",".join("?" * len(existing_ids)) if existing_ids else "0"
-        remaining = count - len(items)
-        new_item_limit = min(remaining, new_items_per_session)
-
-        unseen = await db.execute_fetchall(
-            f"""SELECT i.id, i.korean, i.english, i.item_type, i.topik_level,
-                       NULL as overall_score, datetime('now') as next_review
-                FROM items i
-                WHERE i.id NOT IN (SELECT item_id FROM srs_state WHERE student_id = ?)
-                      AND i.id NOT IN ({placeholders}) {level_filter}
-                ORDER BY i.topik_level ASC, i.id ASC
-                LIMIT ?""",
-            [student_id] + existing_ids + level_params + [new_item_limit]
+    items = [_row_to_dict(r) for r in rows]
+
+    # Lazily create state for the unseen items in one batch
+    new_ids = [r[0] for r in rows if r[7] in (0, 3)]
+    await ensure_student_items_state(db, new_ids, student_id)
+
+    # Advance curriculum state by the curriculum items introduced
+    curriculum = [r for r in rows if r[7] == 3]
+    if curriculum:
+        await advance_curriculum_state(
+            db, student_id, max(r[4] for r in curriculum), len(curriculum)
         )
-        for r in unseen:
-            item = _row_to_dict(r)
-            await ensure_student_item_state(db, item["id"], student_id)
-            items.append(item)
-
-        # Update curriculum state
-        if unseen:
-            from app.database import get_curriculum_state, upsert_curriculum_state
-            state = await get_curriculum_state(db, student_id)
-            if state:
-                items_added = len(unseen)
-                new_total = state["items_introduced"] + items_added
-                max_level = max(r[4] for r in unseen)
-                await upsert_curriculum_state(db, student_id, max_level, 0, new_total)
-            else:
-                # Initialize curriculum state
-                items_added = len(unseen)
-                max_level = max(r[4] for r in unseen)
-                await upsert_curriculum_state(db, student_id, max_level, 0, items_added)
 
     return items
 
@@ -178,32 +149,56 @@ async def update_srs_after_practice(db: aiosqlite.Connection, item_id: int,
                                      sub_scores: dict | None = None,
                                      student_id: int = 1):
     """Update SRS state and mastery after a practice attempt."""
-    await ensure_student_item_state(db, item_id, student_id)
+    await update_srs_batch(db, {item_id: (overall_score, sub_scores)}, student_id)
 
-    rows = await db.execute_fetchall(
-        "SELECT ease_factor, interval_days, repetitions FROM srs_state WHERE item_id = ? AND student_id = ?",
-        (item_id, student_id)
-    )
-    if not rows:
+
+async def update_srs_batch(db: aiosqlite.Connection,
+                           scores: dict[int, tuple[float, dict | None]],
+                           student_id: int = 1):
+    """
+    Update SRS state and mastery for many items in one pass.
+    scores: {item_id: (overall_score, sub_scores or None)}
+    State is read with one SELECT, SM-2 runs vectorized (srs_batch), and the
+    results are written back with executemany.
+    """
+    if not scores:
         return
+    item_ids = list(scores)
+    await ensure_student_items_state(db, item_ids, student_id)
 
-    current = rows[0]
-    new_state = calculate_sm2(
-        overall_score, current[0], current[1], current[2], sub_scores
+    placeholders = ",".join("?" * len(item_ids))
+    rows = await db.execute_fetchall(
+        f"""SELECT item_id, ease_factor, interval_days, repetitions FROM srs_state
+            WHERE student_id = ? AND item_id IN ({placeholders})""",
+        [student_id] + item_ids
     )
 
-    await db.execute(
+    srs_params = [
+        (*new_state, student_id) for new_state in sm2_for_rows(rows, scores)
+    ]
+
+    await db.executemany(
         """UPDATE srs_state
            SET ease_factor = ?, interval_days = ?, repetitions = ?,
                next_review = ?, last_reviewed = datetime('now')
            WHERE item_id = ? AND student_id = ?""",
-        (new_state["ease_factor"], new_state["interval_days"],
-         new_state["repetitions"], new_state["next_review"], item_id, student_id)
+        srs_params
     )
+    due_queue.set_next_review(student_id, {p[4]: p[3] for p in srs_params})
 
     # Update mastery
-    if sub_scores:
-        await db.execute(
+    detailed, overall_only = [], []
+    for item_id, (overall_score, sub_scores) in scores.items():
+        if sub_scores:
+            detailed.append((sub_scores.get("grammar_score", overall_score),
+                             sub_scores.get("vocab_score", overall_score),
+                             sub_scores.get("formality_score", overall_score),
+                             overall_score, item_id, student_id))
+        else:
+            overall_only.append((overall_score, item_id, student_id))
+
+    if detailed:
+        await db.executemany(
             """UPDATE mastery SET
                 grammar_score = (grammar_score * practice_count + ?) / (practice_count + 1),
                 vocab_score = (vocab_score * practice_count + ?) / (practice_count + 1),
@@ -213,18 +208,38 @@ async def update_srs_after_practice(db: aiosqlite.Connection, item_id: int,
                 last_practiced = datetime('now'),
                 updated_at = datetime('now')
             WHERE item_id = ? AND student_id = ?""",
-            (sub_scores.get("grammar_score", overall_score),
-             sub_scores.get("vocab_score", overall_score),
-             sub_scores.get("formality_score", overall_score),
-             overall_score, item_id, student_id)
+            detailed
         )
-    else:
-        await db.execute(
+    if overall_only:
+        await db.executemany(
             """UPDATE mastery SET
                 overall_score = (overall_score * practice_count + ?) / (practice_count + 1),
                 practice_count = practice_count + 1,
                 last_practiced = datetime('now'),
                 updated_at = datetime('now')
             WHERE item_id = ? AND student_id = ?""",
-            (overall_score, item_id, student_id)
+            overall_only
         )
+
+
+async def apply_practice_results(db: aiosqlite.Connection, student_id: int,
+                                 results: dict[int, dict]):
+    """
+    Apply a graded practice attempt to every item it touched, set-based.
+    results: {item_id: {"overall", "grammar", "vocab", "formality",
+                        "was_used", "was_error", "encounter_type"}}
+    Covers SRS, mastery averages, encounters and usage metrics; the caller
+    owns the transaction and commits.
+    """
+    await update_srs_batch(db, {
+        item_id: (data["overall"], {"grammar_score": data["grammar"],
+                                    "vocab_score": data["vocab"],
+                                    "formality_score": data["formality"]})
+        for item_id, data in results.items()
+    }, student_id)
+    await record_encounters_with_type(db, student_id, {
+        item_id: data["encounter_type"] for item_id, data in results.items()
+    })
+    await update_items_metrics(db, student_id, {
+        item_id: (data["was_used"], data["was_error"]) for item_id, data in results.items()
+    })
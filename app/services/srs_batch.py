@@ -0,0 +1,219 @@
+"""Vectorized SM-2: the calculate_sm2 step for whole arrays of items at once.
+
+sm2_batch gives exactly the values calculate_sm2 would give for each row
+(same float operations in the same order, the same round() and timedelta
+rounding, the same isoformat strings), so the two can be used
+interchangeably. The reschedule helpers below apply bulk changes to
+srs_state (shift every review by N days, scale intervals) with one SELECT,
+array arithmetic and one executemany.
+"""
+
+import time
+from datetime import datetime, timedelta
+import aiosqlite
+import numpy as np
+from app.services import due_queue
+
+_US_PER_DAY = 86_400_000_000
+# (score below, interval multiplier), checked in order as in calculate_sm2
+_WEAKNESS_STEPS = ((0.5, 0.5), (0.75, 0.75))
+_MAX_DATETIME = np.datetime64("9999-12-31T23:59:59.999999", "us")
+
+
+def _round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """round(x, ndigits) for every element, matching Python's correctly rounded result."""
+    rounded = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    # np.round can differ from round() only when the value sits on a tie
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def _days_to_us(days: np.ndarray) -> np.ndarray:
+    """timedelta(days=d) in microseconds, using CPython's exact accumulation and rounding."""
+    if days.size and days.max() > 999_999_999:
+        raise OverflowError("days must have magnitude <= 999999999")
+    whole_days = np.trunc(days)
+    frac_us = (days - whole_days) * float(_US_PER_DAY)
+    whole_us = np.trunc(frac_us)
+    leftover = frac_us - whole_us
+    total = whole_days.astype(np.int64) * _US_PER_DAY + whole_us.astype(np.int64)
+    # Round half to even on the total
+    ties = leftover == 0.5
+    return total + np.where(ties, total & 1, np.floor(leftover + 0.5).astype(np.int64))
+
+
+def _isoformat(times: np.ndarray) -> list[str]:
+    """datetime.isoformat() for datetime64[us] values (no fraction when it is zero)."""
+    if times.size and times.max() > _MAX_DATETIME:
+        raise OverflowError("date value out of range")
+    text = np.datetime_as_string(times, unit="us")
+    whole = (times.astype(np.int64) % 1_000_000) == 0
+    return [s[:-7] if w else s for s, w in zip(text.tolist(), whole.tolist())]
+
+
+def parse_times(values: list[str | None], default: datetime) -> np.ndarray:
+    """srs_state timestamps (isoformat or SQLite 'YYYY-MM-DD HH:MM:SS') to datetime64[us]."""
+    fallback = default.isoformat()
+    return np.array([(v or fallback).replace(" ", "T") for v in values], dtype="datetime64[us]")
+
+
+def sm2_step(quality, ease_factor, interval_days, repetitions,
+             grammar_score=None, vocab_score=None, formality_score=None):
+    """
+    The numeric part of calculate_sm2 over arrays, before rounding.
+    grammar/vocab/formality_score: optional arrays of sub-scores; NaN (or a
+    missing array) means no sub-score, like a key absent from sub_scores.
+    Returns (ease_factor, interval_days, repetitions) arrays.
+    """
+    q = np.asarray(quality, dtype=np.float64) * 5
+    ease = np.asarray(ease_factor, dtype=np.float64)
+    interval = np.asarray(interval_days, dtype=np.float64)
+    reps = np.asarray(repetitions, dtype=np.int64)
+
+    passed = q >= 3
+    new_interval = np.select(
+        [reps == 0, reps == 1], [1.0, 6.0], interval * ease
+    )
+    interval = np.where(passed, new_interval, 0.0)
+    reps = np.where(passed, reps + 1, 0)
+
+    ease = ease + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+    ease = np.maximum(1.3, ease)
+
+    for scores in (grammar_score, vocab_score, formality_score):
+        if scores is None:
+            continue
+        scores = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=1.0)
+        multiplier = np.ones_like(interval)
+        for below, factor in reversed(_WEAKNESS_STEPS):
+            multiplier = np.where(scores < below, factor, multiplier)
+        interval = interval * multiplier
+
+    return ease, np.maximum(0, interval), reps
+
+
+def sm2_batch(quality, ease_factor, interval_days, repetitions,
+              grammar_score=None, vocab_score=None, formality_score=None,
+              now: datetime | None = None) -> dict:
+    """
+    calculate_sm2 over arrays (see sm2_step for the arguments).
+    Returns arrays ease_factor, interval_days, repetitions and a list of
+    next_review isoformat strings.
+    """
+    now = now or datetime.utcnow()
+    ease, interval, reps = sm2_step(
+        quality, ease_factor, interval_days, repetitions,
+        grammar_score, vocab_score, formality_score,
+    )
+    next_review = np.datetime64(now, "us") + _days_to_us(interval).astype("timedelta64[us]")
+
+    return {
+        "ease_factor": _round(ease, 2),
+        "interval_days": _round(interval, 1),
+        "repetitions": reps,
+        "next_review": _isoformat(next_review),
+    }
+
+
+def _sub_score_array(sub_scores: list[dict | None], key: str) -> np.ndarray:
+    return np.array([
+        s.get(key, 1.0) if s else np.nan for s in sub_scores
+    ], dtype=np.float64)
+
+
+def sm2_for_rows(rows: list[tuple], scores: dict[int, tuple[float, dict | None]],
+                 now: datetime | None = None) -> list[tuple]:
+    """
+    SM-2 for srs_state rows (item_id, ease_factor, interval_days, repetitions)
+    given {item_id: (overall_score, sub_scores or None)}.
+    Returns (ease_factor, interval_days, repetitions, next_review, item_id) tuples.
+    """
+    if not rows:
+        return []
+    item_ids = [r[0] for r in rows]
+    subs = [scores[item_id][1] for item_id in item_ids]
+    result = sm2_batch(
+        [scores[item_id][0] for item_id in item_ids],
+        [r[1] for r in rows], [r[2] for r in rows], [r[3] for r in rows],
+        _sub_score_array(subs, "grammar_score"),
+        _sub_score_array(subs, "vocab_score"),
+        _sub_score_array(subs, "formality_score"),
+        now=now,
+    )
+    return list(zip(
+        result["ease_factor"].tolist(), result["interval_days"].tolist(),
+        result["repetitions"].tolist(), result["next_review"], item_ids,
+    ))
+
+
+async def _load_state(db: aiosqlite.Connection, student_id: int | None, due_only: bool):
+    where, params = [], []
+    if student_id is not None:
+        where.append("student_id = ?")
+        params.append(student_id)
+    if due_only:
+        where.append("next_review <= datetime('now')")
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    return await db.execute_fetchall(
+        f"""SELECT id, student_id, interval_days, next_review, last_reviewed
+            FROM srs_state {clause}""",
+        params
+    )
+
+
+def _forget_queues(rows) -> list[int]:
+    """Drop the due queues of the students whose rows changed; returns their ids."""
+    student_ids = sorted({r[1] for r in rows})
+    for student_id in student_ids:
+        due_queue.drop_student(student_id)
+    return student_ids
+
+
+async def shift_reviews(db: aiosqlite.Connection, days: float,
+                        student_id: int | None = None, due_only: bool = False) -> dict:
+    """
+    Move next_review by `days` (negative pulls reviews forward), e.g. after a
+    vacation. Runs on the caller's writer connection; the caller commits.
+    """
+    rows = await _load_state(db, student_id, due_only)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    times = parse_times([r[3] for r in rows], now)
+    next_reviews = _isoformat(times + np.timedelta64(timedelta(days=days), "us"))
+    compute_ms = (time.perf_counter() - started) * 1000
+
+    await db.executemany(
+        "UPDATE srs_state SET next_review = ? WHERE id = ?",
+        zip(next_reviews, (r[0] for r in rows))
+    )
+    return {"updated": len(rows), "students": _forget_queues(rows),
+            "compute_ms": round(compute_ms, 2)}
+
+
+async def scale_intervals(db: aiosqlite.Connection, factor: float,
+                          student_id: int | None = None, due_only: bool = False) -> dict:
+    """
+    Multiply interval_days by `factor` and recompute next_review from
+    last_reviewed (or now, for items never reviewed). Runs on the caller's
+    writer connection; the caller commits.
+    """
+    if factor < 0:
+        raise ValueError("factor must be >= 0")
+    rows = await _load_state(db, student_id, due_only)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    intervals = np.array([r[2] or 0.0 for r in rows], dtype=np.float64) * factor
+    base = parse_times([r[4] for r in rows], now)
+    next_reviews = _isoformat(base + _days_to_us(intervals).astype("timedelta64[us]"))
+    intervals = _round(intervals, 1).tolist()
+    compute_ms = (time.perf_counter() - started) * 1000
+
+    await db.executemany(
+        "UPDATE srs_state SET interval_days = ?, next_review = ? WHERE id = ?",
+        zip(intervals, next_reviews, (r[0] for r in rows))
+    )
+    return {"updated": len(rows), "students": _forget_queues(rows),
+            "compute_ms": round(compute_ms, 2)}
@@ -0,0 +1,315 @@
+"""End-to-end load benchmark against a generated dataset.
+
+Starts the fake OpenAI server (scripts/fake_openai.py) and the app on a copy
+of the dataset, logs in one client per simulated student, and measures
+latency and throughput of each scenario at each concurrency level. Results
+go to a JSON file that can be compared with an earlier run.
+
+Usage:
+    python scripts/generate_dataset.py data/bench.db --scale medium
+    python scripts/benchmark.py data/bench.db --output bench-$(git rev-parse --short HEAD).json
+    python scripts/benchmark.py data/bench.db --concurrency 1,8,32 --requests 500 \\
+        --scenarios stats,teacher_overview --compare bench-abc1234.json
+    python scripts/benchmark.py data/bench.db --chat-ms 1500 --whisper-ms 800   # realistic AI latency
+
+The dataset file itself is never modified.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "bench"  # see generate_dataset.py
+
+
+async def _practice_start(client, rng):
+    return await client.post("/api/practice/start", json={"item_count": 3})
+
+
+async def _practice_submit(client, rng):
+    """Measured: the submit. The start that provides its session is not timed
+    (but throughput counts start+submit pairs)."""
+    started = await client.post("/api/practice/start", json={"item_count": 3})
+    started.raise_for_status()
+    session = started.json()
+    audio = rng.randbytes(16_000)  # unique, so the transcription cache never hits
+    begin = time.perf_counter()
+    response = await client.post(
+        "/api/practice/submit",
+        files={"audio": ("bench.webm", io.BytesIO(audio), "audio/webm")},
+        data={"session_data": json.dumps(session)},
+    )
+    return response, time.perf_counter() - begin
+
+
+def _get(path):
+    async def run(client, rng):
+        return await client.get(path() if callable(path) else path)
+    return run
+
+
+# name -> (role, operation)
+SCENARIOS = {
+    "practice_start": ("student", _practice_start),
+    "practice_submit": ("student", _practice_submit),
+    "stats": ("student", _get("/api/stats")),
+    "stats_activity": ("student", _get("/api/stats/activity?days=90&bucket=week")),
+    "stats_vocab_growth": ("student", _get("/api/stats/vocab-growth")),
+    "stats_mastery_by_level": ("student", _get("/api/stats/mastery-by-level")),
+    "stats_level_history": ("student", _get("/api/stats/level-history")),
+    "stats_forecast": ("student", _get("/api/stats/forecast")),
+    "review_queue": ("student", _get("/api/review/queue")),
+    "items": ("student", _get(lambda: f"/api/items?page={random.randint(1, 20)}")),
+    "items_search": ("student", _get("/api/items?search=word%2012")),
+    "teacher_overview": ("teacher", _get("/api/stats/teacher/overview?limit=50")),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{process.args} exited with {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def _dataset_summary(db_path: Path) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("items", "students", "srs_state", "mastery", "encounters", "practice_log")}
+    finally:
+        conn.close()
+
+
+def _usernames(db_path: Path) -> list[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [r[0] for r in conn.execute(
+            "SELECT username FROM students WHERE username LIKE 'bench%' ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _git_commit() -> str | None:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def _login(base_url: str, role: str, username: str | None) -> httpx.AsyncClient:
+    client = httpx.AsyncClient(base_url=base_url, timeout=120)
+    if role == "teacher":
+        response = await client.post("/api/login/teacher", json={"password": PASSWORD})
+    else:
+        response = await client.post("/api/login", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return client
+
+
+async def run_scenario(base_url: str, name: str, concurrency: int, requests: int,
+                       usernames: list[str], seed: int) -> dict:
+    role, operation = SCENARIOS[name]
+    clients = [await _login(base_url, role, usernames[i % len(usernames)])
+               for i in range(concurrency)]
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def worker(client, rng):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            begin = time.perf_counter()
+            try:
+                result = await operation(client, rng)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            response, elapsed = result if isinstance(result, tuple) else (result, time.perf_counter() - begin)
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(elapsed * 1000)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(c, random.Random(seed + i)) for i, c in enumerate(clients)))
+        wall = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 50), 2),
+            "p90": round(_percentile(latencies, 90), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+def _compare(results: list[dict], baseline_path: Path):
+    baseline = {(r["scenario"], r["concurrency"]): r
+                for r in json.loads(baseline_path.read_text())["results"]}
+    print(f"\nCompared with {baseline_path} (negative latency change is better):")
+    print(f"{'scenario':24} {'conc':>4} {'p50 Δ':>9} {'p95 Δ':>9} {'rps Δ':>9}")
+    for r in results:
+        old = baseline.get((r["scenario"], r["concurrency"]))
+        if not old:
+            continue
+
+        def change(new, before):
+            return f"{(new - before) / before * 100:+8.1f}%" if before else "      n/a"
+
+        print(f"{r['scenario']:24} {r['concurrency']:>4} "
+              f"{change(r['latency_ms']['p50'], old['latency_ms']['p50'])} "
+              f"{change(r['latency_ms']['p95'], old['latency_ms']['p95'])} "
+              f"{change(r['throughput_rps'], old['throughput_rps'])}")
+
+
+async def benchmark(args) -> list[dict]:
+    import bcrypt
+
+    workdir = Path(tempfile.mkdtemp(prefix="kapp-bench-"))
+    db_path = workdir / "bench.db"
+    shutil.copyfile(args.db, db_path)
+    usernames = _usernames(db_path)
+    if not usernames and any(SCENARIOS[s][0] == "student" for s in args.scenarios):
+        raise SystemExit(f"{args.db} has no bench<N> students; create it with generate_dataset.py")
+
+    fake_port, app_port = _free_port(), _free_port()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_PATH": str(db_path),
+        "AUDIO_PATH": str(workdir / "audio"),
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "TEACHER_PASSWORD_HASH": bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode(),
+        "TELEGRAM_BOT_TOKEN": "",
+    })
+    fake = subprocess.Popen(
+        [sys.executable, str(ROOT / "scripts" / "fake_openai.py"), "--port", str(fake_port),
+         "--chat-ms", str(args.chat_ms), "--whisper-ms", str(args.whisper_ms)], cwd=ROOT, env=env)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port),
+         "--log-level", "warning"], cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{app_port}"
+    results = []
+    try:
+        await _wait_ready(f"http://127.0.0.1:{fake_port}/docs", fake)
+        await _wait_ready(f"{base_url}/api/health", server)
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                if args.warmup:
+                    await run_scenario(base_url, name, 1, args.warmup, usernames, args.seed)
+                result = await run_scenario(base_url, name, concurrency, args.requests,
+                                            usernames, args.seed)
+                results.append(result)
+                lat = result["latency_ms"]
+                print(f"{name:24} c={concurrency:<4} {result['throughput_rps']:8.1f} req/s  "
+                      f"p50 {lat['p50']:8.1f} ms  p95 {lat['p95']:8.1f} ms  "
+                      f"p99 {lat['p99']:8.1f} ms  errors {result['errors']}")
+    finally:
+        for process in (server, fake):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark")
+    parser.add_argument("db", type=Path, help="dataset from generate_dataset.py (copied, not modified)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each run")
+    parser.add_argument("--chat-ms", type=int, default=0, help="fake GPT latency")
+    parser.add_argument("--whisper-ms", type=int, default=0, help="fake Whisper latency")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="earlier JSON output to compare against")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    results = asyncio.run(benchmark(args))
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "dataset": {"path": str(args.db), **_dataset_summary(args.db)},
+            "settings": {"requests": args.requests, "warmup": args.warmup,
+                         "chat_ms": args.chat_ms, "whisper_ms": args.whisper_ms, "seed": args.seed},
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        _compare(results, args.compare)
+    if any(r["errors"] for r in results):
+        sys.exit(1)
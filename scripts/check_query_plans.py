@@ -0,0 +1,224 @@
+"""Check that the hot queries use indexes.
+
+Runs the dashboard/stats endpoints and the practice write path against a
+scratch database filled with synthetic data, records every statement SQLite
+executes, and runs EXPLAIN QUERY PLAN on each. Exits non-zero if any of them
+scans a whole table, apart from the scans listed in ALLOWED_SCANS.
+
+Because the statements are captured from the running code rather than
+copied here, a query added or changed later is checked automatically as
+long as it runs on one of the paths below.
+
+Usage:
+    python scripts/check_query_plans.py            # Report full scans only
+    python scripts/check_query_plans.py --verbose  # Print every plan
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# The app reads its configuration at import time
+_scratch = tempfile.TemporaryDirectory()
+os.environ["DATABASE_PATH"] = os.path.join(_scratch.name, "plans.db")
+os.environ["PROMPT_PREFETCH_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+
+from app.auth import COOKIE_NAME, create_session_token
+from app.database import (
+    init_db, connect, get_db, get_write_db, insert_item, insert_sentence, check_duplicate_item,
+    find_items_by_korean, calculate_student_level, record_encounters_with_type,
+    update_items_metrics, backfill_practice_log_items, backfill_item_events,
+)
+from app.main import app
+from app.services import item_index
+from app.services.correction import find_database_item_by_korean
+from app.services.forecast import forecast_students
+from app.services.srs import select_review_items, update_srs_batch
+
+STUDENTS = 3
+ITEMS = 400
+
+# Whole-table scans that are intended: (pattern in the statement, scanned table/alias, why)
+ALLOWED_SCANS = [
+    ("FROM students s", "s", "teacher overview lists every student"),
+    ("LIKE '%", "i", "search too common for the FTS index falls back to a substring filter"),
+    ("LIKE '%", "s", "search too common for the FTS index falls back to a substring filter"),
+]
+
+GET_ENDPOINTS = {
+    "student": [
+        "/api/stats", "/api/stats/level-history", "/api/stats/encounters",
+        "/api/stats/activity", "/api/stats/activity?bucket=week", "/api/stats/mastery-by-level",
+        "/api/stats/vocab-growth", "/api/stats/forecast",
+        "/api/stats/weaknesses", "/api/stats/item-timeline/5", "/api/goals", "/api/review/queue",
+        "/api/review/history", "/api/review/history/1", "/api/review/history/items/5",
+        "/api/items?topik_level=2", "/api/items?per_page=20", "/api/sentences?per_page=20",
+        "/api/sentences?topik_level=3&per_page=5", "/api/items?search=단어1", "/api/items?search=단&per_page=5",
+        "/api/sentences?search=문장1&per_page=3", "/api/sentences?search=문",
+    ],
+    "teacher": [
+        "/api/stats/teacher/overview", "/api/stats/teacher/overview?sort=due_for_review&limit=10",
+    ],
+}
+
+_SCAN = re.compile(r"^SCAN (\S+)$")
+
+
+async def seed(db):
+    sources = ["seed", "curriculum", "manual", "telegram"]
+    for n in range(ITEMS):
+        await insert_item(
+            db, f"단어{n}", f"word {n}", "grammar" if n % 7 == 0 else "vocab",
+            topik_level=n % 6 + 1, source=sources[n % len(sources)],
+            dictionary_form=f"단어{n}다" if n % 3 == 0 else None,
+        )
+    for n in range(60):
+        await insert_sentence(db, f"문장{n}이에요.", f"Sentence {n}.", topik_level=n % 6 + 1,
+                              linked_item_ids=[n + 1, n + 2])
+    for sid in range(2, STUDENTS + 1):
+        await db.execute(
+            "INSERT OR IGNORE INTO students (id, username, display_name) VALUES (?, ?, ?)",
+            (sid, f"plan{sid}", f"Plan {sid}")
+        )
+    for sid in range(1, STUDENTS + 1):
+        for day in range(60):
+            await db.execute(
+                """INSERT INTO practice_log (item_ids, prompt, student_id, overall_score,
+                                             duration_seconds, created_at)
+                   VALUES (?, 'p', ?, ?, 60, datetime('now', ?))""",
+                (f"[{day + 1}]", sid, (day % 10) / 10, f"-{day} days")
+            )
+        scores = {item_id: ((item_id % 10) / 10, None) for item_id in range(1, 120, sid)}
+        await update_srs_batch(db, scores, sid)
+        await record_encounters_with_type(db, sid, {item_id: "used_correctly" for item_id in scores})
+        await calculate_student_level(db, sid)
+    await backfill_practice_log_items(db)
+    await backfill_item_events(db)
+    await db.execute(
+        "INSERT INTO goals (student_id, goal_type, target_value, period) VALUES (1, 'practice_sessions', 5, 'weekly')"
+    )
+    await db.commit()
+    # The app loads the item index when the pool opens, not on a request path
+    await item_index.load(db)
+
+
+async def exercise_services(db):
+    """The practice write path and lookups that run outside the endpoints above."""
+    await select_review_items(db, count=5, student_id=1)
+    await select_review_items(db, count=5, topik_level=2, student_id=2)
+    await find_items_by_korean(db, [("단어3", "vocab"), ("단어6다", "vocab")])
+    await find_database_item_by_korean(db, "단어9다", "vocab")
+    await find_database_item_by_korean(db, "단어12")
+    await check_duplicate_item(db, "단어5")
+    scores = {1: (0.9, {"grammar_score": 0.6}), 2: (0.3, None), 300: (0.7, None)}
+    await update_srs_batch(db, scores, 1)
+    await record_encounters_with_type(db, 1, {1: "used_correctly", 300: "exposed"})
+    await update_items_metrics(db, 1, {1: (True, False), 300: (False, False)})
+    await calculate_student_level(db, 1)
+    await forecast_students(db, [1, 2, 3], days=7)
+    await db.rollback()
+
+
+def call_endpoints(db):
+    async def traced_db():
+        yield db
+
+    app.dependency_overrides[get_db] = traced_db
+    app.dependency_overrides[get_write_db] = traced_db
+    try:
+        client = TestClient(app)  # no lifespan: nothing but these endpoints runs
+        failures = []
+        for role, paths in GET_ENDPOINTS.items():
+            client.cookies.set(COOKIE_NAME, create_session_token(role, 1 if role == "student" else 0))
+            for path in paths:
+                response = client.get(path)
+                if response.status_code != 200:
+                    failures.append(f"GET {path} -> {response.status_code}")
+                    continue
+                # Follow one cursor so the keyset page query is checked too
+                body = response.json()
+                if isinstance(body, dict) and body.get("next_cursor"):
+                    page = f"{path}{'&' if '?' in path else '?'}cursor={body['next_cursor']}&total=cached"
+                    response = client.get(page)
+                    if response.status_code != 200:
+                        failures.append(f"GET {page} -> {response.status_code}")
+        return failures
+    finally:
+        app.dependency_overrides.clear()
+
+
+def is_query(sql: str) -> bool:
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if head in ("SELECT", "WITH", "UPDATE", "DELETE"):
+        return True
+    return head == "INSERT" and " SELECT " in sql.upper()
+
+
+async def explain(db, sql: str) -> list[str]:
+    rows = await db.execute_fetchall(f"EXPLAIN QUERY PLAN {sql}")
+    return [r[3] for r in rows]
+
+
+def full_scans(sql: str, plan: list[str]) -> list[str]:
+    # CTEs and subqueries show up as MATERIALIZE/CO-ROUTINE <name> and are scanned by name
+    derived = {line.split(" ", 1)[1] for line in plan if line.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+    scans = []
+    for line in plan:
+        match = _SCAN.match(line)
+        if not match or match.group(1) in derived or match.group(1).startswith("("):
+            continue
+        name = match.group(1)
+        if any(pattern in sql and name == table for pattern, table, _ in ALLOWED_SCANS):
+            continue
+        scans.append(name)
+    return scans
+
+
+async def check(verbose: bool) -> int:
+    await init_db()
+    db = await connect()
+    statements = []
+    try:
+        await seed(db)
+        await db.set_trace_callback(statements.append)
+        await exercise_services(db)
+        failures = await asyncio.to_thread(call_endpoints, db)
+        await db.set_trace_callback(None)
+
+        seen, problems = set(), 0
+        for sql in statements:
+            key = " ".join(sql.split())
+            if key in seen or not is_query(sql):
+                continue
+            seen.add(key)
+            plan = await explain(db, sql)
+            scans = full_scans(sql, plan)
+            if scans or verbose:
+                print(("FULL SCAN of " + ", ".join(scans) if scans else "OK") + ":")
+                print("  " + key[:300])
+                for line in plan:
+                    print("    " + line)
+            problems += bool(scans)
+    finally:
+        await db.close()
+
+    for failure in failures:
+        print(failure)
+    print(f"{len(seen)} distinct statements checked, {problems} with full table scans, "
+          f"{len(failures)} endpoint errors")
+    return 1 if problems or failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN check for hot queries")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(check(args.verbose)))
@@ -0,0 +1,111 @@
+"""A local stand-in for the OpenAI API, for benchmarks.
+
+Serves the two endpoints the app uses (chat completions and Whisper
+transcriptions) with canned but well-formed answers after a configurable
+delay, so load tests exercise the whole request path without cost or rate
+limits. Correction answers echo the target items from the request, so the
+item lookup and SRS update paths do real work.
+
+Usage:
+    python scripts/fake_openai.py --port 8199 --chat-ms 800 --whisper-ms 400
+    OPENAI_BASE_URL=http://127.0.0.1:8199/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+app = FastAPI()
+app.state.chat_ms = 0
+app.state.whisper_ms = 0
+
+_TARGET_ITEM = re.compile(r"^- (.+?) \((.*)\) \[(vocab|grammar)\]$", re.MULTILINE)
+_STATUSES = ["correct", "correct", "correct", "wrong_form", "incorrect"]
+
+
+def _pick(seed: str, choices: list):
+    return choices[int(hashlib.sha256(seed.encode()).hexdigest(), 16) % len(choices)]
+
+
+def _correction(user_prompt: str) -> dict:
+    items = _TARGET_ITEM.findall(user_prompt)
+    vocab = [i for i in items if i[2] == "vocab"]
+    grammar = [i for i in items if i[2] == "grammar"]
+    return {
+        "overall_score": _pick(user_prompt, [0.4, 0.6, 0.7, 0.8, 0.9, 1.0]),
+        "items_used": [
+            {"korean": k, "english": e, "item_type": "vocab",
+             "status": _pick(k + user_prompt, _STATUSES), "explanation": "ok"}
+            for k, e, _ in vocab
+        ] + [{"korean": "어제", "english": "yesterday", "item_type": "vocab",
+              "status": "correct", "explanation": "ok"}],
+        "grammar_used": [
+            {"pattern": k, "english": e, "status": _pick(k + user_prompt, _STATUSES),
+             "explanation": "ok"}
+            for k, e, _ in grammar
+        ],
+        "target_items_feedback": [
+            {"item": k, "status": "used_correctly", "explanation": "ok"} for k, _, _ in items
+        ],
+        "formality": {"expected": "polite", "detected": "polite", "issues": []},
+        "corrected_sentence": "어제 친구를 만났어요.",
+        "natural_alternative": "어제 친구 만났어요.",
+        "explanation": "Good job.",
+    }
+
+
+def _answer(system_prompt: str, user_prompt: str) -> str:
+    if "prompt generator" in system_prompt:
+        return json.dumps({"prompt": "어제 친구를 만났어요. 무엇을 했어요?",
+                           "prompt_english": "You met a friend yesterday. What did you do?"})
+    if "analyzing a student's spoken Korean" in system_prompt:
+        return json.dumps(_correction(user_prompt), ensure_ascii=False)
+    if "Extract vocabulary and grammar" in system_prompt:
+        return json.dumps({"items": []})
+    return "I met a friend yesterday."
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = {m["role"]: m["content"] for m in body["messages"]}
+    await asyncio.sleep(app.state.chat_ms / 1000)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant",
+                        "content": _answer(messages.get("system", ""), messages.get("user", ""))},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(request: Request):
+    form = await request.form()
+    await form["file"].read()
+    await asyncio.sleep(app.state.whisper_ms / 1000)
+    return {"text": "어제 친구를 만났어요."}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--chat-ms", type=int, default=0, help="delay per chat completion")
+    parser.add_argument("--whisper-ms", type=int, default=0, help="delay per transcription")
+    args = parser.parse_args()
+    app.state.chat_ms = args.chat_ms
+    app.state.whisper_ms = args.whisper_ms
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,207 @@
+"""Generate a large synthetic database for load testing.
+
+Usage:
+    python scripts/generate_dataset.py data/bench.db                  # small preset
+    python scripts/generate_dataset.py data/bench.db --scale large    # 50k items, 1k students
+    python scripts/generate_dataset.py data/bench.db --students 200 --days 90 --force
+
+Every student gets the password "bench" and the username bench<N>. The data
+is deterministic for a given --seed. Rollup, count and search-index triggers
+are dropped during the bulk load and everything they maintain is rebuilt at the
+end, which is much faster than firing the triggers once per row.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SCALES = {
+    # items, students, days, sessions per student-day, items learned per student
+    "small": dict(items=2000, students=20, days=60, sessions_per_day=1.0, learned=300),
+    "medium": dict(items=10000, students=200, days=180, sessions_per_day=1.5, learned=800),
+    "large": dict(items=50000, students=1000, days=365, sessions_per_day=3.0, learned=1500),
+}
+PASSWORD = "bench"
+CHUNK = 50_000
+
+_SOURCES = ["seed"] * 6 + ["curriculum"] * 3 + ["manual", "telegram"]
+
+
+def _word(rng: random.Random, n: int) -> str:
+    """A unique pseudo-Korean word: random syllables plus the index in base 100."""
+    syllables = "".join(chr(0xAC00 + rng.randrange(11172)) for _ in range(rng.randint(1, 2)))
+    return syllables + "".join(chr(0xAC00 + int(d)) for d in str(n))
+
+
+def _ts(when: datetime) -> str:
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def _insert(db, sql: str, rows) -> int:
+    """executemany in chunks (keeps memory flat for millions of rows)."""
+    count, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK:
+            await db.executemany(sql, batch)
+            count += len(batch)
+            batch.clear()
+    if batch:
+        await db.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def _items(rng, n):
+    for i in range(n):
+        item_type = "grammar" if rng.random() < 0.15 else "vocab"
+        korean = _word(rng, i)
+        dictionary_form = korean + "다" if item_type == "vocab" and rng.random() < 0.3 else None
+        yield (korean, f"word {i}", item_type, rng.randint(1, 6), rng.choice(_SOURCES),
+               "[]", "", "verb" if dictionary_form else "noun", dictionary_form)
+
+
+def _student_rows(rng, student_id, item_count, days, sessions_per_day, learned, now):
+    """srs_state, mastery, encounters, practice_log and level rows for one student."""
+    learned_ids = rng.sample(range(1, item_count + 1), min(learned, item_count))
+    srs, mastery, encounters, practice, levels = [], [], [], [], []
+    for item_id in learned_ids:
+        first_seen = now - timedelta(days=rng.uniform(0, days))
+        reps = rng.randint(0, 8)
+        interval = round(rng.uniform(0, 60), 1) if reps else 0.0
+        last_reviewed = first_seen + (now - first_seen) * rng.random()
+        next_review = last_reviewed + timedelta(days=interval)
+        score = round(rng.betavariate(4, 2), 2)
+        practice_count = reps + rng.randint(0, 3)
+        srs.append((item_id, student_id, round(rng.uniform(1.3, 3.0), 2), interval, reps,
+                    next_review.isoformat(), _ts(last_reviewed)))
+        mastery.append((item_id, student_id, score, score, score, score, practice_count,
+                        _ts(last_reviewed), practice_count, practice_count, rng.randint(0, 2)))
+        encounters.append((student_id, item_id, _ts(first_seen),
+                           _ts(first_seen) if practice_count else None, practice_count + 1,
+                           "used_correctly" if practice_count else "exposed"))
+    for day in range(days):
+        for _ in range(int(sessions_per_day) + (rng.random() < sessions_per_day % 1)):
+            created = now - timedelta(days=day, seconds=rng.randrange(86400))
+            item_ids = rng.sample(learned_ids, min(3, len(learned_ids)))
+            practice.append((json.dumps(item_ids), "어제 무엇을 했어요?", "polite",
+                             "어제 친구를 만났어요.", round(rng.betavariate(4, 2), 2), student_id,
+                             rng.randint(20, 240), "speaking", _ts(created)))
+    for week in range(0, days, 7):
+        levels.append((student_id, round(rng.uniform(1, 4), 2), _ts(now - timedelta(days=week))))
+    return srs, mastery, encounters, practice, levels
+
+
+async def generate(path: Path, items: int, students: int, days: int,
+                   sessions_per_day: float, learned: int, seed: int):
+    os.environ["DATABASE_PATH"] = str(path)
+    import bcrypt
+    from app.database import (
+        init_db, connect, rebuild_stats_rollups, rebuild_level_sums, backfill_practice_log_items,
+        backfill_item_events, rebuild_link_counts, rebuild_search_index,
+    )
+
+    await init_db()
+    db = await connect()
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    counts = {}
+    try:
+        await db.execute("PRAGMA synchronous=OFF")
+        triggers = await db.execute_fetchall(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%'"
+        )
+        for name, _ in triggers:
+            await db.execute(f"DROP TRIGGER {name}")
+
+        counts["items"] = await _insert(db, """INSERT INTO items
+            (korean, english, item_type, topik_level, source, tags, notes, pos, dictionary_form)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", _items(rng, items))
+        counts["examples"] = await _insert(db, """INSERT INTO examples (item_id, korean, english)
+            VALUES (?, '예문이에요.', 'An example.')""",
+            ((i,) for i in range(1, items + 1, 2)))
+
+        password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+        first = (await db.execute_fetchall("SELECT COALESCE(MAX(id), 0) + 1 FROM students"))[0][0]
+        student_ids = list(range(first, first + students))
+        counts["students"] = await _insert(db, """INSERT INTO students
+            (id, username, display_name, password_hash) VALUES (?, ?, ?, ?)""",
+            ((sid, f"bench{sid}", f"Bench {sid}", password_hash) for sid in student_ids))
+
+        totals = dict(srs_state=0, mastery=0, encounters=0, practice_log=0, student_level_history=0)
+        for n, student_id in enumerate(student_ids, 1):
+            srs, mastery, encounters, practice, levels = _student_rows(
+                rng, student_id, items, days, sessions_per_day, learned, now
+            )
+            totals["srs_state"] += await _insert(db, """INSERT INTO srs_state
+                (item_id, student_id, ease_factor, interval_days, repetitions, next_review, last_reviewed)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""", srs)
+            totals["mastery"] += await _insert(db, """INSERT INTO mastery
+                (item_id, student_id, grammar_score, vocab_score, formality_score, overall_score,
+                 practice_count, last_practiced, exposure_count, usage_count, error_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", mastery)
+            totals["encounters"] += await _insert(db, """INSERT INTO encounters
+                (student_id, item_id, first_seen, first_practiced, encounter_count, encounter_type)
+                VALUES (?, ?, ?, ?, ?, ?)""", encounters)
+            totals["practice_log"] += await _insert(db, """INSERT INTO practice_log
+                (item_ids, prompt, formality, transcript, overall_score, student_id,
+                 duration_seconds, practice_mode, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", practice)
+            totals["student_level_history"] += await _insert(db, """INSERT INTO student_level_history
+                (student_id, estimated_level, calculated_at) VALUES (?, ?, ?)""", levels)
+            if n % 50 == 0 or n == len(student_ids):
+                await db.commit()
+                print(f"  {n}/{len(student_ids)} students ({time.perf_counter() - started:.0f}s)")
+        counts.update(totals)
+        await backfill_practice_log_items(db)
+        await backfill_item_events(db)
+
+        for _, sql in triggers:
+            await db.execute(sql)
+        await rebuild_stats_rollups(db)
+        await rebuild_level_sums(db)
+        await rebuild_link_counts(db)
+        await rebuild_search_index(db)
+        await db.commit()
+        await db.execute("PRAGMA optimize")
+    finally:
+        await db.close()
+
+    print(f"Generated {path} in {time.perf_counter() - started:.0f}s: "
+          + ", ".join(f"{v:,} {k}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic load-test database")
+    parser.add_argument("db", type=Path, help="output database path")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--items", type=int)
+    parser.add_argument("--students", type=int)
+    parser.add_argument("--days", type=int, help="days of practice history")
+    parser.add_argument("--sessions-per-day", type=float, help="average sessions per student per day")
+    parser.add_argument("--learned", type=int, help="items each student has started")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="overwrite an existing database")
+    args = parser.parse_args()
+
+    if args.db.exists():
+        if not args.force:
+            sys.exit(f"{args.db} exists (use --force to overwrite)")
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{args.db}{suffix}").unlink(missing_ok=True)
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+
+    params = dict(SCALES[args.scale])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    asyncio.run(generate(args.db, seed=args.seed, **params))
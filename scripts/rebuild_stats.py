@@ -0,0 +1,53 @@
+"""Rebuild the per-student stats rollups from the source tables.
+
+Usage:
+    python scripts/rebuild_stats.py              # Every student
+    python scripts/rebuild_stats.py --student 3  # One student
+
+The rollups (student_stats_rollup, student_daily_stats, student_level_sums)
+and, for a full rebuild, the item example/sentence link counts and the search
+index are kept current by triggers; this is only needed after editing the
+database by hand with the triggers dropped, or to check for drift.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import (
+    init_db, connect, rebuild_stats_rollups, rebuild_level_sums, rebuild_link_counts,
+    rebuild_search_index,
+)
+
+
+async def rebuild(student_id: int | None):
+    await init_db()
+    db = await connect()
+    try:
+        started = time.perf_counter()
+        await rebuild_stats_rollups(db, student_id)
+        await rebuild_level_sums(db, student_id)
+        if student_id is None:
+            await rebuild_link_counts(db)
+            await rebuild_search_index(db)
+        await db.commit()
+        elapsed = (time.perf_counter() - started) * 1000
+        rows = await db.execute_fetchall("SELECT COUNT(*) FROM student_stats_rollup")
+        days = await db.execute_fetchall("SELECT COUNT(*) FROM student_daily_stats")
+    finally:
+        await db.close()
+
+    scope = f"student {student_id}" if student_id is not None else "all students"
+    print(f"Rebuilt stats rollups for {scope} in {elapsed:.0f} ms "
+          f"({rows[0][0]} students, {days[0][0]} daily rows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stats rollup tables")
+    parser.add_argument("--student", type=int, default=None, help="only this student id")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.student))
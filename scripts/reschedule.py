@@ -0,0 +1,54 @@
+"""Bulk-reschedule SRS reviews.
+
+Usage:
+    python scripts/reschedule.py shift 7                  # Push every review back a week
+    python scripts/reschedule.py shift -2 --student 3     # Pull one student's reviews forward
+    python scripts/reschedule.py scale 0.8 --due-only     # Shorten intervals of due items
+    python scripts/reschedule.py shift 7 --dry-run        # Show what would change
+
+Run it while the server is stopped (or restart it afterwards): the server
+keeps due queues in memory and won't see changes made by another process.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import init_db, connect
+from app.services.srs_batch import shift_reviews, scale_intervals
+
+
+async def reschedule(action: str, amount: float, student_id: int | None,
+                     due_only: bool, dry_run: bool):
+    await init_db()
+    db = await connect()
+    try:
+        if action == "shift":
+            result = await shift_reviews(db, amount, student_id, due_only)
+        else:
+            result = await scale_intervals(db, amount, student_id, due_only)
+        if dry_run:
+            await db.rollback()
+        else:
+            await db.commit()
+    finally:
+        await db.close()
+
+    verb = "Would update" if dry_run else "Updated"
+    print(f"{verb} {result['updated']} SRS rows for {len(result['students'])} student(s) "
+          f"({result['compute_ms']} ms compute)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-reschedule SRS reviews")
+    parser.add_argument("action", choices=["shift", "scale"],
+                        help="shift: move next_review by N days; scale: multiply intervals")
+    parser.add_argument("amount", type=float, help="days (shift) or factor (scale)")
+    parser.add_argument("--student", type=int, default=None, help="only this student id")
+    parser.add_argument("--due-only", action="store_true", help="only items due now")
+    parser.add_argument("--dry-run", action="store_true", help="roll back instead of committing")
+    args = parser.parse_args()
+    asyncio.run(reschedule(args.action, args.amount, args.student, args.due_only, args.dry_run))
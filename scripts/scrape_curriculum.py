@@ -13,7 +13,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import DATABASE_PATH
-from app.database import get_db
+from app.database import connect
 
 # Curriculum structure (manually defined based on website structure)
 # Each unit has lessons with their URLs
@@ -283,7 +283,7 @@ CURRICULUM = {
 
 async def populate_curriculum():
     """Insert curriculum structure into database."""
-    db = await get_db()
+    db = await connect()
     try:
         print("📚 Populating curriculum structure...")
 
@@ -345,7 +345,7 @@ async def match_items_to_lessons():
     Auto-match existing items to lessons based on TOPIK level and keywords.
     This creates initial lesson_items linkages.
     """
-    db = await get_db()
+    db = await connect()
     try:
         print("\n🔗 Matching items to lessons...")
 
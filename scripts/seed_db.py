@@ -12,7 +12,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from app.database import init_db, get_db, insert_item, check_duplicate_item
+from app.database import init_db, connect, insert_item, check_duplicate_item
 
 
 # Derive POS from tags if not explicitly set
@@ -48,7 +48,7 @@ def _derive_grammar_category(item: dict) -> str | None:
 
 async def seed(merge=False):
     await init_db()
-    db = await get_db()
+    db = await connect()
 
     try:
         count = await db.execute_fetchall("SELECT COUNT(*) FROM items")
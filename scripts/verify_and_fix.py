@@ -14,7 +14,7 @@ from collections import Counter
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from app.database import init_db, get_db
+from app.database import init_db, connect
 
 # POS tags derivable from item tags
 TAG_TO_POS = {
@@ -52,7 +52,7 @@ def infer_pos(korean: str, tags: list[str]) -> str | None:
 
 async def verify_and_fix(fix=False, dedup=False):
     await init_db()
-    db = await get_db()
+    db = await connect()
 
     try:
         rows = await db.execute_fetchall(
@@ -64,14 +64,15 @@ const API = {
 
     getLevelHistory() { return this.get('/api/stats/level-history'); },
     getEncounters() { return this.get('/api/stats/encounters'); },
-    getActivity(days) { return this.get(`/api/stats/activity?days=${days || 30}`); },
+    getActivity(days, bucket) { return this.get(`/api/stats/activity?days=${days || 30}&bucket=${bucket || 'day'}`); },
     getMasteryByLevel() { return this.get('/api/stats/mastery-by-level'); },
-    getVocabGrowth(days) { return this.get(`/api/stats/vocab-growth?days=${days || 90}`); },
+    getVocabGrowth(days, bucket) { return this.get(`/api/stats/vocab-growth?days=${days || 90}&bucket=${bucket || 'day'}`); },
     getTeacherOverview() { return this.get('/api/stats/teacher/overview'); },
 
     getReviewQueue() { return this.get('/api/review/queue'); },
     getHistory(limit) { return this.get(`/api/review/history?limit=${limit || 20}`); },
     getSessionDetail(id) { return this.get(`/api/review/history/${id}`); },
+    getItemAttempts(itemId, limit) { return this.get(`/api/review/history/items/${itemId}?limit=${limit || 20}`); },
 
     getStats() { return this.get('/api/stats'); },
 
@@ -13,6 +13,7 @@ const ItemCard = {
                 <div>
                     <div class="item-korean">${this._esc(item.korean)}${dictForm ? ` <span style="font-size:0.75rem;color:var(--text-secondary)">(${dictForm})</span>` : ''}</div>
                     <div class="item-english">${this._esc(item.english)}</div>
+                    ${item.snippet ? `<div class="item-snippet" style="font-size:0.8rem;color:var(--text-secondary)">${this._highlight(item.snippet)}</div>` : ''}
                     <div class="item-meta">
                         <span class="badge badge-level">TOPIK ${item.topik_level}</span>
                         <span class="badge badge-type">${item.item_type}</span>
@@ -33,4 +34,11 @@ const ItemCard = {
         d.textContent = str || '';
         return d.innerHTML;
     },
+
+    // Search snippets mark hits with <mark>; escape everything else.
+    _highlight(snippet) {
+        return this._esc(snippet)
+            .replace(/&lt;mark&gt;/g, '<mark>')
+            .replace(/&lt;\/mark&gt;/g, '</mark>');
+    },
 };
@@ -1,5 +1,6 @@
 const ItemsPage = {
     currentPage: 1,
+    pageCursors: [null],  // cursor for the start of each page (index = page - 1)
     currentSearch: '',
     currentLevel: '',
     currentType: '',
@@ -103,6 +104,7 @@ const ItemsPage = {
         this.currentType = document.getElementById('items-type')?.value || '';
         this.currentPos = document.getElementById('items-pos')?.value || '';
         this.currentPage = 1;
+        this.pageCursors = [null];
         await this.fetchItems();
     },
 
@@ -111,13 +113,19 @@ const ItemsPage = {
         list.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
 
         try {
-            const params = { page: this.currentPage, per_page: 50 };
+            const params = { per_page: 50 };
+            const cursor = this.pageCursors[this.currentPage - 1];
+            if (cursor) {
+                params.cursor = cursor;
+                params.total = 'cached';
+            }
             if (this.currentSearch) params.search = this.currentSearch;
             if (this.currentLevel) params.topik_level = this.currentLevel;
             if (this.currentType) params.item_type = this.currentType;
             if (this.currentPos) params.pos = this.currentPos;
 
             const data = await API.getItems(params);
+            this.pageCursors[this.currentPage] = data.next_cursor;
 
             if (data.items.length === 0) {
                 list.innerHTML = '<div class="empty-state"><div class="empty-icon">📚</div><p>No items found</p></div>';
@@ -134,16 +142,16 @@ const ItemsPage = {
                 });
             });
 
-            const totalPages = Math.ceil(data.total / data.per_page);
+            const totalPages = Math.max(Math.ceil(data.total / data.per_page), this.currentPage);
             const pag = document.getElementById('items-pagination');
             if (totalPages > 1) {
                 pag.innerHTML = `
                     <span style="font-size:0.85rem;color:var(--text-secondary)">
-                        Page ${data.page} of ${totalPages} (${data.total} items)
+                        Page ${this.currentPage} of ${totalPages} (${data.total} items)
                     </span>
                     <div style="margin-top:0.5rem;display:flex;gap:0.5rem;justify-content:center">
-                        ${data.page > 1 ? `<button class="btn btn-secondary" onclick="ItemsPage.goPage(${data.page - 1})">Prev</button>` : ''}
-                        ${data.page < totalPages ? `<button class="btn btn-secondary" onclick="ItemsPage.goPage(${data.page + 1})">Next</button>` : ''}
+                        ${this.currentPage > 1 ? `<button class="btn btn-secondary" onclick="ItemsPage.goPage(${this.currentPage - 1})">Prev</button>` : ''}
+                        ${data.next_cursor ? `<button class="btn btn-secondary" onclick="ItemsPage.goPage(${this.currentPage + 1})">Next</button>` : ''}
                     </div>`;
             } else {
                 pag.innerHTML = `<span style="font-size:0.85rem;color:var(--text-secondary)">${data.total} items</span>`;
@@ -1,5 +1,6 @@
 const TeacherPage = {
     currentPage: 1,
+    pageCursors: [null],  // cursor for the start of each page (index = page - 1)
     currentSearch: '',
     currentLevel: '',
     currentType: '',
@@ -123,6 +124,7 @@ const TeacherPage = {
         this.currentLevel = document.getElementById('teacher-level')?.value || '';
         this.currentType = document.getElementById('teacher-type')?.value || '';
         this.currentPage = 1;
+        this.pageCursors = [null];
         await this._fetchItems();
     },
 
@@ -131,12 +133,18 @@ const TeacherPage = {
         list.innerHTML = '<div class="loading"><div class="spinner"></div></div>';
 
         try {
-            const params = { page: this.currentPage, per_page: 50 };
+            const params = { per_page: 50 };
+            const cursor = this.pageCursors[this.currentPage - 1];
+            if (cursor) {
+                params.cursor = cursor;
+                params.total = 'cached';
+            }
             if (this.currentSearch) params.search = this.currentSearch;
             if (this.currentLevel) params.topik_level = this.currentLevel;
             if (this.currentType) params.item_type = this.currentType;
 
             const data = await API.getItems(params);
+            this.pageCursors[this.currentPage] = data.next_cursor;
 
             if (data.items.length === 0) {
                 list.innerHTML = '<div class="empty-state"><div class="empty-icon">📚</div><p>항목이 없습니다</p></div>';
@@ -151,6 +159,7 @@ const TeacherPage = {
                         <div>
                             <div class="item-korean">${this._esc(item.korean)}</div>
                             <div class="item-english">${this._esc(item.english)}</div>
+                            ${item.snippet ? `<div class="item-snippet" style="font-size:0.8rem;color:var(--text-secondary)">${ItemCard._highlight(item.snippet)}</div>` : ''}
                             <div class="item-meta">
                                 <span class="badge badge-level">TOPIK ${item.topik_level}</span>
                                 <span class="badge badge-type">${item.item_type === 'vocab' ? '단어' : '문법'}</span>
@@ -172,16 +181,16 @@ const TeacherPage = {
             });
 
             // Pagination
-            const totalPages = Math.ceil(data.total / data.per_page);
+            const totalPages = Math.max(Math.ceil(data.total / data.per_page), this.currentPage);
             const pag = document.getElementById('teacher-pagination');
             if (totalPages > 1) {
                 pag.innerHTML = `
                     <span style="font-size:0.85rem;color:var(--text-secondary)">
-                        ${data.page} / ${totalPages} 페이지 (총 ${data.total}개)
+                        ${this.currentPage} / ${totalPages} 페이지 (총 ${data.total}개)
                     </span>
                     <div style="margin-top:0.5rem;display:flex;gap:0.5rem;justify-content:center">
-                        ${data.page > 1 ? `<button class="btn btn-secondary" id="teacher-prev">이전</button>` : ''}
-                        ${data.page < totalPages ? `<button class="btn btn-secondary" id="teacher-next">다음</button>` : ''}
+                        ${this.currentPage > 1 ? `<button class="btn btn-secondary" id="teacher-prev">이전</button>` : ''}
+                        ${data.next_cursor ? `<button class="btn btn-secondary" id="teacher-next">다음</button>` : ''}
                     </div>`;
                 const prev = document.getElementById('teacher-prev');
                 const next = document.getElementById('teacher-next');
@@ -778,6 +787,10 @@ const TeacherPage = {
                                     <div style="color:var(--text-secondary)">숙달</div>
                                 </div>
                             </div>
+                            ${ov.forecast_due != null ? `
+                            <div style="font-size:0.75rem;color:var(--text-secondary);margin-top:0.5rem">
+                                ${overview.forecast_days}일 예상 복습: <strong>${ov.forecast_due}</strong>${ov.forecast_peak && ov.forecast_peak.due > 0 ? ` (최대 ${this._esc(ov.forecast_peak.date.slice(5))}: ${ov.forecast_peak.due})` : ''}
+                            </div>` : ''}
                             ${ov.mastery ? `
                             <div style="display:flex;height:6px;border-radius:3px;overflow:hidden;margin-top:0.5rem;background:var(--border)">
                                 <div style="width:${masteredPct}%;background:var(--success)"></div>